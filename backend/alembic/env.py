@@ -13,6 +13,7 @@ from app.models import (  # noqa: F401 — register all models for autogenerate
     AdminUser,
     Agreement,
     Customer,
+    IdempotencyKey,
     Payment,
     Site,
     Space,
@@ -21,7 +22,8 @@ from app.models import (  # noqa: F401 — register all models for autogenerate
 )
 
 config = context.config
-config.set_main_option("sqlalchemy.url", settings.database_url)
+# DDL and long migrations need a session, not a transaction-mode pooler
+config.set_main_option("sqlalchemy.url", settings.direct_database_url)
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
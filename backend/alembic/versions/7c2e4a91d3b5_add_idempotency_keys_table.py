@@ -0,0 +1,45 @@
+"""add idempotency_keys table
+
+Revision ID: 7c2e4a91d3b5
+Revises: 2bd5bca61857
+Create Date: 2026-10-19 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e4a91d3b5'
+down_revision: Union[str, None] = '2bd5bca61857'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response_body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'key'),
+    )
+    op.create_index(
+        op.f('ix_idempotency_keys_expires_at'),
+        'idempotency_keys',
+        ['expires_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f('ix_idempotency_keys_expires_at'), table_name='idempotency_keys'
+    )
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,31 @@
+"""add version columns for optimistic concurrency
+
+Revision ID: a3f8d2c61e07
+Revises: 7c2e4a91d3b5
+Create Date: 2026-10-19 11:02:17.284310
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f8d2c61e07'
+down_revision: Union[str, None] = '7c2e4a91d3b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('spaces', 'payments', 'agreements'):
+        op.add_column(
+            table,
+            sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        )
+
+
+def downgrade() -> None:
+    for table in ('agreements', 'payments', 'spaces'):
+        op.drop_column(table, 'version')
@@ -0,0 +1,50 @@
+"""add (table_name, record_id, created_at DESC) index on system_logs
+
+Revision ID: a7c3e9d15b42
+Revises: f2b9c4e81d57
+Create Date: 2026-10-19 22:03:18.269504
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9d15b42'
+down_revision: Union[str, None] = 'f2b9c4e81d57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite index leads with table_name, so it replaces the old one
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_system_logs_table_record_created',
+            'system_logs',
+            ['table_name', 'record_id', sa.text('created_at DESC')],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_system_logs_table_name',
+            table_name='system_logs',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_system_logs_table_name',
+            'system_logs',
+            ['table_name'],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_system_logs_table_record_created',
+            table_name='system_logs',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,36 @@
+"""add table_versions for conditional GET ETags
+
+Revision ID: b4d9e2a83c16
+Revises: a7c3e9d15b42
+Create Date: 2026-10-19 23:41:07.118264
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d9e2a83c16'
+down_revision: Union[str, None] = 'a7c3e9d15b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('customers', 'sites', 'spaces', 'tags')
+
+
+def upgrade() -> None:
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('table_name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name'),
+    )
+    op.bulk_insert(
+        table_versions, [{'table_name': name, 'version': 0} for name in TABLES]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('table_versions')
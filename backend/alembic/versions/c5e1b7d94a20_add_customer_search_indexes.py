@@ -0,0 +1,72 @@
+"""add trigram search indexes for customers
+
+Revision ID: c5e1b7d94a20
+Revises: a3f8d2c61e07
+Create Date: 2026-10-19 15:24:08.913552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1b7d94a20'
+down_revision: Union[str, None] = 'a3f8d2c61e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE customers_fts USING fts5("
+            "customer_id UNINDEXED, name, phone, tokenize='trigram')"
+        )
+        op.execute(
+            "INSERT INTO customers_fts (customer_id, name, phone) "
+            "SELECT id, name, phone FROM customers"
+        )
+        op.execute(
+            "CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN "
+            "INSERT INTO customers_fts (customer_id, name, phone) "
+            "VALUES (new.id, new.name, new.phone); END"
+        )
+        op.execute(
+            "CREATE TRIGGER customers_fts_update AFTER UPDATE OF name, phone "
+            "ON customers BEGIN UPDATE customers_fts SET name = new.name, "
+            "phone = new.phone WHERE customer_id = old.id; END"
+        )
+        op.execute(
+            "CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN "
+            "DELETE FROM customers_fts WHERE customer_id = old.id; END"
+        )
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY keeps customers writable while the indexes build
+    with op.get_context().autocommit_block():
+        for column in ('name', 'phone'):
+            op.create_index(
+                f'ix_customers_{column}_trgm',
+                'customers',
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS customers_fts_{trigger}")
+        op.execute("DROP TABLE IF EXISTS customers_fts")
+        return
+
+    with op.get_context().autocommit_block():
+        for column in ('phone', 'name'):
+            op.drop_index(
+                f'ix_customers_{column}_trgm',
+                table_name='customers',
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,35 @@
+"""add end_date index on agreements
+
+Revision ID: d3a7f5c2e918
+Revises: b4d9e2a83c16
+Create Date: 2026-10-20 10:12:37.481530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a7f5c2e918'
+down_revision: Union[str, None] = 'b4d9e2a83c16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_agreements_end_date',
+            'agreements',
+            ['end_date'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_agreements_end_date',
+            table_name='agreements',
+            postgresql_concurrently=True,
+        )
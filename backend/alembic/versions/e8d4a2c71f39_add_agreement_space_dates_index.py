@@ -0,0 +1,48 @@
+"""add (space_id, start_date, end_date) index on agreements
+
+Revision ID: e8d4a2c71f39
+Revises: c5e1b7d94a20
+Create Date: 2026-10-19 17:41:52.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8d4a2c71f39'
+down_revision: Union[str, None] = 'c5e1b7d94a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite index leads with space_id, so it replaces the old one
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_agreements_space_id_dates',
+            'agreements',
+            ['space_id', 'start_date', 'end_date'],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_agreements_space_id',
+            table_name='agreements',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_agreements_space_id',
+            'agreements',
+            ['space_id'],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_agreements_space_id_dates',
+            table_name='agreements',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,82 @@
+"""index system log JSON values and created_at
+
+Revision ID: f2b9c4e81d57
+Revises: e8d4a2c71f39
+Create Date: 2026-10-19 20:12:37.481920
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b9c4e81d57'
+down_revision: Union[str, None] = 'e8d4a2c71f39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = ('old_values', 'new_values', 'metadata')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.create_index(
+            'ix_system_logs_created_at', 'system_logs', ['created_at']
+        )
+        return
+
+    # Rewrites the table under an exclusive lock: on a large audit log, run
+    # it in a maintenance window (writes to system_logs block meanwhile)
+    for column in JSON_COLUMNS:
+        op.alter_column(
+            'system_logs',
+            column,
+            type_=postgresql.JSONB(),
+            postgresql_using=f'{column}::jsonb',
+        )
+    with op.get_context().autocommit_block():
+        for column in JSON_COLUMNS:
+            op.create_index(
+                f'ix_system_logs_{column}_path_ops',
+                'system_logs',
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'jsonb_path_ops'},
+                postgresql_concurrently=True,
+            )
+        op.create_index(
+            'ix_system_logs_created_at_brin',
+            'system_logs',
+            ['created_at'],
+            postgresql_using='brin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.drop_index('ix_system_logs_created_at', table_name='system_logs')
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_system_logs_created_at_brin',
+            table_name='system_logs',
+            postgresql_concurrently=True,
+        )
+        for column in JSON_COLUMNS:
+            op.drop_index(
+                f'ix_system_logs_{column}_path_ops',
+                table_name='system_logs',
+                postgresql_concurrently=True,
+            )
+    for column in JSON_COLUMNS:
+        op.alter_column(
+            'system_logs',
+            column,
+            type_=sa.JSON(),
+            postgresql_using=f'{column}::json',
+        )
@@ -1,14 +1,17 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response
 
 from pydantic import BaseModel
-from sqlalchemy import func, select
 
-from app.dependencies import CurrentUser, DbSession
-from app.models.agreement import Agreement
-from app.models.payment import Payment
-from app.models.space import Space
+from app.dependencies import (
+    CurrentUser,
+    DbSession,
+    Idempotency,
+    IfMatch,
+    ReadDbSession,
+)
 from app.schemas.agreement import (
     AgreementCreate,
     AgreementResponse,
@@ -18,6 +21,7 @@ from app.schemas.payment import PaymentResponse
 from app.services.agreement_service import AgreementService
 from app.services.payment_service import PaymentService
 from app.utils.crypto import decrypt_license_plate
+from app.utils.responses import list_response
 
 
 class AgreementSummary(BaseModel):
@@ -55,73 +59,31 @@ def _to_response(a) -> AgreementResponse:
         customer_name=a.customer.name if a.customer else None,
         space_name=a.space.name if a.space else None,
         payment_status=a.payment.status if a.payment else None,
+        version=a.version,
     )
 
 
 @router.get("", response_model=list[AgreementResponse])
 async def list_agreements(
-    db: DbSession,
+    db: ReadDbSession,
     current_user: CurrentUser,
     customer_id: UUID | None = Query(None),
     space_id: UUID | None = Query(None),
     active_only: bool = Query(False),
-) -> list[AgreementResponse]:
+) -> Response:
     svc = AgreementService(db, current_user)
     agreements = await svc.list(
         customer_id=customer_id, space_id=space_id, active_only=active_only
     )
-    return [_to_response(a) for a in agreements]
+    return list_response(AgreementResponse, [_to_response(a) for a in agreements])
 
 
 @router.get("/summary", response_model=AgreementSummary)
 async def get_agreement_summary(
-    db: DbSession, current_user: CurrentUser
+    db: ReadDbSession, current_user: CurrentUser
 ) -> AgreementSummary:
-    from datetime import date as date_type
-
-    # Active agreements count
-    active_result = await db.execute(
-        select(func.count()).select_from(Agreement).where(
-            Agreement.terminated_at.is_(None)
-        )
-    )
-    active_count = active_result.scalar_one()
-
-    # Pending payment total
-    pending_result = await db.execute(
-        select(func.coalesce(func.sum(Payment.amount), 0)).where(
-            Payment.status == "pending"
-        )
-    )
-    pending_payment_total = pending_result.scalar_one()
-
-    # Available spaces
-    available_result = await db.execute(
-        select(func.count()).select_from(Space).where(
-            Space.status == "available"
-        )
-    )
-    available_space_count = available_result.scalar_one()
-
-    # Overdue: active agreements past end_date with pending payment
-    today = date_type.today()
-    overdue_result = await db.execute(
-        select(func.count()).select_from(Agreement).join(
-            Payment, Payment.agreement_id == Agreement.id
-        ).where(
-            Agreement.terminated_at.is_(None),
-            Agreement.end_date < today,
-            Payment.status == "pending",
-        )
-    )
-    overdue_count = overdue_result.scalar_one()
-
-    return AgreementSummary(
-        active_count=active_count,
-        pending_payment_total=pending_payment_total,
-        available_space_count=available_space_count,
-        overdue_count=overdue_count,
-    )
+    svc = AgreementService(db, current_user)
+    return AgreementSummary(**await svc.summary())
 
 
 @router.get("/{agreement_id}", response_model=AgreementResponse)
@@ -139,10 +101,13 @@ async def create_agreement(
     request: Request,
     db: DbSession,
     current_user: CurrentUser,
-) -> AgreementResponse:
+    idempotency: Idempotency,
+) -> AgreementResponse | Response:
+    if replay := await idempotency.begin():
+        return replay
     svc = AgreementService(db, current_user, _get_ip(request))
     agreement = await svc.create(data)
-    return _to_response(agreement)
+    return await idempotency.store(_to_response(agreement), 201)
 
 
 @router.post("/{agreement_id}/terminate", response_model=AgreementResponse)
@@ -152,9 +117,10 @@ async def terminate_agreement(
     request: Request,
     db: DbSession,
     current_user: CurrentUser,
+    if_match: IfMatch,
 ) -> AgreementResponse:
     svc = AgreementService(db, current_user, _get_ip(request))
-    agreement = await svc.terminate(agreement_id, data)
+    agreement = await svc.terminate(agreement_id, data, if_match)
     return _to_response(agreement)
 
 
@@ -1,10 +1,21 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Query, Request
+from fastapi import APIRouter, Query, Request, Response
 
-from app.dependencies import CurrentUser, DbSession
-from app.schemas.customer import CustomerCreate, CustomerResponse, CustomerUpdate
+from app.dependencies import CurrentUser, DbSession, ReadDbSession
+from app.models.customer import Customer
+from app.schemas.customer import (
+    CustomerAgreementItem,
+    CustomerCreate,
+    CustomerOverviewResponse,
+    CustomerResponse,
+    CustomerTotals,
+    CustomerUpdate,
+)
 from app.services.customer_service import CustomerService
+from app.utils.crypto import decrypt_license_plates
+from app.utils.etag import compute_etag, etag_matches, not_modified
+from app.utils.responses import list_response
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
@@ -20,12 +31,12 @@ async def list_customers(
     search: str | None = Query(None),
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
-) -> list[CustomerResponse]:
+) -> Response:
     svc = CustomerService(db, current_user)
     customers = await svc.list(search=search, offset=offset, limit=limit)
+    counts = await svc.get_active_agreement_counts([c.id for c in customers])
     results = []
     for c in customers:
-        count = await svc.get_active_agreement_count(c.id)
         results.append(CustomerResponse(
             id=c.id,
             name=c.name,
@@ -33,18 +44,28 @@ async def list_customers(
             contact_phone=c.contact_phone,
             email=c.email,
             notes=c.notes,
-            active_agreement_count=count,
+            active_agreement_count=counts.get(c.id, 0),
         ))
-    return results
+    return list_response(CustomerResponse, results)
 
 
 @router.get("/{customer_id}", response_model=CustomerResponse)
 async def get_customer(
-    customer_id: UUID, db: DbSession, current_user: CurrentUser
-) -> CustomerResponse:
+    customer_id: UUID,
+    request: Request,
+    response: Response,
+    db: DbSession,
+    current_user: CurrentUser,
+) -> CustomerResponse | Response:
     svc = CustomerService(db, current_user)
+    # Of the customer's agreements only the active count is shown
+    count = await svc.get_active_agreement_count(customer_id)
+    etag = await compute_etag(db, [Customer], customer_id, count)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
     customer = await svc.get(customer_id)
-    count = await svc.get_active_agreement_count(customer.id)
     return CustomerResponse(
         id=customer.id,
         name=customer.name,
@@ -56,6 +77,55 @@ async def get_customer(
     )
 
 
+@router.get("/{customer_id}/overview", response_model=CustomerOverviewResponse)
+async def get_customer_overview(
+    customer_id: UUID,
+    db: ReadDbSession,
+    current_user: CurrentUser,
+) -> CustomerOverviewResponse:
+    """Customer detail page in one request: customer, agreements, totals."""
+    svc = CustomerService(db, current_user)
+    overview = await svc.overview(customer_id)
+    customer = overview.customer
+    plates = decrypt_license_plates([row[0].license_plates for row in overview.rows])
+    return CustomerOverviewResponse(
+        customer=CustomerResponse(
+            id=customer.id,
+            name=customer.name,
+            phone=customer.phone,
+            contact_phone=customer.contact_phone,
+            email=customer.email,
+            notes=customer.notes,
+            active_agreement_count=overview.active_count,
+        ),
+        agreements=[
+            CustomerAgreementItem(
+                id=a.id,
+                space_id=a.space_id,
+                space_name=space_name,
+                site_name=site_name,
+                agreement_type=a.agreement_type,
+                start_date=a.start_date,
+                end_date=a.end_date,
+                price=a.price,
+                # Never expose raw ciphertext on decrypt failure
+                license_plates=plate if plate is not None else "[已加密]",
+                terminated_at=str(a.terminated_at) if a.terminated_at else None,
+                payment_id=payment.id if payment else None,
+                payment_amount=payment.amount if payment else None,
+                payment_status=payment.status if payment else None,
+                payment_due_date=payment.due_date if payment else None,
+                overdue=a.id in overview.overdue,
+                version=a.version,
+            )
+            for (a, space_name, site_name, payment), plate in zip(
+                overview.rows, plates, strict=True
+            )
+        ],
+        totals=CustomerTotals(**overview.totals),
+    )
+
+
 @router.post("", response_model=CustomerResponse, status_code=201)
 async def create_customer(
     data: CustomerCreate,
@@ -0,0 +1,64 @@
+import asyncio
+from collections.abc import AsyncIterator
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.config import settings
+from app.dependencies import CurrentUser, DbSession, StreamUser
+from app.services.event_bus import SHUTDOWN_EVENT, Subscription, event_bus
+from app.utils.auth import create_stream_token
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+class StreamTokenResponse(BaseModel):
+    token: str
+    expires_in: int
+
+
+async def sse_stream(
+    subscription: Subscription, heartbeat: float
+) -> AsyncIterator[str]:
+    """Format bus events as SSE, with comment heartbeats to keep proxies open."""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event.type}\ndata: {event.to_json()}\n\n"
+            if event == SHUTDOWN_EVENT:
+                return  # the client reconnects to another machine
+    finally:
+        subscription.close()
+
+
+@router.post("/token", response_model=StreamTokenResponse)
+async def stream_token(current_user: CurrentUser) -> StreamTokenResponse:
+    """Short-lived token for `new EventSource("/events/spaces?token=...")`."""
+    return StreamTokenResponse(
+        token=create_stream_token(str(current_user.id)),
+        expires_in=settings.sse_token_expire_seconds,
+    )
+
+
+@router.get("/spaces", response_class=StreamingResponse)
+async def space_events(
+    db: DbSession,
+    current_user: StreamUser,
+    site_id: UUID | None = Query(None),
+) -> StreamingResponse:
+    """Stream space status/payment deltas; clients reload on `resync`."""
+    # The stream can stay open for hours: give the auth lookup's connection
+    # back to the pool instead of holding it until disconnect
+    await db.close()
+    return StreamingResponse(
+        sse_stream(event_bus.subscribe(site_id), settings.sse_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
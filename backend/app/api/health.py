@@ -1,4 +1,13 @@
-from fastapi import APIRouter
+import asyncio
+import time
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_db, pool_status
 
 router = APIRouter(tags=["health"])
 
@@ -6,3 +15,40 @@ router = APIRouter(tags=["health"])
 @router.get("/health")
 async def health_check() -> dict:
     return {"status": "ok", "service": "ping-parking-api"}
+
+
+@router.get("/health/ready")
+async def readiness_check(db: AsyncSession = Depends(get_db)) -> JSONResponse:
+    """Ready when SELECT 1 answers in time and the pool has free connections.
+
+    Returns 503 otherwise so the load balancer stops routing to this worker.
+    """
+    # Read before the probe checks out its own connection, which would
+    # otherwise count towards saturation
+    pool = pool_status()
+    database: dict = {"ok": True}
+    started = time.perf_counter()
+    try:
+        # Includes waiting for a pooled connection, which is what callers feel
+        await asyncio.wait_for(
+            db.execute(text("SELECT 1")), timeout=settings.ready_db_timeout
+        )
+    except TimeoutError:
+        database = {"ok": False, "error": "timeout"}
+    except Exception as exc:
+        database = {"ok": False, "error": type(exc).__name__}
+    database["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    saturated = (
+        pool is not None and pool["saturation"] >= settings.ready_max_pool_saturation
+    )
+    ready = database["ok"] and not saturated
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "database": database,
+            "pool": pool,
+        },
+    )
+
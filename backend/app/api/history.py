@@ -0,0 +1,49 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+
+from app.dependencies import CurrentUser, ReadDbSession
+from app.schemas.history import FieldChange, HistoryEntry, HistoryResponse
+from app.services.history_service import HistoryService
+
+router = APIRouter(prefix="/history", tags=["history"])
+
+
+@router.get("/{table}/{record_id}", response_model=HistoryResponse)
+async def get_record_history(
+    table: str,
+    record_id: UUID,
+    db: ReadDbSession,
+    current_user: CurrentUser,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: UUID | None = Query(None),
+) -> HistoryResponse:
+    """Change history of one record, newest first.
+
+    Each entry carries the fields it changed and the record's full state
+    after it, rebuilt from the audit log. `table` is one of agreements,
+    customers, payments, sites, spaces or tags.
+    """
+    page = await HistoryService(db, current_user).history(
+        table, record_id, limit, cursor
+    )
+    return HistoryResponse(
+        table=table,
+        record_id=record_id,
+        entries=[
+            HistoryEntry(
+                log_id=step.log.id,
+                action=step.log.action,
+                user_id=step.log.user_id,
+                ip_address=step.log.ip_address,
+                created_at=step.log.created_at,
+                changes={
+                    field: FieldChange(before=before, after=after)
+                    for field, (before, after) in step.changes.items()
+                },
+                state=step.state,
+            )
+            for step in page.steps
+        ],
+        next_cursor=page.next_cursor,
+    )
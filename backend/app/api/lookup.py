@@ -0,0 +1,28 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+
+from app.dependencies import CurrentUser, DbSession
+from app.services.lookup_index import customer_lookup, space_lookup
+
+router = APIRouter(prefix="/lookup", tags=["lookup"])
+
+
+@router.get("/customers", response_model=list[UUID])
+async def lookup_customers(
+    db: DbSession,
+    current_user: CurrentUser,
+    q: str = Query(..., min_length=1, max_length=100),
+) -> list[UUID]:
+    """Top 10 customer IDs by name, given-name or phone prefix."""
+    return await customer_lookup.search(db, q)
+
+
+@router.get("/spaces", response_model=list[UUID])
+async def lookup_spaces(
+    db: DbSession,
+    current_user: CurrentUser,
+    q: str = Query(..., min_length=1, max_length=100),
+) -> list[UUID]:
+    """Top 10 space IDs by space name or "site/space" prefix."""
+    return await space_lookup.search(db, q)
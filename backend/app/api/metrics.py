@@ -0,0 +1,38 @@
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.utils.metrics import registry
+
+
+def require_metrics_token(
+    authorization: Annotated[str | None, Header()] = None,
+) -> None:
+    """Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`.
+
+    With no token configured every scrape is refused rather than served
+    openly.
+    """
+    expected = f"Bearer {settings.metrics_token}"
+    if not settings.metrics_token or not secrets.compare_digest(
+        (authorization or "").encode(), expected.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="無效的監控令牌",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(tags=["metrics"], dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,9 +1,19 @@
+from datetime import date
 from uuid import UUID
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response
 
-from app.dependencies import CurrentUser, DbSession
-from app.schemas.payment import PaymentComplete, PaymentResponse, PaymentUpdate, PaymentUpdateAmount
+from app.dependencies import CurrentUser, DbSession, Idempotency, IfMatch
+from app.schemas.payment import (
+    OverduePaymentResponse,
+    OverdueReconciliationResponse,
+    PaymentComplete,
+    PaymentResponse,
+    PaymentUpdate,
+    PaymentUpdateAmount,
+)
+from app.services.overdue_tracker import OverdueReconciliation, overdue_tracker
 from app.services.payment_service import PaymentService
 
 router = APIRouter(prefix="/payments", tags=["payments"])
@@ -13,6 +23,65 @@ def _get_ip(request: Request) -> str | None:
     return request.client.host if request.client else None
 
 
+@router.get("/overdue", response_model=list[OverduePaymentResponse])
+async def list_overdue_payments(
+    db: DbSession,
+    current_user: CurrentUser,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+) -> list[OverduePaymentResponse]:
+    svc = PaymentService(db, current_user)
+    payments = await svc.list_overdue(offset=offset, limit=limit)
+    today = date.today()
+    return [
+        OverduePaymentResponse(
+            id=p.id,
+            agreement_id=p.agreement_id,
+            amount=p.amount,
+            due_date=p.due_date,
+            end_date=p.agreement.end_date,
+            days_overdue=(today - p.agreement.end_date).days,
+            customer_name=p.agreement.customer.name if p.agreement.customer else None,
+            space_name=p.agreement.space.name if p.agreement.space else None,
+        )
+        for p in payments
+    ]
+
+
+def _reconciliation(report: OverdueReconciliation, repaired: bool) -> dict:
+    return {
+        "tracked": report.tracked,
+        "actual": report.actual,
+        "in_sync": report.in_sync,
+        "missing": report.missing,
+        "unexpected": report.unexpected,
+        "repaired": repaired,
+    }
+
+
+@router.get("/overdue/reconcile", response_model=OverdueReconciliationResponse)
+async def reconcile_overdue_payments(
+    db: DbSession, current_user: CurrentUser
+) -> OverdueReconciliationResponse:
+    """Compare the overdue tracker with a full scan."""
+    report = await overdue_tracker.reconcile(db)
+    return OverdueReconciliationResponse(**_reconciliation(report, repaired=False))
+
+
+@router.post("/overdue/reconcile", response_model=OverdueReconciliationResponse)
+async def repair_overdue_payments(
+    db: DbSession, current_user: CurrentUser
+) -> OverdueReconciliationResponse:
+    """Compare the overdue tracker with a full scan and rebuild it on drift,
+    in every worker."""
+    report = await overdue_tracker.reconcile(db)
+    if not report.in_sync:
+        await overdue_tracker.repair(db)
+    return OverdueReconciliationResponse(
+        **_reconciliation(report, repaired=not report.in_sync)
+    )
+
+
 @router.get("/{payment_id}", response_model=PaymentResponse)
 async def get_payment(
     payment_id: UUID, db: DbSession, current_user: CurrentUser
@@ -29,10 +98,14 @@ async def complete_payment(
     request: Request,
     db: DbSession,
     current_user: CurrentUser,
-) -> PaymentResponse:
+    idempotency: Idempotency,
+    if_match: IfMatch,
+) -> PaymentResponse | Response:
+    if replay := await idempotency.begin():
+        return replay
     svc = PaymentService(db, current_user, _get_ip(request))
-    payment = await svc.complete(payment_id, data)
-    return PaymentResponse.model_validate(payment)
+    payment = await svc.complete(payment_id, data, if_match)
+    return await idempotency.store(PaymentResponse.model_validate(payment))
 
 
 @router.put("/{payment_id}/amount", response_model=PaymentResponse)
@@ -42,9 +115,10 @@ async def update_payment_amount(
     request: Request,
     db: DbSession,
     current_user: CurrentUser,
+    if_match: IfMatch,
 ) -> PaymentResponse:
     svc = PaymentService(db, current_user, _get_ip(request))
-    payment = await svc.update_amount(payment_id, data)
+    payment = await svc.update_amount(payment_id, data, if_match)
     return PaymentResponse.model_validate(payment)
 
 
@@ -55,12 +129,14 @@ async def update_payment(
     request: Request,
     db: DbSession,
     current_user: CurrentUser,
+    if_match: IfMatch,
 ) -> PaymentResponse:
     """Update payment details (amount, status, dates, references).
 
     Allows editing all payments regardless of status.
     All fields are optional - only provided fields will be updated.
+    Send the payment's `version` in If-Match to reject concurrent edits.
     """
     svc = PaymentService(db, current_user, _get_ip(request))
-    payment = await svc.update(payment_id, data)
+    payment = await svc.update(payment_id, data, if_match)
     return PaymentResponse.model_validate(payment)
@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+
+from app.dependencies import CurrentUser, ReadDbSession
+from app.schemas.pricing import (
+    PriceDelta,
+    PricingSimulationRequest,
+    PricingSimulationResponse,
+    SitePriceDelta,
+    TierPriceDelta,
+)
+from app.services.pricing_service import PriceTotals, PricingService
+
+router = APIRouter(prefix="/pricing", tags=["pricing"])
+
+
+def _delta(totals: PriceTotals) -> dict:
+    return {
+        "spaces": totals.spaces,
+        "affected_spaces": totals.affected_spaces,
+        "monthly_before": totals.monthly_before,
+        "monthly_after": totals.monthly_after,
+        "monthly_delta": totals.monthly_after - totals.monthly_before,
+        "daily_before": totals.daily_before,
+        "daily_after": totals.daily_after,
+        "daily_delta": totals.daily_after - totals.daily_before,
+    }
+
+
+@router.post("/simulate", response_model=PricingSimulationResponse)
+async def simulate_pricing(
+    data: PricingSimulationRequest,
+    db: ReadDbSession,
+    current_user: CurrentUser,
+) -> PricingSimulationResponse:
+    """Effect of proposed site, tag and custom price changes on every space.
+
+    Nothing is written. Totals are the sums of the spaces' monthly and daily
+    list prices before and after; `tiers` groups spaces by the tier that
+    prices them after the change.
+    """
+    simulation = await PricingService(db, current_user).simulate(data)
+    return PricingSimulationResponse(
+        total=PriceDelta(**_delta(simulation.total)),
+        tier_changes=simulation.tier_changes,
+        tiers=[
+            TierPriceDelta(tier=tier, **_delta(totals))
+            for tier, totals in sorted(simulation.tiers.items())
+        ],
+        sites=[
+            SitePriceDelta(
+                site_id=site_id,
+                site_name=simulation.site_names[site_id],
+                **_delta(totals),
+            )
+            for site_id, totals in sorted(
+                simulation.sites.items(), key=lambda i: simulation.site_names[i[0]]
+            )
+        ],
+    )
@@ -0,0 +1,52 @@
+from datetime import date
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+
+from app.dependencies import CurrentUser, ReadDbSession
+from app.schemas.report import ForecastMonth, RevenueForecastResponse
+from app.services.report_service import ReportService
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+@router.get("/revenue-forecast", response_model=RevenueForecastResponse)
+async def get_revenue_forecast(
+    db: ReadDbSession,
+    current_user: CurrentUser,
+    months: int = Query(12, ge=1, le=36),
+    site_id: UUID | None = Query(None),
+) -> RevenueForecastResponse:
+    """Expected revenue per calendar month, starting with the current one.
+
+    `contracted` spreads each booked agreement's price over the days of its
+    term, `expected_renewals` extrapolates renewals of agreements ending in
+    the horizon from each type's historical renewal rate, and
+    `pending_receivables` sums unpaid payments by due month.
+    """
+    today = date.today()
+    forecast = await ReportService(db, current_user).revenue_forecast(
+        months, site_id, today
+    )
+    return RevenueForecastResponse(
+        site_id=site_id,
+        as_of=today,
+        months=[
+            ForecastMonth(
+                month=month,
+                contracted=contracted,
+                expected_renewals=renewals,
+                pending_receivables=pending,
+                total=contracted + renewals,
+            )
+            for month, contracted, renewals, pending in zip(
+                forecast.months,
+                forecast.contracted,
+                forecast.expected_renewals,
+                forecast.pending_receivables,
+                strict=True,
+            )
+        ],
+        renewal_rates=forecast.renewal_rates,
+        overdue_receivables=forecast.overdue_receivables,
+    )
@@ -4,13 +4,20 @@ from app.api import (
     agreements,
     auth,
     customers,
+    events,
     health,
+    history,
+    lookup,
+    metrics,
     payments,
+    pricing,
+    reports,
     sites,
     spaces,
     system_logs,
     tags,
 )
+from app.config import settings
 
 api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(auth.router)
@@ -21,7 +28,14 @@ api_router.include_router(customers.router)
 api_router.include_router(agreements.router)
 api_router.include_router(payments.router)
 api_router.include_router(system_logs.router)
+api_router.include_router(events.router)
+api_router.include_router(lookup.router)
+api_router.include_router(reports.router)
+api_router.include_router(pricing.router)
+api_router.include_router(history.router)
 
 # Include health at root level (no /api/v1 prefix)
 root_router = APIRouter()
 root_router.include_router(health.router)
+if settings.metrics_enabled:
+    root_router.include_router(metrics.router)
@@ -1,10 +1,16 @@
+from datetime import date
 from uuid import UUID
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request, Response
 
-from app.dependencies import CurrentUser, DbSession
+from app.dependencies import CurrentUser, DbSession, ReadDbSession
+from app.models.site import Site
+from app.models.space import Space
 from app.schemas.site import SiteCreate, SiteResponse, SiteUpdate
+from app.schemas.space import SiteTimelineResponse, SpaceDayRuns
 from app.services.site_service import SiteService
+from app.services.space_service import SpaceService
+from app.utils.etag import compute_etag, etag_matches, not_modified
 
 router = APIRouter(prefix="/sites", tags=["sites"])
 
@@ -14,7 +20,14 @@ def _get_ip(request: Request) -> str | None:
 
 
 @router.get("", response_model=list[SiteResponse])
-async def list_sites(db: DbSession, current_user: CurrentUser) -> list[SiteResponse]:
+async def list_sites(
+    request: Request, response: Response, db: DbSession, current_user: CurrentUser
+) -> list[SiteResponse] | Response:
+    etag = await compute_etag(db, [Site, Space])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
     svc = SiteService(db, current_user)
     sites = await svc.list()
     results = []
@@ -50,6 +63,32 @@ async def get_site(
     )
 
 
+@router.get("/{site_id}/timeline", response_model=SiteTimelineResponse)
+async def get_site_timeline(
+    site_id: UUID,
+    db: ReadDbSession,
+    current_user: CurrentUser,
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+) -> SiteTimelineResponse:
+    """Day bitmap of every space for a Gantt view, run-length encoded.
+
+    `from` and `to` are inclusive; each space's runs alternate free and
+    occupied days, starting with free, and sum to the number of days.
+    """
+    svc = SpaceService(db, current_user)
+    rows = await svc.site_timeline(site_id, start, end)
+    return SiteTimelineResponse(
+        site_id=site_id,
+        start=start,
+        end=end,
+        spaces=[
+            SpaceDayRuns(space_id=space_id, name=name, runs=runs)
+            for space_id, name, runs in rows
+        ],
+    )
+
+
 @router.post("", response_model=SiteResponse, status_code=201)
 async def create_site(
     data: SiteCreate,
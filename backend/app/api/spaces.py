@@ -1,12 +1,32 @@
+from datetime import date, timedelta
 from uuid import UUID
 
 from fastapi import APIRouter, Query, Request
-
-from app.dependencies import CurrentUser, DbSession
+from fastapi.responses import Response
+
+from app.dependencies import (
+    CurrentUser,
+    DbSession,
+    Idempotency,
+    IfMatch,
+    ReadDbSession,
+)
+from app.models.site import Site
 from app.models.space import Space
 from app.models.tag import Tag
-from app.schemas.space import SpaceBatchCreate, SpaceCreate, SpaceResponse, SpaceUpdate
+from app.schemas.space import (
+    OccupiedRange,
+    SpaceBatchCreate,
+    SpaceCreate,
+    SpaceResponse,
+    SpaceTimelineResponse,
+    SpaceUpdate,
+    TimelineRange,
+)
 from app.services.space_service import SpaceService
+from app.utils.etag import compute_etag, etag_matches, not_modified
+from app.utils.pricing import PricingCatalog
+from app.utils.responses import list_response
 
 router = APIRouter(prefix="/spaces", tags=["spaces"])
 
@@ -17,7 +37,7 @@ def _get_ip(request: Request) -> str | None:
 
 def _to_response(
     s: Space,
-    all_tags: list[Tag] | None = None,
+    catalog: PricingCatalog | None = None,
     svc: SpaceService | None = None,
     computed_status: str | None = None,
     active_agreement_id: UUID | None = None,
@@ -32,9 +52,10 @@ def _to_response(
         site_name=s.site.name if s.site else None,
         computed_status=computed_status,
         active_agreement_id=active_agreement_id,
+        version=s.version,
     )
-    if svc and all_tags is not None:
-        pricing = svc.compute_pricing(s, all_tags)
+    if svc and catalog is not None:
+        pricing = svc.compute_pricing(s, catalog)
         resp.effective_monthly_price = pricing["monthly"]
         resp.effective_daily_price = pricing["daily"]
         resp.price_tier = pricing["tier"]
@@ -42,35 +63,57 @@ def _to_response(
     return resp
 
 
+async def _space_responses(
+    svc: SpaceService,
+    spaces: list[Space],
+    active: dict[UUID, UUID] | None = None,
+) -> list[SpaceResponse]:
+    """Responses for spaces with their site already attached.
+
+    Two queries (tags, active agreements) whatever the number of spaces;
+    one when the active agreements are passed in.
+    """
+    catalog = await svc.load_catalog()
+    if active is None:
+        active = await svc.resolve_active_agreements([s.id for s in spaces])
+    return [
+        _to_response(
+            s,
+            catalog,
+            svc,
+            computed_status="occupied" if s.id in active else "available",
+            active_agreement_id=active.get(s.id),
+        )
+        for s in spaces
+    ]
+
+
 @router.get("", response_model=list[SpaceResponse])
 async def list_spaces(
-    db: DbSession,
+    request: Request,
+    db: ReadDbSession,
     current_user: CurrentUser,
     site_id: UUID | None = Query(None),
     status: str | None = Query(None),
     tag: str | None = Query(None),
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
-) -> list[SpaceResponse]:
+) -> Response:
     svc = SpaceService(db, current_user)
     spaces = await svc.list(site_id=site_id, status=status, tag=tag, offset=offset, limit=limit)
-    all_tags = await svc.get_all_tags()
-
-    # Compute status and active agreements for all spaces
-    results = []
-    for s in spaces:
-        computed_status = await svc.compute_status(s.id)
-        active_agreement = await svc.get_active_agreement(s.id)
-        results.append(
-            _to_response(
-                s,
-                all_tags,
-                svc,
-                computed_status=computed_status,
-                active_agreement_id=active_agreement.id if active_agreement else None,
-            )
-        )
-    return results
+    # Pricing also depends on sites and tags; the computed status only on
+    # the listed spaces' agreements active today
+    active = await svc.resolve_active_agreements([s.id for s in spaces])
+    etag = await compute_etag(
+        db, [Space, Site, Tag], date.today(), sorted(active.items())
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    results = await _space_responses(svc, spaces, active)
+    response = list_response(SpaceResponse, results)
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.post("/batch", response_model=list[SpaceResponse], status_code=201)
@@ -79,27 +122,14 @@ async def batch_create_spaces(
     request: Request,
     db: DbSession,
     current_user: CurrentUser,
-) -> list[SpaceResponse]:
+    idempotency: Idempotency,
+) -> list[SpaceResponse] | Response:
+    if replay := await idempotency.begin():
+        return replay
     svc = SpaceService(db, current_user, _get_ip(request))
     spaces = await svc.batch_create(data)
-    # Re-fetch with site relationships loaded
-    all_tags = await svc.get_all_tags()
-    result = []
-    for space in spaces:
-        loaded = await svc.get(space.id)
-        # Compute status
-        computed_status = await svc.compute_status(loaded.id)
-        active_agreement = await svc.get_active_agreement(loaded.id)
-        result.append(
-            _to_response(
-                loaded,
-                all_tags,
-                svc,
-                computed_status=computed_status,
-                active_agreement_id=active_agreement.id if active_agreement else None,
-            )
-        )
-    return result
+    result = await _space_responses(svc, spaces)
+    return await idempotency.store(result, 201)
 
 
 @router.get("/{space_id}", response_model=SpaceResponse)
@@ -108,7 +138,7 @@ async def get_space(
 ) -> SpaceResponse:
     svc = SpaceService(db, current_user)
     space = await svc.get(space_id)
-    all_tags = await svc.get_all_tags()
+    catalog = await svc.load_catalog()
 
     # Compute status
     computed_status = await svc.compute_status(space.id)
@@ -116,13 +146,42 @@ async def get_space(
 
     return _to_response(
         space,
-        all_tags,
+        catalog,
         svc,
         computed_status=computed_status,
         active_agreement_id=active_agreement.id if active_agreement else None,
     )
 
 
+@router.get("/{space_id}/timeline", response_model=SpaceTimelineResponse)
+async def get_space_timeline(
+    space_id: UUID,
+    db: ReadDbSession,
+    current_user: CurrentUser,
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+) -> SpaceTimelineResponse:
+    """Occupied intervals (overlapping agreements merged) and gaps.
+
+    `from` and `to` and every returned interval are inclusive days.
+    """
+    svc = SpaceService(db, current_user)
+    occupied, free = await svc.timeline(space_id, start, end)
+    last = timedelta(days=1)
+    return SpaceTimelineResponse(
+        space_id=space_id,
+        start=start,
+        end=end,
+        occupied=[
+            OccupiedRange(
+                start=o.start, end=o.end - last, agreement_ids=o.agreement_ids
+            )
+            for o in occupied
+        ],
+        gaps=[TimelineRange(start=lo, end=hi - last) for lo, hi in free],
+    )
+
+
 @router.post("", response_model=SpaceResponse, status_code=201)
 async def create_space(
     data: SpaceCreate,
@@ -132,21 +191,8 @@ async def create_space(
 ) -> SpaceResponse:
     svc = SpaceService(db, current_user, _get_ip(request))
     space = await svc.create(data)
-    # Re-fetch with site relationship loaded
-    space = await svc.get(space.id)
-    all_tags = await svc.get_all_tags()
-
-    # Compute status
-    computed_status = await svc.compute_status(space.id)
-    active_agreement = await svc.get_active_agreement(space.id)
-
-    return _to_response(
-        space,
-        all_tags,
-        svc,
-        computed_status=computed_status,
-        active_agreement_id=active_agreement.id if active_agreement else None,
-    )
+    [response] = await _space_responses(svc, [space])
+    return response
 
 
 @router.put("/{space_id}", response_model=SpaceResponse)
@@ -156,24 +202,12 @@ async def update_space(
     request: Request,
     db: DbSession,
     current_user: CurrentUser,
+    if_match: IfMatch,
 ) -> SpaceResponse:
     svc = SpaceService(db, current_user, _get_ip(request))
-    space = await svc.update(space_id, data)
-    # Re-fetch with site relationship loaded
-    space = await svc.get(space.id)
-    all_tags = await svc.get_all_tags()
-
-    # Compute status
-    computed_status = await svc.compute_status(space.id)
-    active_agreement = await svc.get_active_agreement(space.id)
-
-    return _to_response(
-        space,
-        all_tags,
-        svc,
-        computed_status=computed_status,
-        active_agreement_id=active_agreement.id if active_agreement else None,
-    )
+    space = await svc.update(space_id, data, if_match)
+    [response] = await _space_responses(svc, [space])
+    return response
 
 
 @router.delete("/{space_id}", status_code=204)
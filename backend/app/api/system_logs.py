@@ -1,29 +1,43 @@
 import csv
 import io
+from datetime import datetime
 from uuid import UUID
 
 from fastapi import APIRouter, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 
-from app.dependencies import CurrentUser, DbSession
+from app.dependencies import CurrentUser, ReadDbSession
 from app.models.system_log import SystemLog
 from app.schemas.system_log import SystemLogResponse
+from app.utils.json_filters import json_contains, parse_json_filter
 
 router = APIRouter(prefix="/system-logs", tags=["system-logs"])
 
 
 @router.get("", response_model=list[SystemLogResponse])
 async def list_system_logs(
-    db: DbSession,
+    db: ReadDbSession,
     current_user: CurrentUser,
     action: str | None = Query(None),
     table_name: str | None = Query(None),
     record_id: UUID | None = Query(None),
     user_id: UUID | None = Query(None),
+    old_values: str | None = Query(None),
+    new_values: str | None = Query(None),
+    metadata: str | None = Query(None),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
 ) -> list[SystemLogResponse]:
+    """Audit log, newest first.
+
+    `old_values`, `new_values` and `metadata` are JSON objects and keep the
+    entries containing every given key/value pair, e.g.
+    `new_values={"bank_reference": "TXN-1"}`. `created_from` is inclusive,
+    `created_to` exclusive.
+    """
     stmt = select(SystemLog)
     if action:
         stmt = stmt.where(SystemLog.action == action)
@@ -33,6 +47,18 @@ async def list_system_logs(
         stmt = stmt.where(SystemLog.record_id == record_id)
     if user_id:
         stmt = stmt.where(SystemLog.user_id == user_id)
+    dialect = db.get_bind().dialect.name
+    for column, raw in (
+        (SystemLog.old_values, old_values),
+        (SystemLog.new_values, new_values),
+        (SystemLog.metadata_, metadata),
+    ):
+        if raw is not None:
+            stmt = stmt.where(json_contains(column, parse_json_filter(raw), dialect))
+    if created_from:
+        stmt = stmt.where(SystemLog.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(SystemLog.created_at < created_to)
     stmt = stmt.order_by(SystemLog.created_at.desc()).offset(offset).limit(limit)
     result = await db.execute(stmt)
     logs = result.scalars().all()
@@ -41,7 +67,7 @@ async def list_system_logs(
 
 @router.get("/export", response_class=StreamingResponse)
 async def export_system_logs(
-    db: DbSession,
+    db: ReadDbSession,
     current_user: CurrentUser,
     action: str | None = Query(None),
     table_name: str | None = Query(None),
@@ -80,7 +106,7 @@ async def export_system_logs(
 
 @router.get("/{log_id}", response_model=SystemLogResponse)
 async def get_system_log(
-    log_id: UUID, db: DbSession, current_user: CurrentUser
+    log_id: UUID, db: ReadDbSession, current_user: CurrentUser
 ) -> SystemLogResponse:
     from app.utils.errors import NotFoundError
 
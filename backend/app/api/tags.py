@@ -1,10 +1,12 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 
 from app.dependencies import CurrentUser, DbSession
+from app.models.tag import Tag
 from app.schemas.tag import TagCreate, TagResponse, TagUpdate
 from app.services.tag_service import TagService
+from app.utils.etag import compute_etag, etag_matches, not_modified
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
@@ -14,7 +16,14 @@ def _get_ip(request: Request) -> str | None:
 
 
 @router.get("", response_model=list[TagResponse])
-async def list_tags(db: DbSession, current_user: CurrentUser) -> list[TagResponse]:
+async def list_tags(
+    request: Request, response: Response, db: DbSession, current_user: CurrentUser
+) -> list[TagResponse] | Response:
+    etag = await compute_etag(db, [Tag])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
     svc = TagService(db, current_user)
     tags = await svc.list()
     return [TagResponse.model_validate(t) for t in tags]
@@ -1,19 +1,79 @@
-from collections.abc import AsyncGenerator
+import asyncio
+import hashlib
+import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Annotated
+from uuid import uuid4
 
+from fastapi import Depends
+from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
 from app.config import settings
+from app.utils.metrics import instrument_engine_metrics, register_pool_gauges
+from app.utils.query_stats import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def pooler_connect_args(database_url: str) -> dict:
+    """asyncpg arguments for a PgBouncer/Supavisor transaction-mode pooler.
+
+    Consecutive transactions may run on different server backends, so no
+    prepared statement can be reused: both asyncpg's and SQLAlchemy's
+    statement caches are off, and every statement gets a unique name so it
+    never collides with one left behind on the backend by another client.
+    """
+    if "+asyncpg" not in database_url:
+        return {}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": _unique_statement_name,
+    }
+
+
+def engine_options(database_url: str, transaction_pooler: bool = False) -> dict:
+    """Pool tuning from settings; SQLite uses its own single-file pools."""
+    if database_url.startswith("sqlite"):
+        return {}
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if transaction_pooler:
+        options["connect_args"] = pooler_connect_args(database_url)
+    return options
+
 
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
-    pool_pre_ping=True,
+    **engine_options(settings.database_url, settings.db_transaction_pooler),
 )
 
+if settings.query_stats_enabled:
+    instrument_engine(engine.sync_engine)
+
+if settings.metrics_enabled:
+    instrument_engine_metrics(engine.sync_engine)
+    register_pool_gauges(engine.sync_engine)
+
 async_session_factory = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -27,3 +87,168 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             yield session
         finally:
             await session.close()
+
+
+# Replay lag in seconds; 0 when the replica has replayed everything received
+# (pg_last_xact_replay_timestamp alone keeps growing while the primary idles)
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+_LAG_CHECK_TIMEOUT = 2.0
+
+
+@dataclass
+class _Replica:
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    lag: float | None = None  # None: unreachable or not checked yet
+    checked_at: float = float("-inf")
+
+
+class ReplicaRouter:
+    """Round-robin over read replicas, skipping unreachable or lagging ones.
+
+    Replica lag is measured every `check_interval` seconds by a background
+    task (`run`); `pick` only reads the last measurements, so no request
+    waits for a probe. A replica whose measurement is overdue (the task is
+    stuck or stopped) counts as unknown, like one not measured yet.
+    """
+
+    def __init__(self, urls: list[str], max_lag: float, check_interval: float) -> None:
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._replicas: list[_Replica] = []
+        for url in urls:
+            replica_engine = create_async_engine(
+                url, **engine_options(url, settings.db_transaction_pooler)
+            )
+            if replica_engine.dialect.name == "postgresql":
+                replica_engine = replica_engine.execution_options(
+                    postgresql_readonly=True
+                )
+            self._replicas.append(
+                _Replica(
+                    replica_engine,
+                    async_sessionmaker(
+                        replica_engine,
+                        class_=AsyncSession,
+                        expire_on_commit=False,
+                        info={"replica": True},
+                    ),
+                )
+            )
+        self._next = 0
+
+    async def _measure_lag(self, replica: _Replica) -> float:
+        if replica.engine.dialect.name != "postgresql":
+            return 0.0
+        async with replica.engine.connect() as conn:
+            lag = (await conn.execute(_REPLICA_LAG_SQL)).scalar_one()
+        return float(lag or 0)
+
+    async def _check(self, replica: _Replica) -> None:
+        try:
+            replica.lag = await asyncio.wait_for(
+                self._measure_lag(replica), timeout=_LAG_CHECK_TIMEOUT
+            )
+        except Exception:
+            logger.warning("Read replica %s unreachable", replica.engine.url)
+            replica.lag = None
+        replica.checked_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Measure every replica's lag, concurrently."""
+        await asyncio.gather(*(self._check(replica) for replica in self._replicas))
+
+    async def run(self) -> None:
+        """Background job: refresh the lag measurements every check_interval."""
+        if not self._replicas:
+            return
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.check_interval)
+
+    def pick(self) -> async_sessionmaker[AsyncSession] | None:
+        """The next healthy replica's session factory, or None for the primary."""
+        # Two missed refreshes, each allowed its probe timeout
+        stale_before = time.monotonic() - 2 * (self.check_interval + _LAG_CHECK_TIMEOUT)
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[self._next % len(self._replicas)]
+            self._next += 1
+            if (
+                replica.lag is not None
+                and replica.lag <= self.max_lag
+                and replica.checked_at >= stale_before
+            ):
+                return replica.session_factory
+        return None
+
+
+replica_router = ReplicaRouter(
+    settings.database_replica_urls,
+    max_lag=settings.replica_max_lag_seconds,
+    check_interval=settings.replica_lag_check_interval,
+)
+
+
+async def get_read_db(
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes: a healthy replica, else the primary.
+
+    Only for routes that never write and don't need to see the caller's own
+    just-committed writes. Without replicas this is the request's primary
+    session, so no second connection is taken.
+    """
+    session_factory = replica_router.pick()
+    if session_factory is None:
+        yield db
+        return
+    async with session_factory() as session:
+        yield session
+
+
+def is_replica(db: AsyncSession) -> bool:
+    """True for a get_read_db session served by a (possibly lagging) replica."""
+    return db.info.get("replica", False)
+
+
+def _lock_key(name: str) -> int:
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@asynccontextmanager
+async def job_lock(name: str) -> AsyncIterator[bool]:
+    """Whether this worker runs the periodic job `name` this time.
+
+    Every worker schedules the same jobs. On Postgres the first one to wake
+    takes a transaction-level advisory lock for the duration of the run (it
+    also works through a transaction-mode pooler) and the others, finding
+    it taken, skip the run. SQLite means a single process, which always
+    runs it.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    async with engine.connect() as conn, conn.begin():
+        acquired = await conn.scalar(
+            select(func.pg_try_advisory_xact_lock(_lock_key(name)))
+        )
+        yield bool(acquired)
+
+
+def pool_status() -> dict | None:
+    """Checked-out connections and saturation of the engine's queue pool."""
+    pool = engine.sync_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    capacity = pool.size() + settings.db_max_overflow
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
@@ -1,24 +1,24 @@
+from collections.abc import AsyncGenerator
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.admin_user import AdminUser
-from app.utils.auth import decode_access_token
+from app.services.idempotency import IdempotencyGuard
+from app.utils.auth import STREAM_TOKEN_SCOPE, decode_access_token
+from app.utils.etag import parse_if_match
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> AdminUser:
+async def _token_user(token: str, scope: str | None, db: AsyncSession) -> AdminUser:
     payload = decode_access_token(token)
-    if payload is None:
+    if payload is None or payload.get("scope") != scope:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="無效的認證令牌",
@@ -42,6 +42,44 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> AdminUser:
+    # Stream tokens carry a scope and open nothing but the event stream
+    return await _token_user(token, None, db)
+
+
+async def get_stream_user(
+    token: Annotated[str, Query(description="POST /events/token 取得的令牌")],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> AdminUser:
+    return await _token_user(token, STREAM_TOKEN_SCOPE, db)
+
+
+async def get_idempotency(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[AdminUser, Depends(get_current_user)],
+) -> AsyncGenerator[IdempotencyGuard, None]:
+    guard = IdempotencyGuard(request, db, current_user.id)
+    try:
+        yield guard
+    finally:
+        # A request that failed before completing rolls back with its claim,
+        # so the client may retry it
+        await guard.release()
+
+
+def get_if_match(if_match: Annotated[str | None, Header()] = None) -> int | None:
+    """Row version the client last saw, for conditional updates."""
+    return parse_if_match(if_match)
+
+
 # Type aliases for cleaner route signatures
 DbSession = Annotated[AsyncSession, Depends(get_db)]
+ReadDbSession = Annotated[AsyncSession, Depends(get_read_db)]
 CurrentUser = Annotated[AdminUser, Depends(get_current_user)]
+StreamUser = Annotated[AdminUser, Depends(get_stream_user)]
+Idempotency = Annotated[IdempotencyGuard, Depends(get_idempotency)]
+IfMatch = Annotated[int | None, Depends(get_if_match)]
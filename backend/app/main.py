@@ -1,23 +1,77 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, Request
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.api.router import api_router, root_router
 from app.config import settings
-from app.utils.errors import BusinessError, DuplicateError, NotFoundError
+from app.database import async_session_factory, engine, replica_router
+from app.services.event_bus import event_bus
+from app.services.idempotency import run_idempotency_purge
+from app.services.overdue_tracker import run_daily_rollover
+from app.services.warmup import (
+    build_lookup_indexes,
+    drain,
+    drain_on_signal,
+    warm_up,
+)
+from app.utils.compression import CompressionMiddleware
+from app.utils.drain import DrainMiddleware, request_tracker
+from app.utils.errors import (
+    BusinessError,
+    DuplicateError,
+    IdempotencyConflictError,
+    NotFoundError,
+    PreconditionFailedError,
+)
+from app.utils.metrics import MetricsMiddleware
+from app.utils.query_stats import QueryStatsMiddleware
+from app.utils.responses import FastJSONResponse
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Refuse to start with dev-default secrets in production."""
+    """Refuse to start with dev-default secrets in production.
+
+    Warms up the pool, hot statements and caches before serving and builds
+    the lookup indexes in the background, runs the daily overdue-payment
+    rollover, the idempotency-key purge, the replica lag checks and the
+    space event bus for the lifetime of the app, and drains in-flight
+    requests from the shutdown signal on.
+    """
     if not settings.debug:
         if settings.jwt_secret_key == "dev-secret-change-in-production":
             raise RuntimeError("JWT_SECRET_KEY must be set in production (not dev default)")
         if settings.encryption_key == "1tGkwxGdZgqzWY8sF0C--shdR3n8_PqAJkreObb--tU=":
             raise RuntimeError("ENCRYPTION_KEY must be set in production (not dev default)")
+
+    uninstall_drain = drain_on_signal(request_tracker, settings.shutdown_drain_timeout)
+    if settings.warmup_enabled:
+        app.state.warmup = await warm_up(
+            engine, async_session_factory, settings.warmup_pool_connections
+        )
+    await event_bus.start()
+    tasks = [
+        asyncio.create_task(run_daily_rollover()),
+        asyncio.create_task(run_idempotency_purge()),
+        asyncio.create_task(replica_router.run()),
+    ]
+    if settings.warmup_enabled:
+        tasks.append(asyncio.create_task(build_lookup_indexes(async_session_factory)))
     yield
+    uninstall_drain()
+    if not request_tracker.draining:  # stopped without a signal
+        await drain(request_tracker, settings.shutdown_drain_timeout)
+    await event_bus.stop()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await engine.dispose()
 
 
 app = FastAPI(
@@ -26,6 +80,9 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     lifespan=lifespan,
+    # Wrapped in Default so FastAPI keeps its own dump_json path for routes
+    # with a response_model where it has one
+    default_response_class=Default(FastJSONResponse),
 )
 
 # CORS
@@ -37,6 +94,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        flush_size=settings.compression_flush_size,
+    )
+
+if settings.query_stats_enabled:
+    app.add_middleware(
+        QueryStatsMiddleware,
+        n_plus_one_threshold=settings.query_stats_n_plus_one_threshold,
+    )
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Outermost: counts every request, refuses new ones while draining
+app.add_middleware(DrainMiddleware, tracker=request_tracker)
+
 
 # Exception handlers
 @app.exception_handler(NotFoundError)
@@ -57,6 +135,32 @@ async def duplicate_error_handler(
     )
 
 
+@app.exception_handler(IdempotencyConflictError)
+async def idempotency_conflict_handler(
+    request: Request, exc: IdempotencyConflictError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=409,
+        content={"code": exc.code, "message": exc.message},
+    )
+
+
+@app.exception_handler(PreconditionFailedError)
+async def precondition_failed_handler(
+    request: Request, exc: PreconditionFailedError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=412,
+        content={"code": exc.code, "message": exc.message},
+    )
+
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError) -> JSONResponse:
+    # The row's version moved between our read and our UPDATE
+    return await precondition_failed_handler(request, PreconditionFailedError())
+
+
 @app.exception_handler(BusinessError)
 async def business_error_handler(
     request: Request, exc: BusinessError
@@ -2,10 +2,12 @@ from app.models.admin_user import AdminUser
 from app.models.agreement import Agreement
 from app.models.base import Base
 from app.models.customer import Customer
+from app.models.idempotency_key import IdempotencyKey
 from app.models.payment import Payment
 from app.models.site import Site
 from app.models.space import Space
 from app.models.system_log import SystemLog
+from app.models.table_version import TableVersion
 from app.models.tag import Tag
 
 __all__ = [
@@ -18,4 +20,6 @@ __all__ = [
     "Agreement",
     "Payment",
     "SystemLog",
+    "IdempotencyKey",
+    "TableVersion",
 ]
@@ -1,7 +1,7 @@
 from datetime import date, datetime
 from uuid import UUID
 
-from sqlalchemy import Date, ForeignKey, Integer, String, Text
+from sqlalchemy import Date, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin, UUIDMixin
@@ -9,11 +9,17 @@ from app.models.base import Base, TimestampMixin, UUIDMixin
 
 class Agreement(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "agreements"
+    __table_args__ = (
+        # Space timelines and overlap checks: one space, a date range
+        Index("ix_agreements_space_id_dates", "space_id", "start_date", "end_date"),
+        # Revenue forecast: agreements still running a year before the horizon
+        Index("ix_agreements_end_date", "end_date"),
+    )
 
     customer_id: Mapped[UUID] = mapped_column(
         ForeignKey("customers.id"), index=True
     )
-    space_id: Mapped[UUID] = mapped_column(ForeignKey("spaces.id"), index=True)
+    space_id: Mapped[UUID] = mapped_column(ForeignKey("spaces.id"))
     agreement_type: Mapped[str] = mapped_column(
         String(20)
     )  # daily, monthly, quarterly, yearly
@@ -25,6 +31,11 @@ class Agreement(UUIDMixin, TimestampMixin, Base):
     terminated_at: Mapped[datetime | None] = mapped_column()
     termination_reason: Mapped[str | None] = mapped_column(Text)
 
+    # Optimistic concurrency: every UPDATE matches on the version it read
+    version: Mapped[int] = mapped_column(server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
     # Relationships
     customer: Mapped["Customer"] = relationship(  # noqa: F821
         back_populates="agreements"
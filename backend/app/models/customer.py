@@ -1,4 +1,4 @@
-from sqlalchemy import String, Text, UniqueConstraint
+from sqlalchemy import DDL, Index, String, Text, UniqueConstraint, column, event, table
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin, UUIDMixin
@@ -8,6 +8,20 @@ class Customer(UUIDMixin, TimestampMixin, Base):
     __tablename__ = "customers"
     __table_args__ = (
         UniqueConstraint("name", "phone", name="uq_customer_name_phone"),
+        # Substring search (CustomerService.list); needs pg_trgm and a UTF-8
+        # LC_CTYPE, or CJK characters produce no trigrams
+        Index(
+            "ix_customers_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_customers_phone_trgm",
+            "phone",
+            postgresql_using="gin",
+            postgresql_ops={"phone": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
     name: Mapped[str] = mapped_column(String(100))
@@ -23,3 +37,38 @@ class Customer(UUIDMixin, TimestampMixin, Base):
 
     def __repr__(self) -> str:
         return f"Customer(id={self.id!r}, name={self.name!r})"
+
+
+# SQLite counterpart of the trigram indexes: an FTS5 trigram table holding a
+# copy of name/phone, kept in sync by triggers
+customers_fts = table(
+    "customers_fts", column("customer_id"), column("name"), column("phone")
+)
+
+_SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE customers_fts USING fts5("
+    "customer_id UNINDEXED, name, phone, tokenize='trigram')",
+    "CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN "
+    "INSERT INTO customers_fts (customer_id, name, phone) "
+    "VALUES (new.id, new.name, new.phone); END",
+    "CREATE TRIGGER customers_fts_update AFTER UPDATE OF name, phone ON customers "
+    "BEGIN UPDATE customers_fts SET name = new.name, phone = new.phone "
+    "WHERE customer_id = old.id; END",
+    "CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN "
+    "DELETE FROM customers_fts WHERE customer_id = old.id; END",
+]
+
+event.listen(
+    Customer.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+for _statement in _SQLITE_FTS_DDL:
+    event.listen(
+        Customer.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    Customer.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS customers_fts").execute_if(dialect="sqlite"),
+)
@@ -22,6 +22,11 @@ class Payment(UUIDMixin, TimestampMixin, Base):
     bank_reference: Mapped[str | None] = mapped_column(String(100))
     notes: Mapped[str | None] = mapped_column(Text)
 
+    # Optimistic concurrency: every UPDATE matches on the version it read
+    version: Mapped[int] = mapped_column(server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
     # Relationships
     agreement: Mapped["Agreement"] = relationship(  # noqa: F821
         back_populates="payment"
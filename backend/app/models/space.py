@@ -20,6 +20,11 @@ class Space(UUIDMixin, TimestampMixin, Base):
     tags: Mapped[list[str] | None] = mapped_column(JSON, default=list)
     custom_price: Mapped[int | None] = mapped_column(Integer)
 
+    # Optimistic concurrency: every UPDATE matches on the version it read
+    version: Mapped[int] = mapped_column(server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
     # Relationships
     site: Mapped["Site"] = relationship(back_populates="spaces")  # noqa: F821
     agreements: Mapped[list["Agreement"]] = relationship(  # noqa: F821
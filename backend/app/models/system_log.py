@@ -1,26 +1,56 @@
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import JSON, String, Text, func
+from sqlalchemy import JSON, Index, String, Text, desc, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base, UUIDMixin
 
+# JSONB on Postgres: indexable, and compared by value rather than text
+JSONValues = JSON().with_variant(JSONB(), "postgresql")
+
 
 class SystemLog(UUIDMixin, Base):
     """Immutable audit log. No updated_at by design."""
 
     __tablename__ = "system_logs"
+    __table_args__ = (
+        # Containment filters (?new_values={"bank_reference": "..."}); the
+        # jsonb_path_ops opclass only serves @>, at a fraction of the size
+        *(
+            Index(
+                f"ix_system_logs_{name}_path_ops",
+                name,
+                postgresql_using="gin",
+                postgresql_ops={name: "jsonb_path_ops"},
+            ).ddl_if(dialect="postgresql")
+            for name in ("old_values", "new_values", "metadata")
+        ),
+        # The log is append-only, so created_at follows the physical order
+        # and a BRIN index of a few pages serves range filters
+        Index(
+            "ix_system_logs_created_at_brin", "created_at", postgresql_using="brin"
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_system_logs_created_at", "created_at").ddl_if(dialect="sqlite"),
+        # One record's history, newest first; also serves table_name filters
+        Index(
+            "ix_system_logs_table_record_created",
+            "table_name",
+            "record_id",
+            desc("created_at"),
+        ),
+    )
 
     user_id: Mapped[UUID | None] = mapped_column(index=True)
     action: Mapped[str] = mapped_column(String(20), index=True)
-    table_name: Mapped[str | None] = mapped_column(String(50), index=True)
+    table_name: Mapped[str | None] = mapped_column(String(50))
     record_id: Mapped[UUID | None] = mapped_column(index=True)
-    old_values: Mapped[dict | None] = mapped_column(JSON)
-    new_values: Mapped[dict | None] = mapped_column(JSON)
+    old_values: Mapped[dict | None] = mapped_column(JSONValues)
+    new_values: Mapped[dict | None] = mapped_column(JSONValues)
     ip_address: Mapped[str | None] = mapped_column(Text)
     batch_id: Mapped[UUID | None] = mapped_column(index=True)
-    metadata_: Mapped[dict | None] = mapped_column("metadata", JSON)
+    metadata_: Mapped[dict | None] = mapped_column("metadata", JSONValues)
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
 
     def __repr__(self) -> str:
@@ -35,5 +35,6 @@ class AgreementResponse(BaseModel):
     customer_name: str | None = None
     space_name: str | None = None
     payment_status: str | None = None
+    version: int
 
     model_config = {"from_attributes": True}
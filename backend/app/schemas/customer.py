@@ -1,3 +1,4 @@
+from datetime import date
 from uuid import UUID
 
 from pydantic import BaseModel, EmailStr, Field, field_validator
@@ -45,3 +46,34 @@ class CustomerResponse(BaseModel):
     active_agreement_count: int = 0
 
     model_config = {"from_attributes": True}
+
+
+class CustomerAgreementItem(BaseModel):
+    id: UUID
+    space_id: UUID
+    space_name: str
+    site_name: str
+    agreement_type: str
+    start_date: date
+    end_date: date
+    price: int
+    license_plates: str
+    terminated_at: str | None = None
+    payment_id: UUID | None = None
+    payment_amount: int | None = None
+    payment_status: str | None = None
+    payment_due_date: date | None = None
+    overdue: bool = False
+    version: int
+
+
+class CustomerTotals(BaseModel):
+    paid: int = 0
+    pending: int = 0
+    overdue: int = 0  # part of pending: active agreements past their end_date
+
+
+class CustomerOverviewResponse(BaseModel):
+    customer: CustomerResponse
+    agreements: list[CustomerAgreementItem]
+    totals: CustomerTotals
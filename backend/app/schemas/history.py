@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class FieldChange(BaseModel):
+    before: Any
+    after: Any
+
+
+class HistoryEntry(BaseModel):
+    log_id: UUID
+    action: str
+    user_id: UUID | None
+    ip_address: str | None
+    created_at: datetime
+    changes: dict[str, FieldChange]
+    # Every field known after this entry; null once the record is deleted
+    state: dict | None
+
+
+class HistoryResponse(BaseModel):
+    table: str
+    record_id: UUID
+    entries: list[HistoryEntry]  # newest first
+    # Pass as `cursor` for the next, older page; null on the last page
+    next_cursor: UUID | None
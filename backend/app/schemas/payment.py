@@ -34,5 +34,26 @@ class PaymentResponse(BaseModel):
     due_date: date | None
     bank_reference: str | None
     notes: str | None
+    version: int
 
     model_config = {"from_attributes": True}
+
+
+class OverduePaymentResponse(BaseModel):
+    id: UUID
+    agreement_id: UUID
+    amount: int
+    due_date: date | None
+    end_date: date
+    days_overdue: int
+    customer_name: str | None = None
+    space_name: str | None = None
+
+
+class OverdueReconciliationResponse(BaseModel):
+    tracked: int
+    actual: int
+    in_sync: bool
+    missing: list[UUID]
+    unexpected: list[UUID]
+    repaired: bool = False
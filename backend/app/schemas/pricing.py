@@ -0,0 +1,54 @@
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class SitePriceChange(BaseModel):
+    site_id: UUID
+    monthly_base_price: int | None = Field(None, ge=0)
+    daily_base_price: int | None = Field(None, ge=0)
+
+
+class TagPriceChange(BaseModel):
+    # Fields left out keep their current value; null clears a tag price
+    tag_id: UUID
+    monthly_price: int | None = Field(None, ge=0)
+    daily_price: int | None = Field(None, ge=0)
+
+
+class CustomPriceChange(BaseModel):
+    space_id: UUID
+    custom_price: int | None = Field(None, ge=0)  # null clears it
+
+
+class PricingSimulationRequest(BaseModel):
+    sites: list[SitePriceChange] = Field(default_factory=list)
+    tags: list[TagPriceChange] = Field(default_factory=list)
+    spaces: list[CustomPriceChange] = Field(default_factory=list)
+
+
+class PriceDelta(BaseModel):
+    spaces: int
+    affected_spaces: int  # monthly or daily price changes
+    monthly_before: int
+    monthly_after: int
+    monthly_delta: int
+    daily_before: int
+    daily_after: int
+    daily_delta: int
+
+
+class TierPriceDelta(PriceDelta):
+    tier: str  # the tier pricing the spaces after the change
+
+
+class SitePriceDelta(PriceDelta):
+    site_id: UUID
+    site_name: str
+
+
+class PricingSimulationResponse(BaseModel):
+    total: PriceDelta
+    tier_changes: int  # spaces priced by another tier after the change
+    tiers: list[TierPriceDelta]
+    sites: list[SitePriceDelta]
@@ -0,0 +1,24 @@
+from datetime import date
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class ForecastMonth(BaseModel):
+    month: date  # first day of the month
+    contracted: int
+    expected_renewals: int
+    pending_receivables: int
+    # contracted + expected_renewals; receivables are cash for revenue
+    # already counted there
+    total: int
+
+
+class RevenueForecastResponse(BaseModel):
+    site_id: UUID | None
+    as_of: date
+    months: list[ForecastMonth]
+    # Share of finished agreements of each type that were renewed
+    renewal_rates: dict[str, float]
+    # Pending payments already due before the first month
+    overdue_receivables: int
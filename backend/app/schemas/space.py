@@ -1,3 +1,4 @@
+from datetime import date
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -40,5 +41,37 @@ class SpaceResponse(BaseModel):
     # Computed status fields
     computed_status: str | None = None  # "available" or "occupied"
     active_agreement_id: UUID | None = None
+    version: int
 
     model_config = {"from_attributes": True}
+
+
+class TimelineRange(BaseModel):
+    start: date
+    end: date  # last day, inclusive
+
+
+class OccupiedRange(TimelineRange):
+    agreement_ids: list[UUID]
+
+
+class SpaceTimelineResponse(BaseModel):
+    space_id: UUID
+    start: date
+    end: date
+    occupied: list[OccupiedRange]
+    gaps: list[TimelineRange]
+
+
+class SpaceDayRuns(BaseModel):
+    space_id: UUID
+    name: str
+    # Day run lengths alternating free/occupied, starting with free
+    runs: list[int]
+
+
+class SiteTimelineResponse(BaseModel):
+    site_id: UUID
+    start: date
+    end: date
+    spaces: list[SpaceDayRuns]
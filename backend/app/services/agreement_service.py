@@ -1,8 +1,7 @@
 from datetime import date, datetime
 from uuid import UUID
 
-from dateutil.relativedelta import relativedelta
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -13,11 +12,16 @@ from app.models.payment import Payment
 from app.models.space import Space
 from app.schemas.agreement import AgreementCreate, AgreementTerminate
 from app.services.audit_logger import AuditLogger
+from app.services.event_bus import publish_space_status
+from app.services.overdue_tracker import overdue_tracker
 from app.utils.crypto import encrypt_license_plate, mask_license_plate
 from app.utils.errors import BusinessError, DoubleBookingError, NotFoundError
+from app.utils.etag import check_version
 
 
 def _calc_end_date(start: date, agreement_type: str) -> date:
+    from dateutil.relativedelta import relativedelta  # deferred: cold start
+
     if agreement_type == "daily":
         return start + relativedelta(days=1)
     elif agreement_type == "monthly":
@@ -30,12 +34,42 @@ def _calc_end_date(start: date, agreement_type: str) -> date:
 
 
 class AgreementService:
-    def __init__(self, db: AsyncSession, user: AdminUser, ip: str | None = None) -> None:
+    def __init__(
+        self, db: AsyncSession, user: AdminUser | None, ip: str | None = None
+    ) -> None:
         self.db = db
-        self.user = user
+        self.user = user  # None only for read-only system work (warm-up)
         self.ip = ip
         self.audit = AuditLogger(db)
 
+    async def summary(self) -> dict[str, int]:
+        """Dashboard counters: active agreements, pending total, free spaces."""
+        # Active agreements count
+        active_result = await self.db.execute(
+            select(func.count()).select_from(Agreement).where(
+                Agreement.terminated_at.is_(None)
+            )
+        )
+        # Pending payment total
+        pending_result = await self.db.execute(
+            select(func.coalesce(func.sum(Payment.amount), 0)).where(
+                Payment.status == "pending"
+            )
+        )
+        # Available spaces
+        available_result = await self.db.execute(
+            select(func.count()).select_from(Space).where(
+                Space.status == "available"
+            )
+        )
+        return {
+            "active_count": active_result.scalar_one(),
+            "pending_payment_total": pending_result.scalar_one(),
+            "available_space_count": available_result.scalar_one(),
+            # Overdue: active agreements past end_date with pending payment
+            "overdue_count": await overdue_tracker.count(self.db),
+        }
+
     async def list(
         self,
         customer_id: UUID | None = None,
@@ -150,12 +184,19 @@ class AgreementService:
         await self.db.commit()
 
         # Re-fetch with relationships loaded
-        return await self.get(agreement.id)
+        agreement = await self.get(agreement.id)
+        await overdue_tracker.sync_agreement(agreement)
+        await publish_space_status(self.db, agreement.space_id)
+        return agreement
 
     async def terminate(
-        self, agreement_id: UUID, data: AgreementTerminate
+        self,
+        agreement_id: UUID,
+        data: AgreementTerminate,
+        expected_version: int | None = None,
     ) -> Agreement:
         agreement = await self.get(agreement_id)
+        check_version(agreement.version, expected_version)
 
         if agreement.terminated_at is not None:
             raise BusinessError("此合約已終止")
@@ -181,4 +222,7 @@ class AgreementService:
             ip_address=self.ip,
         )
         await self.db.commit()
-        return await self.get(agreement_id)
+        agreement = await self.get(agreement_id)
+        await overdue_tracker.sync_agreement(agreement)
+        await publish_space_status(self.db, agreement.space_id)
+        return agreement
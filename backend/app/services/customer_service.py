@@ -1,16 +1,46 @@
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import date
 from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    case,
+    func,
+    literal_column,
+    select,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.admin_user import AdminUser
 from app.models.agreement import Agreement
-from app.models.customer import Customer
+from app.models.customer import Customer, customers_fts
+from app.models.payment import Payment
+from app.models.site import Site
+from app.models.space import Space
 from app.schemas.customer import CustomerCreate, CustomerUpdate
 from app.services.audit_logger import AuditLogger
+from app.services.lookup_index import customer_keys, customer_lookup
 from app.utils.errors import BusinessError, DuplicateError, NotFoundError
 
 
+@dataclass
+class CustomerOverview:
+    customer: Customer
+    # (Agreement, space name, site name, Payment | None), newest first
+    rows: list[Row]
+    totals: dict[str, int] = field(
+        default_factory=lambda: {"paid": 0, "pending": 0, "overdue": 0}
+    )
+    overdue: set[UUID] = field(default_factory=set)  # agreement IDs
+
+    @property
+    def active_count(self) -> int:
+        return sum(1 for row in self.rows if row[0].terminated_at is None)
+
+
 class CustomerService:
     def __init__(self, db: AsyncSession, user: AdminUser, ip: str | None = None) -> None:
         self.db = db
@@ -26,14 +56,50 @@ class CustomerService:
     ) -> list[Customer]:
         stmt = select(Customer)
         if search:
-            pattern = f"%{search}%"
-            stmt = stmt.where(
-                Customer.name.ilike(pattern) | Customer.phone.ilike(pattern)
-            )
-        stmt = stmt.order_by(Customer.name).offset(offset).limit(limit)
+            stmt = self._search(stmt, search)
+        else:
+            stmt = stmt.order_by(Customer.name)
+        stmt = stmt.offset(offset).limit(limit)
         result = await self.db.execute(stmt)
         return list(result.scalars().all())
 
+    def _search(self, stmt: Select, search: str) -> Select:
+        """Name or phone substring match, exact phone > phone prefix > the rest.
+
+        On Postgres the pg_trgm GIN indexes serve the ILIKE predicates. On
+        SQLite the FTS5 trigram table narrows the candidates first; the ILIKE
+        predicates still decide the result, so both backends return the same
+        rows. Trigrams need at least 3 characters: shorter searches (e.g. a
+        single CJK surname) are answered by a scan.
+        """
+        sqlite = self.db.get_bind().dialect.name == "sqlite"
+        matches: ColumnElement[bool]
+        if sqlite:
+            # LIKE already ignores ASCII case; lower() would only slow the scan
+            matches = Customer.name.contains(
+                search, autoescape=True
+            ) | Customer.phone.contains(search, autoescape=True)
+        else:
+            matches = Customer.name.icontains(
+                search, autoescape=True
+            ) | Customer.phone.icontains(search, autoescape=True)
+        stmt = stmt.where(matches)
+        if sqlite and len(search) >= 3:
+            phrase = '"' + search.replace('"', '""') + '"'
+            stmt = stmt.where(
+                Customer.id.in_(
+                    select(customers_fts.c.customer_id).where(
+                        literal_column("customers_fts").op("MATCH")(phrase)
+                    )
+                )
+            )
+        rank = case(
+            (Customer.phone == search, 0),
+            (Customer.phone.startswith(search, autoescape=True), 1),
+            else_=2,
+        )
+        return stmt.order_by(rank, Customer.name, Customer.id)
+
     async def get(self, customer_id: UUID) -> Customer:
         result = await self.db.execute(
             select(Customer).where(Customer.id == customer_id)
@@ -43,6 +109,39 @@ class CustomerService:
             raise NotFoundError("客戶")
         return customer
 
+    async def overview(
+        self, customer_id: UUID, today: date | None = None
+    ) -> CustomerOverview:
+        """The customer, their agreements and payment totals.
+
+        Two queries however many agreements there are: the customer, then
+        the agreements joined with their space, site and payment. Overdue
+        uses the overdue tracker's rule: pending, not terminated, past
+        end_date.
+        """
+        today = today or date.today()
+        customer = await self.get(customer_id)
+        result = await self.db.execute(
+            select(Agreement, Space.name, Site.name, Payment)
+            .join(Space, Agreement.space_id == Space.id)
+            .join(Site, Space.site_id == Site.id)
+            .outerjoin(Payment, Payment.agreement_id == Agreement.id)
+            .where(Agreement.customer_id == customer_id)
+            .order_by(Agreement.start_date.desc(), Agreement.id)
+        )
+        overview = CustomerOverview(customer, list(result.all()))
+        for agreement, _, _, payment in overview.rows:
+            if payment is None:
+                continue
+            if payment.status == "completed":
+                overview.totals["paid"] += payment.amount
+            elif payment.status == "pending":
+                overview.totals["pending"] += payment.amount
+                if agreement.terminated_at is None and agreement.end_date < today:
+                    overview.totals["overdue"] += payment.amount
+                    overview.overdue.add(agreement.id)
+        return overview
+
     async def get_active_agreement_count(self, customer_id: UUID) -> int:
         result = await self.db.execute(
             select(func.count())
@@ -54,6 +153,25 @@ class CustomerService:
         )
         return result.scalar_one()
 
+    async def get_active_agreement_counts(
+        self, customer_ids: Sequence[UUID]
+    ) -> dict[UUID, int]:
+        """Active agreement count per customer, in one query.
+
+        Customers missing from the result have none.
+        """
+        if not customer_ids:
+            return {}
+        result = await self.db.execute(
+            select(Agreement.customer_id, func.count())
+            .where(
+                Agreement.customer_id.in_(customer_ids),
+                Agreement.terminated_at.is_(None),
+            )
+            .group_by(Agreement.customer_id)
+        )
+        return {customer_id: count for customer_id, count in result.all()}
+
     async def create(self, data: CustomerCreate) -> Customer:
         # Check unique constraint (name, phone)
         existing = await self.db.execute(
@@ -77,6 +195,9 @@ class CustomerService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await customer_lookup.update(
+            customer.id, customer_keys(customer.name, customer.phone)
+        )
         return customer
 
     async def update(self, customer_id: UUID, data: CustomerUpdate) -> Customer:
@@ -100,6 +221,7 @@ class CustomerService:
                 raise DuplicateError("客戶", "姓名與電話")
 
         old_values = {k: getattr(customer, k) for k in update_data}
+        old_keys = customer_keys(customer.name, customer.phone)
         for key, value in update_data.items():
             setattr(customer, key, value)
 
@@ -113,6 +235,9 @@ class CustomerService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await customer_lookup.update(
+            customer.id, customer_keys(customer.name, customer.phone), old_keys
+        )
         return customer
 
     async def delete(self, customer_id: UUID) -> None:
@@ -134,3 +259,6 @@ class CustomerService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await customer_lookup.remove(
+            customer_id, customer_keys(customer.name, customer.phone)
+        )
@@ -0,0 +1,339 @@
+"""In-process event bus for pushing space changes to SSE clients.
+
+Services publish compact deltas after commit; `GET /events/spaces` streams
+them to subscribers filtered by site. With EVENT_BUS_BACKEND=postgres every
+publish goes through Postgres NOTIFY and each worker LISTENs on a dedicated
+connection, so subscribers on any uvicorn worker see changes made on any
+other. LISTEN needs a session-level connection (not a transaction-mode
+pooler).
+
+Subscribers that fall behind, or that may have missed events while the
+LISTEN connection was down, get a `resync` event telling them to reload.
+
+The bus also keeps per-worker caches (the overdue tracker, the lookup
+indexes) coherent: `broadcast` applies an internal event to this worker's
+cache at once and to every other worker's through NOTIFY. Internal events
+are never streamed to SSE subscribers. With the local backend there is no
+other worker to reach, so running more than one worker or machine needs
+EVENT_BUS_BACKEND=postgres.
+"""
+
+import asyncio
+import json
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, TypeVar
+from uuid import UUID, uuid4
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.agreement import Agreement
+from app.models.payment import Payment
+from app.models.space import Space
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "space_events"
+# Internal event telling every worker to reload its caches
+CACHE_RESYNC = "cache.resync"
+QUEUE_SIZE = 256
+RECONNECT_DELAY = 5.0
+# pg_notify refuses payloads from 8000 bytes; the rest is left for the envelope
+BATCH_PAYLOAD_BYTES = 7000
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Event:
+    type: str
+    site_id: UUID | None  # None: delivered to every subscriber
+    data: dict[str, Any] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return _json({"type": self.type, "site_id": self.site_id, "data": self.data})
+
+    @classmethod
+    def from_json(cls, payload: str) -> "Event":
+        raw = json.loads(payload)
+        site_id = UUID(raw["site_id"]) if raw["site_id"] else None
+        return cls(raw["type"], site_id, raw["data"])
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def payload_batches(items: Iterable[T]) -> Iterator[list[T]]:
+    """Split `items` into lists that each fit one event's NOTIFY payload."""
+    batch: list[T] = []
+    size = 0
+    for item in items:
+        item_size = len(_json(item).encode()) + 1
+        if batch and size + item_size > BATCH_PAYLOAD_BYTES:
+            yield batch
+            batch, size = [], 0
+        batch.append(item)
+        size += item_size
+    if batch:
+        yield batch
+
+
+def resync_event(reason: str) -> Event:
+    return Event("resync", None, {"reason": reason})
+
+
+# Sent to every subscriber when the worker drains; SSE streams end after it
+SHUTDOWN_EVENT = resync_event("shutdown")
+
+
+# Applies an internal event to worker-local state; must not block
+Handler = Callable[[Event], None]
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", site_id: UUID | None) -> None:
+        self.site_id = site_id
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(QUEUE_SIZE)
+        self._bus = bus
+
+    def wants(self, event: Event) -> bool:
+        return (
+            self.site_id is None
+            or event.site_id is None
+            or event.site_id == self.site_id
+        )
+
+    def put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog, let the client reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync_event("overflow"))
+
+    def close(self) -> None:
+        self._bus._subscribers.discard(self)
+
+
+class EventBus:
+    def __init__(self) -> None:
+        self._subscribers: set[Subscription] = set()
+        self._conn: Any = None  # asyncpg connection in postgres mode
+        self._lock = asyncio.Lock()
+        self._listener: asyncio.Task[None] | None = None
+        self._handlers: dict[str, Handler] = {}
+        self._resync_handlers: list[Callable[[], None]] = []
+        self._handlers[CACHE_RESYNC] = lambda _: self._reset_caches()
+        # Set when a broadcast could not reach the other workers
+        self._dropped = False
+        # Tells this worker's own NOTIFY echoes from other workers' events
+        self.origin = uuid4().hex
+
+    @property
+    def has_audience(self) -> bool:
+        """False when nobody can receive events, so publishers can skip work."""
+        return self._conn is not None or bool(self._subscribers)
+
+    def subscribe(self, site_id: UUID | None = None) -> Subscription:
+        subscription = Subscription(self, site_id)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def publish_local(self, event: Event) -> None:
+        """Deliver to this worker's subscribers only."""
+        for subscription in list(self._subscribers):
+            if subscription.wants(event):
+                subscription.put(event)
+
+    def add_handler(self, type: str, handler: Handler) -> None:
+        """Apply every internal event of `type`, from any worker, with
+        `handler`."""
+        self._handlers[type] = handler
+
+    def on_resync(self, callback: Callable[[], None]) -> None:
+        """Call `callback` when events from other workers may have been lost,
+        so the cache it resets is reloaded from the database."""
+        self._resync_handlers.append(callback)
+
+    async def _notify(self, payload: str) -> None:
+        async with self._lock:  # one query at a time on the connection
+            await self._conn.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+
+    async def broadcast(self, type: str, data: dict[str, Any]) -> None:
+        """Apply an internal event in this worker now and in every other one.
+
+        Handlers always see the JSON form, whichever worker they run in.
+        """
+        handler = self._handlers.get(type)
+        if handler is None:
+            # Other workers would stream it to clients as a public event
+            logger.warning("No handler for internal %s events, not sent", type)
+            return
+        event = Event(type, None, {**data, "origin": self.origin})
+        payload = event.to_json()
+        handler(Event.from_json(payload))
+        if self._listener is None:
+            return  # local backend: no other worker to reach
+        try:
+            if self._conn is None or self._conn.is_closed():
+                raise ConnectionError("LISTEN connection is down")
+            await self._notify(payload)
+            await self._resync_others()
+        except Exception:
+            # The others reload their caches once the connection is back
+            logger.warning("Could not broadcast a %s event", type, exc_info=True)
+            self._dropped = True
+
+    async def publish(self, event: Event) -> None:
+        """Fan out an event, across workers when LISTEN/NOTIFY is running."""
+        if self._conn is None or self._conn.is_closed():
+            self.publish_local(event)
+            return
+        try:
+            await self._notify(event.to_json())
+        except Exception:
+            logger.exception("NOTIFY failed, delivering locally only")
+            self.publish_local(event)
+
+    async def start(self) -> None:
+        if settings.event_bus_backend == "postgres":
+            self._listener = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    def _on_notify(self, conn: Any, pid: int, channel: str, payload: str) -> None:
+        event = Event.from_json(payload)
+        handler = self._handlers.get(event.type)
+        if handler is None:
+            self.publish_local(event)
+        elif event.data.get("origin") != self.origin:
+            handler(event)  # our own broadcasts were applied when sent
+
+    def _reset_caches(self) -> None:
+        for callback in self._resync_handlers:
+            callback()
+
+    async def _resync_others(self) -> None:
+        """After a dropped broadcast, have every other worker reload."""
+        if self._dropped:
+            await self._notify(
+                Event(CACHE_RESYNC, None, {"origin": self.origin}).to_json()
+            )
+            self._dropped = False
+
+    async def _listen_forever(self) -> None:
+        import asyncpg
+
+        url = make_url(settings.direct_database_url).set(drivername="postgresql")
+        dsn = url.render_as_string(hide_password=False)
+        reconnecting = False
+        while True:
+            try:
+                lost = asyncio.Event()
+                self._conn = await asyncpg.connect(dsn)
+                self._conn.add_termination_listener(lambda _: lost.set())
+                await self._conn.add_listener(CHANNEL, self._on_notify)
+                if reconnecting:
+                    self._reset_caches()
+                    self.publish_local(resync_event("reconnected"))
+                await self._resync_others()
+                await lost.wait()
+                logger.warning("Event bus LISTEN connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event bus LISTEN connection failed")
+            self._conn = None
+            reconnecting = True
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+event_bus = EventBus()
+
+
+async def publish_space_status(db: AsyncSession, space_id: UUID) -> None:
+    """Publish a space's computed status as of today."""
+    if not event_bus.has_audience:
+        return
+    space = await db.get(Space, space_id)
+    if space is None:
+        return
+    today = date.today()
+    active_id = (
+        await db.execute(
+            select(Agreement.id)
+            .where(
+                Agreement.space_id == space_id,
+                Agreement.terminated_at.is_(None),
+                Agreement.start_date <= today,
+                Agreement.end_date >= today,
+            )
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+    await event_bus.publish(
+        Event(
+            "space.status",
+            space.site_id,
+            {
+                "space_id": space.id,
+                "computed_status": "occupied" if active_id else "available",
+                "active_agreement_id": active_id,
+            },
+        )
+    )
+
+
+async def publish_payment_status(db: AsyncSession, payment: Payment) -> None:
+    if not event_bus.has_audience:
+        return
+    row = (
+        await db.execute(
+            select(Space.id, Space.site_id)
+            .join(Agreement, Agreement.space_id == Space.id)
+            .where(Agreement.id == payment.agreement_id)
+        )
+    ).one_or_none()
+    if row is None:
+        return
+    await event_bus.publish(
+        Event(
+            "payment.status",
+            row.site_id,
+            {
+                "space_id": row.id,
+                "agreement_id": payment.agreement_id,
+                "payment_id": payment.id,
+                "status": payment.status,
+            },
+        )
+    )
+
+
+def space_event(type: str, space: Space) -> Event:
+    data: dict[str, Any] = {"space_id": space.id}
+    if type != "space.deleted":
+        data |= {
+            "name": space.name,
+            "status": space.status,
+            "tags": space.tags or [],
+            "custom_price": space.custom_price,
+        }
+    return Event(type, space.site_id, data)
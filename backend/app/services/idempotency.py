@@ -0,0 +1,311 @@
+"""Idempotency-Key handling for retried POSTs.
+
+A client that retries a POST with the same `Idempotency-Key` header gets the
+recorded response of the first attempt instead of a second agreement, payment
+completion or batch of spaces. Keys are scoped per admin user and kept for
+IDEMPOTENCY_TTL_HOURS.
+
+The first request claims the key with INSERT ... ON CONFLICT DO NOTHING in the
+request's own session transaction, so the claim commits together with the
+business write (and the notifications sent after that commit only go out
+once it is visible) or rolls back with it, leaving the key free for a retry.
+A duplicate arriving while the first request is still running waits at its
+INSERT for that transaction to end, then reads the key with SELECT ... FOR
+UPDATE. The status code and JSON body are recorded right after the write's
+commit; until then the claim reads as in progress, and one left without a
+response for IDEMPOTENCY_LOCK_TIMEOUT_SECONDS (the worker died in between)
+is reported as such rather than running the write a second time.
+
+Completed responses are also kept in a small per-worker LRU, so most retries
+are answered without touching the database.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, TypeVar
+from uuid import UUID
+
+import pydantic_core
+from fastapi import Request, Response
+from sqlalchemy import Insert, delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session_factory, job_lock
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.errors import BusinessError, IdempotencyConflictError
+from app.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+CACHE_SIZE = 1024
+PURGE_INTERVAL = 3600.0
+
+T = TypeVar("T")
+
+
+def request_fingerprint(method: str, path: str, query: str, body: bytes) -> str:
+    """Hash of what the key was first used for; a retry must match it."""
+    digest = hashlib.sha256(f"{method} {path}?{query}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: str
+
+    def replay(self) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+
+@dataclass(frozen=True)
+class _CacheEntry:
+    request_hash: str
+    response: StoredResponse
+    expires_at: datetime
+
+
+def _reused() -> IdempotencyConflictError:
+    return IdempotencyConflictError(
+        "此 Idempotency-Key 已用於不同的請求", "IDEMPOTENCY_KEY_REUSED"
+    )
+
+
+def _in_progress() -> IdempotencyConflictError:
+    return IdempotencyConflictError(
+        "相同 Idempotency-Key 的請求仍在處理中", "IDEMPOTENCY_IN_PROGRESS"
+    )
+
+
+def _response_lost() -> IdempotencyConflictError:
+    return IdempotencyConflictError(
+        "相同 Idempotency-Key 的請求已完成，但未能保存回應，請重新查詢資料",
+        "IDEMPOTENCY_RESPONSE_LOST",
+    )
+
+
+def _insert_ignoring_conflict(db: AsyncSession) -> Insert:
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(IdempotencyKey).on_conflict_do_nothing()
+
+
+class IdempotencyStore:
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._cache: OrderedDict[tuple[UUID, str], _CacheEntry] = OrderedDict()
+
+    def _cached(
+        self, user_id: UUID, key: str, request_hash: str
+    ) -> StoredResponse | None:
+        entry = self._cache.get((user_id, key))
+        if entry is not None and entry.expires_at <= datetime.now():
+            del self._cache[(user_id, key)]
+            entry = None
+        record_cache_lookup("idempotency", entry is not None)
+        if entry is None:
+            return None
+        self._cache.move_to_end((user_id, key))
+        if entry.request_hash != request_hash:
+            raise _reused()
+        return entry.response
+
+    def _remember(
+        self,
+        user_id: UUID,
+        key: str,
+        request_hash: str,
+        response: StoredResponse,
+        expires_at: datetime,
+    ) -> None:
+        self._cache[(user_id, key)] = _CacheEntry(request_hash, response, expires_at)
+        self._cache.move_to_end((user_id, key))
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def claim(
+        self, db: AsyncSession, user_id: UUID, key: str, request_hash: str
+    ) -> StoredResponse | None:
+        """Claim a key for this request, or return the response to replay.
+
+        The claim joins the session's transaction; the caller's commit makes
+        it permanent. Raises IdempotencyConflictError when the key belongs
+        to a different request or the first request has not recorded its
+        response.
+        """
+        cached = self._cached(user_id, key, request_hash)
+        if cached is not None:
+            return cached
+
+        now = datetime.now()
+        expires_at = now + timedelta(hours=settings.idempotency_ttl_hours)
+        while True:
+            claimed = await db.execute(
+                _insert_ignoring_conflict(db).values(
+                    user_id=user_id,
+                    key=key,
+                    request_hash=request_hash,
+                    created_at=now,
+                    expires_at=expires_at,
+                )
+            )
+            if claimed.rowcount == 1:
+                return None
+            row = (
+                await db.execute(
+                    select(IdempotencyKey)
+                    .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+                    .with_for_update()
+                )
+            ).scalar_one_or_none()
+            if row is not None:
+                break  # else purged in between: claim again
+
+        if row.expires_at > now:
+            if row.request_hash != request_hash:
+                raise _reused()
+            if row.status_code is not None:
+                response = StoredResponse(row.status_code, row.response_body or "")
+                self._remember(user_id, key, request_hash, response, row.expires_at)
+                return response
+            # Committed with its write, so the first request got past its commit
+            lost = now - timedelta(seconds=settings.idempotency_lock_timeout_seconds)
+            if row.created_at > lost:
+                raise _in_progress()
+            raise _response_lost()
+
+        # Expired: reuse it, holding the row lock until this request commits
+        row.request_hash = request_hash
+        row.status_code = None
+        row.response_body = None
+        row.created_at = now
+        row.expires_at = expires_at
+        await db.flush()
+        return None
+
+    async def complete(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        content: Any,
+    ) -> None:
+        """Record the response, once the request's own write is committed."""
+        body = pydantic_core.to_json(content).decode()
+        expires_at = datetime.now() + timedelta(hours=settings.idempotency_ttl_hours)
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(status_code=status_code, response_body=body, expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        self._remember(
+            user_id, key, request_hash, StoredResponse(status_code, body), expires_at
+        )
+
+    async def purge_expired(self, db: AsyncSession) -> int:
+        result = await db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.expires_at <= datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+
+idempotency_store = IdempotencyStore()
+
+
+async def run_idempotency_purge() -> None:
+    """Background job: delete expired keys every hour, on one worker."""
+    while True:
+        await asyncio.sleep(PURGE_INTERVAL)
+        try:
+            async with job_lock("idempotency_purge") as acquired:
+                if not acquired:
+                    continue
+                async with async_session_factory() as db:
+                    purged = await idempotency_store.purge_expired(db)
+            if purged:
+                logger.info("Purged %d expired idempotency keys", purged)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
+
+
+class IdempotencyGuard:
+    """Per-request handle used by routes that honour Idempotency-Key.
+
+    Routes call `begin()` before doing any work and return its response when
+    there is one, then pass their result through `store()`.
+    """
+
+    def __init__(self, request: Request, db: AsyncSession, user_id: UUID) -> None:
+        self.request = request
+        self.db = db
+        self.user_id = user_id
+        self.key = request.headers.get(HEADER)
+        self.claimed = False
+        self._request_hash = ""
+
+    async def begin(self) -> Response | None:
+        if self.key is None:
+            return None
+        if not self.key or len(self.key) > MAX_KEY_LENGTH:
+            raise BusinessError(
+                f"Idempotency-Key 長度須為 1 至 {MAX_KEY_LENGTH} 字元",
+                "INVALID_IDEMPOTENCY_KEY",
+            )
+        self._request_hash = request_fingerprint(
+            self.request.method,
+            self.request.url.path,
+            self.request.url.query,
+            await self.request.body(),
+        )
+        stored = await idempotency_store.claim(
+            self.db, self.user_id, self.key, self._request_hash
+        )
+        if stored is not None:
+            return stored.replay()
+        self.claimed = True
+        return None
+
+    async def store(self, result: T, status_code: int = 200) -> T:
+        if self.claimed:
+            await idempotency_store.complete(
+                self.db,
+                self.user_id,
+                self.key,
+                self._request_hash,
+                status_code,
+                result,
+            )
+            self.claimed = False
+        return result
+
+    async def release(self) -> None:
+        """Roll back a request that failed before store(), claim included.
+
+        A claim already committed with the request's write stays, so a retry
+        never runs that write again.
+        """
+        if self.claimed:
+            self.claimed = False
+            await self.db.rollback()
@@ -0,0 +1,417 @@
+"""In-process typeahead indexes for the customer and space pickers.
+
+Each index is a sorted set of `key + NUL + id bytes` entries, so a prefix
+lookup is one bisect plus a short forward scan, with no database round trip.
+The entries are packed into one bytes blob with an array of offsets, and
+writes collect in a small sorted overlay merged back in one sort now and
+then, so no write shifts millions of entries. There is no per-ID map of keys
+(it would cost more memory than the entries); writers pass the keys an
+entity had before the change. Keys are casefolded UTF-8:
+
+- customers: the name, each word of it, the suffixes of CJK words (so
+  "大明" finds 張大明) and the phone digits
+- spaces: the space name alone and as "site/space"
+
+The indexes are built from a streaming scan in the background after
+startup and kept current by the customer, space and site services after
+each commit. Like the overdue tracker, each worker holds its own copy and
+the changes are broadcast over the event bus, so every worker applies every
+other worker's writes; a worker whose LISTEN connection dropped rebuilds.
+
+Until an index is built, and for good once it would grow past
+LOOKUP_INDEX_MAX_ENTRIES (about 30 bytes each), lookups are answered from
+the database instead: customers through the trigram-indexed customer
+search (a substring match), spaces with a name prefix query.
+"""
+
+import asyncio
+import logging
+import re
+from array import array
+from bisect import bisect_left
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from contextlib import aclosing
+from itertools import accumulate
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.models.customer import Customer
+from app.models.site import Site
+from app.models.space import Space
+from app.services.event_bus import Event, event_bus, payload_batches
+from app.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_LIMIT = 10
+_SCAN_BATCH = 5_000
+# Writes held in the overlay before it is merged into the packed entries: at
+# least this many, or 1/32 of the entries, so merging stays amortized
+_COMPACT_MIN = 4_096
+_SEP = b"\x00"
+_CJK = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+_PHONE_QUERY = re.compile(r"[\d\s()+-]+")
+
+Scan = Callable[[AsyncSession], AsyncIterator[tuple[UUID, set[str]]]]
+Query = Callable[[AsyncSession, str, int], Awaitable[list[UUID]]]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.replace("\x00", "").casefold().split())
+
+
+def customer_keys(name: str, phone: str) -> set[str]:
+    full = _normalize(name)
+    keys = {full}
+    for word in full.split(" "):
+        keys.add(word)
+        if _CJK.search(word):
+            # Suffixes of two characters or more: given names, not single chars
+            keys.update(word[i:] for i in range(1, len(word) - 1))
+    digits = "".join(c for c in phone if c.isdigit())
+    if digits:
+        keys.add(digits)
+    keys.discard("")
+    return keys
+
+
+def space_keys(site_name: str, space_name: str) -> set[str]:
+    space = _normalize(space_name)
+    return {space, f"{_normalize(site_name)}/{space}"}
+
+
+def _customer_query(query: str) -> str:
+    # "0912-345 678" is typed as a phone number; match its digits
+    if _PHONE_QUERY.fullmatch(query) and any(c.isdigit() for c in query):
+        return "".join(c for c in query if c.isdigit())
+    return _normalize(query)
+
+
+async def _scan_customers(db: AsyncSession) -> AsyncIterator[tuple[UUID, set[str]]]:
+    result = await db.stream(
+        select(Customer.id, Customer.name, Customer.phone).execution_options(
+            yield_per=_SCAN_BATCH
+        )
+    )
+    try:
+        # Whole partitions: iterating row by row costs an await per row
+        async for rows in result.partitions():
+            for customer_id, name, phone in rows:
+                yield customer_id, customer_keys(name, phone)
+    finally:
+        await result.close()  # a scan stopped at the size cap
+
+
+async def _scan_spaces(db: AsyncSession) -> AsyncIterator[tuple[UUID, set[str]]]:
+    result = await db.stream(
+        select(Space.id, Site.name, Space.name)
+        .join(Site, Space.site_id == Site.id)
+        .execution_options(yield_per=_SCAN_BATCH)
+    )
+    try:
+        async for rows in result.partitions():
+            for space_id, site_name, space_name in rows:
+                yield space_id, space_keys(site_name, space_name)
+    finally:
+        await result.close()
+
+
+async def _query_customers(db: AsyncSession, query: str, limit: int) -> list[UUID]:
+    # customer_service imports this module
+    from app.services.customer_service import CustomerService
+
+    customers = await CustomerService(db, None).list(search=query, limit=limit)
+    return [c.id for c in customers]
+
+
+async def _query_spaces(db: AsyncSession, query: str, limit: int) -> list[UUID]:
+    full_name = func.lower(Site.name + "/" + Space.name)
+    result = await db.execute(
+        select(Space.id)
+        .join(Site, Space.site_id == Site.id)
+        .where(
+            func.lower(Space.name).startswith(query, autoescape=True)
+            | full_name.startswith(query, autoescape=True)
+        )
+        .order_by(func.lower(Space.name), full_name, Space.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+class _Entries:
+    """Sorted unique entries: packed in bulk, plus an overlay of recent writes.
+
+    `_removed` only ever holds packed entries and `_added` only entries that
+    are not packed.
+    """
+
+    def __init__(self, entries: list[bytes] | None = None) -> None:
+        self._pack(entries or [])
+
+    def _pack(self, entries: list[bytes]) -> None:
+        """Replace everything with `entries`, sorted and unique."""
+        self._blob = b"".join(entries)
+        self._offsets = array("I", accumulate(map(len, entries), initial=0))
+        self._count = len(entries)
+        self._added: list[bytes] = []
+        self._removed: set[bytes] = set()
+
+    def __len__(self) -> int:
+        return self._count - len(self._removed) + len(self._added)
+
+    def _packed(self, i: int) -> bytes:
+        return self._blob[self._offsets[i] : self._offsets[i + 1]]
+
+    def _find(self, entry: bytes) -> int:
+        return bisect_left(range(self._count), entry, key=self._packed)
+
+    def _is_packed(self, entry: bytes) -> bool:
+        i = self._find(entry)
+        return i < self._count and self._packed(i) == entry
+
+    def add(self, entry: bytes) -> None:
+        if entry in self._removed:
+            self._removed.discard(entry)
+            return
+        i = bisect_left(self._added, entry)
+        if i < len(self._added) and self._added[i] == entry:
+            return
+        if self._is_packed(entry):
+            return
+        self._added.insert(i, entry)
+        self._compact_if_due()
+
+    def discard(self, entry: bytes) -> None:
+        i = bisect_left(self._added, entry)
+        if i < len(self._added) and self._added[i] == entry:
+            del self._added[i]
+        elif self._is_packed(entry):
+            self._removed.add(entry)
+            self._compact_if_due()
+
+    def _compact_if_due(self) -> None:
+        if len(self._added) + len(self._removed) < max(
+            _COMPACT_MIN, self._count // 32
+        ):
+            return
+        offsets, blob, removed = self._offsets, self._blob, self._removed
+        entries = [
+            entry
+            for entry in map(blob.__getitem__, map(slice, offsets, offsets[1:]))
+            if entry not in removed
+        ]
+        entries.extend(self._added)
+        entries.sort()
+        self._pack(entries)
+
+    def scan(self, prefix: bytes) -> Iterator[bytes]:
+        """Entries starting with `prefix`, in order."""
+        added = self._added
+        i = self._find(prefix)
+        j = bisect_left(added, prefix)
+        while True:
+            while i < self._count and self._packed(i) in self._removed:
+                i += 1
+            packed = self._packed(i) if i < self._count else None
+            extra = added[j] if j < len(added) else None
+            if extra is None or (packed is not None and packed < extra):
+                entry, i = packed, i + 1
+            else:
+                entry, j = extra, j + 1
+            if entry is None or not entry.startswith(prefix):
+                return
+            yield entry
+
+
+class LookupIndex:
+    def __init__(
+        self,
+        name: str,
+        scan: Scan,
+        query_database: Query,
+        normalize_query: Callable[[str], str] = _normalize,
+    ) -> None:
+        self.name = name
+        self.event = f"cache.lookup.{name}"
+        self.max_entries = settings.lookup_index_max_entries
+        self._scan = scan
+        self._query_database = query_database
+        self._normalize_query = normalize_query
+        self._lock = asyncio.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._entries = _Entries()
+        self._loaded = False
+        self._too_large = False
+        # Changes received while a rebuild is reading the database
+        self._backlog: list[Event] | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._building: asyncio.Task[None] | None = None
+
+    def unload(self) -> None:
+        """Drop the entries; the next lookup starts a rebuild."""
+        if self._backlog is not None:
+            # The running scan may predate the lost changes: drop it as well
+            self._backlog.append(Event(self.event, None, {"reset": True}))
+            return
+        self._entries = _Entries()
+        self._loaded = False
+        self._too_large = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def too_large(self) -> bool:
+        return self._too_large
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _entries_of(entity_id: UUID, keys: Iterable[str]) -> list[bytes]:
+        return [key.encode() + _SEP + entity_id.bytes for key in keys]
+
+    def _give_up(self) -> None:
+        logger.warning(
+            "The %s lookup index exceeds %d entries; looking up in the database",
+            self.name,
+            self.max_entries,
+        )
+        self._entries = _Entries()
+        self._loaded = False
+        self._too_large = True
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """Replace the index with a fresh streaming scan."""
+        self._backlog = []
+        entries: list[bytes] = []
+        try:
+            async with aclosing(self._scan(db)) as scan:
+                async for entity_id, keys in scan:
+                    entries.extend(self._entries_of(entity_id, keys))
+                    if len(entries) > self.max_entries:
+                        break
+        except BaseException:
+            self._backlog = None
+            raise
+        backlog, self._backlog = self._backlog, None
+        if len(entries) > self.max_entries:
+            self._give_up()
+            return
+        entries.sort()
+        self._entries = _Entries(entries)
+        del entries
+        self._loaded = True
+        self._too_large = False
+        # Re-applying a change the scan already saw is harmless
+        for event in backlog:
+            self.apply(event)
+
+    async def build(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Build the index in a session of its own.
+
+        The factory is kept, so lookups can rebuild the same way after the
+        index has been dropped.
+        """
+        self._session_factory = session_factory
+        async with self._lock:
+            if self._loaded or self._too_large:
+                return
+            async with session_factory() as db:
+                await self.rebuild(db)
+
+    def _build_in_background(self) -> None:
+        if self._session_factory is None or self._building is not None:
+            return
+        self._building = asyncio.create_task(self.build(self._session_factory))
+        self._building.add_done_callback(self._built)
+
+    def _built(self, task: asyncio.Task[None]) -> None:
+        self._building = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(
+                "Building the %s lookup index failed",
+                self.name,
+                exc_info=task.exception(),
+            )
+
+    def apply(self, event: Event) -> None:
+        """Apply a change broadcast by any worker (see `update`)."""
+        if self._backlog is not None:
+            self._backlog.append(event)
+            return
+        if event.data.get("reset"):
+            self.unload()
+            return
+        if not self._loaded:
+            return
+        if "added" in event.data:
+            changes = [(entity_id, keys, ()) for entity_id, keys in event.data["added"]]
+        else:
+            changes = [(event.data["id"], event.data["keys"], event.data["old_keys"])]
+        for entity_id, keys, old_keys in changes:
+            entity_id = UUID(entity_id)
+            for entry in self._entries_of(entity_id, old_keys):
+                self._entries.discard(entry)
+            for entry in self._entries_of(entity_id, keys):
+                self._entries.add(entry)
+        if len(self._entries) > self.max_entries:
+            self._give_up()
+
+    async def update(
+        self, entity_id: UUID, keys: Iterable[str], old_keys: Iterable[str] = ()
+    ) -> None:
+        """Index `keys` for an entity, dropping its `old_keys` first."""
+        await event_bus.broadcast(
+            self.event,
+            {"id": entity_id, "keys": sorted(keys), "old_keys": sorted(old_keys)},
+        )
+
+    async def add_many(self, entities: Iterable[tuple[UUID, Iterable[str]]]) -> None:
+        """Index new entities, as few broadcasts as their keys fit in."""
+        added = [(entity_id, sorted(keys)) for entity_id, keys in entities]
+        for batch in payload_batches(added):
+            await event_bus.broadcast(self.event, {"added": batch})
+
+    async def remove(self, entity_id: UUID, keys: Iterable[str]) -> None:
+        await self.update(entity_id, (), keys)
+
+    async def invalidate(self) -> None:
+        """Have every worker rebuild, for changes touching many entities."""
+        await event_bus.broadcast(self.event, {"reset": True})
+
+    async def search(
+        self, db: AsyncSession, query: str, limit: int = LOOKUP_LIMIT
+    ) -> list[UUID]:
+        """IDs with a key starting with `query`, in key order (exact first)."""
+        normalized = self._normalize_query(query)
+        if not normalized:
+            return []
+        record_cache_lookup(f"lookup_{self.name}", self._loaded)
+        if not self._loaded:
+            if not self._too_large:
+                self._build_in_background()
+            return await self._query_database(db, normalized, limit)
+        prefix = normalized.encode()
+        found: dict[UUID, None] = {}
+        for entry in self._entries.scan(prefix):
+            found.setdefault(UUID(bytes=entry[-16:]))
+            if len(found) == limit:
+                break
+        return list(found)
+
+
+customer_lookup = LookupIndex(
+    "customers", _scan_customers, _query_customers, _customer_query
+)
+space_lookup = LookupIndex("spaces", _scan_spaces, _query_spaces)
+for _index in (customer_lookup, space_lookup):
+    event_bus.add_handler(_index.event, _index.apply)
+    event_bus.on_resync(_index.unload)
@@ -0,0 +1,269 @@
+"""In-process index of overdue payments.
+
+A payment is overdue when it is still pending, its agreement has not been
+terminated, and the agreement's end_date is before today. Instead of joining
+agreements to payments on every dashboard hit, the tracker keeps the set of
+pending payments in memory, is updated by the payment/agreement services after
+each commit, and is reconciled with the database by a daily job. Only what
+the counters and the overdue list need is kept: payment ID and end date.
+
+Each worker process holds its own tracker. Changes are broadcast over the
+event bus, so every worker applies every other worker's writes (this needs
+EVENT_BUS_BACKEND=postgres when there is more than one worker); a worker
+whose LISTEN connection dropped reloads from the database, always the
+primary. `reconcile()` compares the tracker with the full query so drift
+can be detected and repaired.
+"""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_factory, is_replica, job_lock
+from app.models.agreement import Agreement
+from app.models.payment import Payment
+from app.services.event_bus import Event, event_bus, resync_event
+from app.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_EVENT = "cache.overdue"
+
+
+@dataclass(frozen=True, slots=True)
+class OverdueEntry:
+    payment_id: UUID
+    end_date: date  # of the agreement; overdue from the day after
+
+
+@dataclass(frozen=True)
+class OverdueReconciliation:
+    tracked: int
+    actual: int
+    missing: list[UUID]  # overdue in the database but not tracked
+    unexpected: list[UUID]  # tracked but no longer overdue in the database
+
+    @property
+    def in_sync(self) -> bool:
+        return not self.missing and not self.unexpected
+
+
+class OverdueTracker:
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self._generation = 0
+        self.reset()
+
+    def reset(self) -> None:
+        # Pending payments of active agreements (-> end date), overdue or not
+        self._pending: dict[UUID, date] = {}
+        self._overdue: set[UUID] = set()
+        self._as_of: date = date.today()
+        self._loaded = False
+        # Changes received while a rebuild is reading the database
+        self._backlog: list[Event] | None = None
+        # A rebuild that started before the latest reset is discarded
+        self._generation += 1
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def _load_pending(self, db: AsyncSession) -> dict[UUID, date]:
+        result = await db.execute(
+            select(Payment.id, Agreement.end_date)
+            .join(Agreement, Payment.agreement_id == Agreement.id)
+            .where(
+                Agreement.terminated_at.is_(None),
+                Payment.status == "pending",
+            )
+        )
+        return {payment_id: end_date for payment_id, end_date in result.all()}
+
+    async def rebuild(self, db: AsyncSession, today: date | None = None) -> None:
+        """Replace the tracked state with a fresh scan of pending payments.
+
+        When the tracker is reset during the scan (changes may have been
+        lost meanwhile) the scan is dropped and the tracker stays unloaded.
+        """
+        generation = self._generation
+        self._backlog = []
+        try:
+            pending = await self._load_pending(db)
+        except BaseException:
+            if generation == self._generation:
+                self._backlog = None
+            raise
+        if generation != self._generation:
+            return
+        self._pending = pending
+        self._loaded = True
+        self.roll_over(today or date.today())
+        # Re-applying a change the scan already saw is harmless
+        backlog, self._backlog = self._backlog, None
+        for event in backlog or ():
+            self.apply(event)
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        record_cache_lookup("overdue_tracker", self._loaded)
+        if self._loaded:
+            return
+        async with self._lock:
+            while not self._loaded:
+                if is_replica(db):
+                    # A lagging replica would seed the tracker with old rows
+                    async with async_session_factory() as primary:
+                        await self.rebuild(primary)
+                else:
+                    await self.rebuild(db)
+
+    def roll_over(self, today: date) -> None:
+        """Recompute the overdue set for a new calendar day."""
+        self._as_of = today
+        self._overdue = {pid for pid, end in self._pending.items() if end < today}
+
+    def _roll_over_if_stale(self, today: date | None) -> None:
+        today = today or date.today()
+        if today != self._as_of:
+            self.roll_over(today)
+
+    def track(self, entry: OverdueEntry) -> None:
+        self._pending[entry.payment_id] = entry.end_date
+        if entry.end_date < self._as_of:
+            self._overdue.add(entry.payment_id)
+        else:
+            self._overdue.discard(entry.payment_id)
+
+    def discard(self, payment_id: UUID) -> None:
+        self._pending.pop(payment_id, None)
+        self._overdue.discard(payment_id)
+
+    def apply(self, event: Event) -> None:
+        """Apply a change broadcast by any worker (see `_publish`)."""
+        if self._backlog is not None:
+            self._backlog.append(event)
+            return
+        if event.data.get("reset"):
+            self.reset()
+            return
+        if not self._loaded:
+            return
+        entry = event.data["entry"]
+        if entry is None:
+            self.discard(UUID(event.data["payment_id"]))
+            return
+        self.track(
+            OverdueEntry(
+                UUID(entry["payment_id"]), date.fromisoformat(entry["end_date"])
+            )
+        )
+
+    async def _publish(self, payment_id: UUID, entry: OverdueEntry | None) -> None:
+        await event_bus.broadcast(
+            OVERDUE_EVENT,
+            {
+                "payment_id": payment_id,
+                "entry": None if entry is None else asdict(entry),
+            },
+        )
+
+    async def sync_agreement(self, agreement: Agreement) -> None:
+        """Update the trackers from an agreement with its payment loaded."""
+        payment = agreement.payment
+        if payment is None:
+            return
+        entry = None
+        if payment.status == "pending" and agreement.terminated_at is None:
+            entry = OverdueEntry(payment.id, agreement.end_date)
+        await self._publish(payment.id, entry)
+
+    async def sync_payment(self, db: AsyncSession, payment: Payment) -> None:
+        """Update the trackers after a payment state change."""
+        entry = None
+        if payment.status == "pending":
+            agreement = await db.get(Agreement, payment.agreement_id)
+            if agreement is not None and agreement.terminated_at is None:
+                entry = OverdueEntry(payment.id, agreement.end_date)
+        await self._publish(payment.id, entry)
+
+    async def repair(self, db: AsyncSession) -> None:
+        """Rebuild this worker's tracker and have every other one reload."""
+        await event_bus.broadcast(OVERDUE_EVENT, {"reset": True})
+        await self.rebuild(db)
+
+    async def count(self, db: AsyncSession, today: date | None = None) -> int:
+        await self.ensure_loaded(db)
+        self._roll_over_if_stale(today)
+        return len(self._overdue)
+
+    async def entries(
+        self, db: AsyncSession, today: date | None = None
+    ) -> list[OverdueEntry]:
+        """Overdue entries, longest overdue first."""
+        await self.ensure_loaded(db)
+        self._roll_over_if_stale(today)
+        entries = [OverdueEntry(pid, self._pending[pid]) for pid in self._overdue]
+        entries.sort(key=lambda e: (e.end_date, str(e.payment_id)))
+        return entries
+
+    async def reconcile(
+        self, db: AsyncSession, today: date | None = None
+    ) -> OverdueReconciliation:
+        """Compare the tracked overdue set with the full database query."""
+        today = today or date.today()
+        await self.ensure_loaded(db)
+        self._roll_over_if_stale(today)
+        pending = await self._load_pending(db)
+        actual = {pid for pid, end in pending.items() if end < today}
+        return OverdueReconciliation(
+            tracked=len(self._overdue),
+            actual=len(actual),
+            missing=sorted(actual - self._overdue, key=str),
+            unexpected=sorted(self._overdue - actual, key=str),
+        )
+
+
+overdue_tracker = OverdueTracker()
+event_bus.add_handler(OVERDUE_EVENT, overdue_tracker.apply)
+event_bus.on_resync(overdue_tracker.reset)
+
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds()
+
+
+async def daily_rollover() -> None:
+    """Reconcile the tracker with the database; on drift, every worker reloads.
+
+    Each tracker moves its overdue set to the new date by itself on first use.
+    """
+    async with async_session_factory() as db:
+        report = await overdue_tracker.reconcile(db)
+        if not report.in_sync:
+            logger.warning(
+                "Overdue tracker drift: %d missing, %d unexpected",
+                len(report.missing),
+                len(report.unexpected),
+            )
+            await overdue_tracker.repair(db)
+    # Computed space status moves with the date
+    await event_bus.publish(resync_event("date_rollover"))
+
+
+async def run_daily_rollover() -> None:
+    """Background job: `daily_rollover` after each midnight, on one worker."""
+    while True:
+        await asyncio.sleep(_seconds_until_midnight() + 1)
+        try:
+            async with job_lock("overdue_rollover") as acquired:
+                if acquired:
+                    await daily_rollover()
+        except Exception:
+            logger.exception("Overdue rollover failed")
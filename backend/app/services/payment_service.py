@@ -2,12 +2,17 @@ from uuid import UUID
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.models.admin_user import AdminUser
+from app.models.agreement import Agreement
 from app.models.payment import Payment
 from app.schemas.payment import PaymentComplete, PaymentUpdate, PaymentUpdateAmount
 from app.services.audit_logger import AuditLogger
+from app.services.event_bus import publish_payment_status
+from app.services.overdue_tracker import overdue_tracker
 from app.utils.errors import BusinessError, NotFoundError
+from app.utils.etag import check_version
 
 
 class PaymentService:
@@ -35,8 +40,31 @@ class PaymentService:
             raise NotFoundError("付款紀錄")
         return payment
 
-    async def complete(self, payment_id: UUID, data: PaymentComplete) -> Payment:
+    async def list_overdue(self, offset: int = 0, limit: int = 100) -> list[Payment]:
+        """Overdue payments from the tracker, longest overdue first."""
+        entries = await overdue_tracker.entries(self.db)
+        page_ids = [e.payment_id for e in entries[offset : offset + limit]]
+        if not page_ids:
+            return []
+        result = await self.db.execute(
+            select(Payment)
+            .options(
+                selectinload(Payment.agreement).selectinload(Agreement.customer),
+                selectinload(Payment.agreement).selectinload(Agreement.space),
+            )
+            .where(Payment.id.in_(page_ids))
+        )
+        by_id = {p.id: p for p in result.scalars().all()}
+        return [by_id[pid] for pid in page_ids if pid in by_id]
+
+    async def complete(
+        self,
+        payment_id: UUID,
+        data: PaymentComplete,
+        expected_version: int | None = None,
+    ) -> Payment:
         payment = await self.get(payment_id)
+        check_version(payment.version, expected_version)
 
         if payment.status != "pending":
             raise BusinessError(f"只有待付款狀態可以完成付款，目前狀態：{payment.status}")
@@ -62,10 +90,18 @@ class PaymentService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await overdue_tracker.sync_payment(self.db, payment)
+        await publish_payment_status(self.db, payment)
         return payment
 
-    async def update_amount(self, payment_id: UUID, data: PaymentUpdateAmount) -> Payment:
+    async def update_amount(
+        self,
+        payment_id: UUID,
+        data: PaymentUpdateAmount,
+        expected_version: int | None = None,
+    ) -> Payment:
         payment = await self.get(payment_id)
+        check_version(payment.version, expected_version)
 
         if payment.status != "pending":
             raise BusinessError("只有待付款狀態可以修改金額")
@@ -84,15 +120,23 @@ class PaymentService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await overdue_tracker.sync_payment(self.db, payment)
+        await publish_payment_status(self.db, payment)
         return payment
 
-    async def update(self, payment_id: UUID, data: PaymentUpdate) -> Payment:
+    async def update(
+        self,
+        payment_id: UUID,
+        data: PaymentUpdate,
+        expected_version: int | None = None,
+    ) -> Payment:
         """Update payment with any editable fields.
 
         Allows editing all payments (pending/completed/voided).
         All fields are optional - only provided fields will be updated.
         """
         payment = await self.get(payment_id)
+        check_version(payment.version, expected_version)
 
         # Build old_values dict for audit
         old_values = {}
@@ -145,4 +189,6 @@ class PaymentService:
             )
 
         await self.db.commit()
+        await overdue_tracker.sync_payment(self.db, payment)
+        await publish_payment_status(self.db, payment)
         return payment
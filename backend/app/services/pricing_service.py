@@ -0,0 +1,160 @@
+"""What-if pricing: re-price every space under proposed price changes.
+
+The three-tier rules stay in PricingCatalog.price. Spaces are counted per
+distinct (site, tags, custom price) in one GROUP BY, and each combination
+is priced once under the current catalog and once under the proposed one,
+so the work in Python grows with the number of distinct combinations, not
+with the number of spaces. Proposed sites and
+tags are transient model instances that are never added to the session:
+nothing is written.
+"""
+
+import json
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.admin_user import AdminUser
+from app.models.site import Site
+from app.models.space import Space
+from app.models.tag import Tag
+from app.schemas.pricing import PricingSimulationRequest
+from app.utils.errors import NotFoundError
+from app.utils.pricing import PricingCatalog
+
+# (site id, tags, custom price): spaces sharing one are priced alike
+Signature = tuple[UUID, tuple[str, ...], int | None]
+
+
+@dataclass
+class PriceTotals:
+    spaces: int = 0
+    affected_spaces: int = 0
+    monthly_before: int = 0
+    monthly_after: int = 0
+    daily_before: int = 0
+    daily_after: int = 0
+
+    def add(self, count: int, before: dict, after: dict) -> None:
+        self.spaces += count
+        if (before["monthly"], before["daily"]) != (after["monthly"], after["daily"]):
+            self.affected_spaces += count
+        self.monthly_before += count * before["monthly"]
+        self.monthly_after += count * after["monthly"]
+        self.daily_before += count * before["daily"]
+        self.daily_after += count * after["daily"]
+
+
+@dataclass
+class PricingSimulation:
+    total: PriceTotals = field(default_factory=PriceTotals)
+    tier_changes: int = 0
+    tiers: dict[str, PriceTotals] = field(default_factory=dict)
+    sites: dict[UUID, PriceTotals] = field(default_factory=dict)
+    site_names: dict[UUID, str] = field(default_factory=dict)
+
+
+class PricingService:
+    def __init__(self, db: AsyncSession, user: AdminUser | None) -> None:
+        self.db = db
+        self.user = user
+
+    async def _space_signatures(self) -> Counter[Signature]:
+        """Number of spaces per (site, tags, custom price), grouped in SQL.
+
+        Tags are grouped by their JSON text, so only one row per distinct
+        combination is decoded.
+        """
+        tags = cast(Space.tags, Text)
+        result = await self.db.execute(
+            select(Space.site_id, tags, Space.custom_price, func.count()).group_by(
+                Space.site_id, tags, Space.custom_price
+            )
+        )
+        signatures: Counter[Signature] = Counter()
+        for site_id, tags_json, custom_price, count in result.all():
+            space_tags = tuple(json.loads(tags_json) or ()) if tags_json else ()
+            signatures[(site_id, space_tags, custom_price)] += count
+        return signatures
+
+    async def simulate(self, data: PricingSimulationRequest) -> PricingSimulation:
+        """Price deltas of every space under the proposed changes, by site
+        and by tier. Unknown sites, tags or spaces are rejected."""
+        sites = {s.id: s for s in (await self.db.execute(select(Site))).scalars()}
+        tags = {t.id: t for t in (await self.db.execute(select(Tag))).scalars()}
+
+        proposed_sites = dict(sites)
+        for change in data.sites:
+            site = sites.get(change.site_id)
+            if site is None:
+                raise NotFoundError("停車場")
+            proposed_sites[site.id] = Site(
+                **{
+                    "name": site.name,
+                    "monthly_base_price": site.monthly_base_price,
+                    "daily_base_price": site.daily_base_price,
+                    **change.model_dump(exclude={"site_id"}, exclude_none=True),
+                }
+            )
+        proposed_tags = dict(tags)
+        for change in data.tags:
+            tag = tags.get(change.tag_id)
+            if tag is None:
+                raise NotFoundError("標籤")
+            proposed_tags[tag.id] = Tag(
+                **{
+                    "name": tag.name,
+                    "monthly_price": tag.monthly_price,
+                    "daily_price": tag.daily_price,
+                    **change.model_dump(exclude={"tag_id"}, exclude_unset=True),
+                }
+            )
+
+        unchanged = await self._space_signatures()
+        # Spaces with a proposed custom price move to (current, proposed) pairs
+        changed: Counter[tuple[Signature, Signature]] = Counter()
+        custom_prices = {c.space_id: c.custom_price for c in data.spaces}
+        if custom_prices:
+            result = await self.db.execute(
+                select(
+                    Space.id, Space.site_id, Space.tags, Space.custom_price
+                ).where(Space.id.in_(custom_prices))
+            )
+            rows = result.all()
+            if len(rows) != len(custom_prices):
+                raise NotFoundError("車位")
+            for space_id, site_id, space_tags, custom_price in rows:
+                signature = (site_id, tuple(space_tags or ()), custom_price)
+                unchanged[signature] -= 1
+                changed[
+                    (signature, (site_id, signature[1], custom_prices[space_id]))
+                ] += 1
+        current = PricingCatalog(list(tags.values()))
+        proposed = PricingCatalog(list(proposed_tags.values()))
+        simulation = PricingSimulation(
+            site_names={site_id: site.name for site_id, site in sites.items()}
+        )
+        pairs: Iterable[tuple[Signature, Signature, int]] = [
+            *((s, s, count) for s, count in unchanged.items() if count),
+            *((s, p, count) for (s, p), count in changed.items()),
+        ]
+        for before_sig, after_sig, count in pairs:
+            site_id, space_tags, custom_price = before_sig
+            before = current.price(sites[site_id], list(space_tags), custom_price)
+            after = proposed.price(
+                proposed_sites[site_id], list(space_tags), after_sig[2]
+            )
+            simulation.total.add(count, before, after)
+            simulation.tiers.setdefault(after["tier"], PriceTotals()).add(
+                count, before, after
+            )
+            simulation.sites.setdefault(site_id, PriceTotals()).add(
+                count, before, after
+            )
+            if before["tier"] != after["tier"]:
+                simulation.tier_changes += count
+        return simulation
@@ -8,6 +8,7 @@ from app.models.site import Site
 from app.models.space import Space
 from app.schemas.site import SiteCreate, SiteUpdate
 from app.services.audit_logger import AuditLogger
+from app.services.lookup_index import space_lookup
 from app.utils.errors import DuplicateError, NotFoundError
 
 
@@ -74,6 +75,7 @@ class SiteService:
                 raise DuplicateError("停車場", "名稱")
 
         old_values = {k: getattr(site, k) for k in update_data}
+        old_name = site.name
         for key, value in update_data.items():
             setattr(site, key, value)
 
@@ -87,6 +89,10 @@ class SiteService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        if site.name != old_name:
+            # Space keys include the site name: one rebuild rather than a
+            # broadcast per space
+            await space_lookup.invalidate()
         return site
 
     async def delete(self, site_id: UUID) -> None:
@@ -1,25 +1,36 @@
 from __future__ import annotations
 
-from uuid import UUID
+from datetime import date, timedelta
+from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.models.admin_user import AdminUser
+from app.models.agreement import Agreement
 from app.models.site import Site
 from app.models.space import Space
 from app.models.tag import Tag
 from app.schemas.space import SpaceBatchCreate, SpaceCreate, SpaceUpdate
 from app.services.audit_logger import AuditLogger
+from app.services.event_bus import Event, event_bus, payload_batches, space_event
+from app.services.lookup_index import space_keys, space_lookup
 from app.utils.errors import BusinessError, DuplicateError, NotFoundError
-from app.utils.pricing import compute_space_price
+from app.utils.etag import check_version
+from app.utils.pricing import PricingCatalog
+from app.utils.timeline import Occupied, day_runs, gaps, merge
+
+MAX_TIMELINE_DAYS = 366
 
 
 class SpaceService:
-    def __init__(self, db: AsyncSession, user: AdminUser, ip: str | None = None) -> None:
+    def __init__(
+        self, db: AsyncSession, user: AdminUser | None, ip: str | None = None
+    ) -> None:
         self.db = db
-        self.user = user
+        self.user = user  # None only for read-only system work (warm-up)
         self.ip = ip
         self.audit = AuditLogger(db)
 
@@ -50,16 +61,34 @@ class SpaceService:
         result = await self.db.execute(select(Tag))
         return list(result.scalars().all())
 
-    def compute_pricing(self, space: Space, all_tags: list[Tag]) -> dict:
+    async def load_catalog(self) -> PricingCatalog:
+        return PricingCatalog(await self.get_all_tags())
+
+    def compute_pricing(self, space: Space, catalog: PricingCatalog) -> dict:
         """Compute effective pricing for a space."""
         if not space.site:
             return {"monthly": 0, "daily": 0, "tier": "site", "tag_name": None, "site_monthly": 0, "site_daily": 0}
-        return compute_space_price(
-            site=space.site,
-            tags=space.tags or [],
-            all_tags=all_tags,
-            custom_price=space.custom_price,
+        return catalog.price(space.site, space.tags or [], space.custom_price)
+
+    async def resolve_active_agreements(
+        self, space_ids: list[UUID]
+    ) -> dict[UUID, UUID]:
+        """Active agreement id per occupied space, in one query.
+
+        Spaces missing from the result are available today.
+        """
+        if not space_ids:
+            return {}
+        today = date.today()
+        result = await self.db.execute(
+            select(Agreement.space_id, Agreement.id).where(
+                Agreement.space_id.in_(space_ids),
+                Agreement.terminated_at.is_(None),
+                Agreement.start_date <= today,
+                Agreement.end_date >= today,
+            )
         )
+        return {space_id: agreement_id for space_id, agreement_id in result.all()}
 
     async def compute_status(self, space_id: UUID) -> str:
         """Compute space status based on active agreements.
@@ -68,10 +97,6 @@ class SpaceService:
             "occupied" if current_date is within any non-terminated agreement
             "available" otherwise
         """
-        from datetime import date
-
-        from app.models.agreement import Agreement
-
         today = date.today()
 
         result = await self.db.execute(
@@ -89,10 +114,6 @@ class SpaceService:
 
     async def get_active_agreement(self, space_id: UUID):
         """Get the currently active agreement for this space, if any."""
-        from datetime import date
-
-        from app.models.agreement import Agreement
-
         today = date.today()
 
         result = await self.db.execute(
@@ -106,6 +127,87 @@ class SpaceService:
 
         return result.scalar_one_or_none()
 
+    @staticmethod
+    def _timeline_range(start: date, end: date) -> date:
+        """Validate an inclusive date range; returns its exclusive end."""
+        if end < start:
+            raise BusinessError("結束日期不可早於開始日期", "INVALID_RANGE")
+        if (end - start).days + 1 > MAX_TIMELINE_DAYS:
+            raise BusinessError(
+                f"查詢區間不可超過 {MAX_TIMELINE_DAYS} 天", "INVALID_RANGE"
+            )
+        return end + timedelta(days=1)
+
+    async def _occupancy(
+        self, start: date, end: date, *where
+    ) -> dict[UUID, list[tuple[date, date, UUID]]]:
+        """Agreement intervals overlapping [start, end), by space.
+
+        A terminated agreement occupies its space through the termination
+        day. Served by the (space_id, start_date, end_date) index.
+        """
+        result = await self.db.execute(
+            select(
+                Agreement.space_id,
+                Agreement.id,
+                Agreement.start_date,
+                Agreement.end_date,
+                Agreement.terminated_at,
+            ).where(
+                *where,
+                Agreement.start_date < end,
+                Agreement.end_date > start,
+            )
+        )
+        by_space: dict[UUID, list[tuple[date, date, UUID]]] = {}
+        for space_id, agreement_id, lo, hi, terminated_at in result.all():
+            if terminated_at is not None:
+                hi = min(hi, terminated_at.date() + timedelta(days=1))
+            by_space.setdefault(space_id, []).append((lo, hi, agreement_id))
+        return by_space
+
+    async def timeline(
+        self, space_id: UUID, start: date, end: date
+    ) -> tuple[list[Occupied], list[tuple[date, date]]]:
+        """Merged occupied intervals and gaps of a space, both half-open."""
+        stop = self._timeline_range(start, end)
+        space = await self.db.get(Space, space_id)
+        if space is None:
+            raise NotFoundError("車位")
+        by_space = await self._occupancy(start, stop, Agreement.space_id == space_id)
+        occupied = merge(by_space.get(space_id, []), start, stop)
+        return occupied, gaps(occupied, start, stop)
+
+    async def site_timeline(
+        self, site_id: UUID, start: date, end: date
+    ) -> list[tuple[UUID, str, list[int]]]:
+        """(space id, name, run-length encoded day bitmap) per space, by name.
+
+        Three queries (site, spaces, agreements) whatever the number of spaces.
+        """
+        stop = self._timeline_range(start, end)
+        if await self.db.get(Site, site_id) is None:
+            raise NotFoundError("停車場")
+        result = await self.db.execute(
+            select(Space.id, Space.name)
+            .where(Space.site_id == site_id)
+            .order_by(Space.name)
+        )
+        spaces = result.all()
+        by_space = await self._occupancy(
+            start,
+            stop,
+            Agreement.space_id.in_(select(Space.id).where(Space.site_id == site_id)),
+        )
+        return [
+            (
+                space_id,
+                name,
+                day_runs(merge(by_space.get(space_id, []), start, stop), start, stop),
+            )
+            for space_id, name in spaces
+        ]
+
     async def get(self, space_id: UUID) -> Space:
         result = await self.db.execute(
             select(Space).options(selectinload(Space.site)).where(Space.id == space_id)
@@ -128,7 +230,8 @@ class SpaceService:
         site_result = await self.db.execute(
             select(Site).where(Site.id == data.site_id)
         )
-        if site_result.scalar_one_or_none() is None:
+        site = site_result.scalar_one_or_none()
+        if site is None:
             raise NotFoundError("停車場")
 
         await self._check_name_unique(data.site_id, data.name)
@@ -136,6 +239,7 @@ class SpaceService:
         space = Space(**data.model_dump())
         self.db.add(space)
         await self.db.flush()
+        set_committed_value(space, "site", site)
 
         await self.audit.log_create(
             table_name="spaces",
@@ -145,6 +249,8 @@ class SpaceService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await space_lookup.update(space.id, space_keys(site.name, space.name))
+        await event_bus.publish(space_event("space.created", space))
         return space
 
     async def batch_create(self, data: SpaceBatchCreate) -> list[Space]:
@@ -152,7 +258,8 @@ class SpaceService:
         site_result = await self.db.execute(
             select(Site).where(Site.id == data.site_id)
         )
-        if site_result.scalar_one_or_none() is None:
+        site = site_result.scalar_one_or_none()
+        if site is None:
             raise NotFoundError("停車場")
 
         # Generate names with zero-padded numbers
@@ -172,42 +279,65 @@ class SpaceService:
             raise BusinessError(f"以下車位名稱已存在：{', '.join(existing)}")
 
         # Bulk insert
-        from uuid import uuid4
-
         batch_id = uuid4()
-        spaces = []
-        for name in names:
-            space = Space(site_id=data.site_id, name=name)
-            self.db.add(space)
-            spaces.append(space)
-
-        await self.db.flush()
+        result = await self.db.execute(
+            insert(Space).returning(Space, sort_by_parameter_order=True),
+            [
+                {
+                    "site_id": data.site_id,
+                    "name": name,
+                    "status": "available",
+                    "tags": [],
+                }
+                for name in names
+            ],
+        )
+        spaces = list(result.scalars().all())
+        for space in spaces:
+            set_committed_value(space, "site", site)
 
         # Single audit log for the batch
         await self.audit.log(
             action="BATCH_CREATE",
             user=self.user,
             table_name="spaces",
-            new_values={"prefix": data.prefix, "start": data.start, "count": data.count, "names": names},
+            new_values={
+                "prefix": data.prefix,
+                "start": data.start,
+                "count": data.count,
+                "names": names,
+            },
             ip_address=self.ip,
             batch_id=batch_id,
         )
         await self.db.commit()
+        await space_lookup.add_many(
+            (space.id, space_keys(site.name, space.name)) for space in spaces
+        )
+        # One event per NOTIFY payload, not per space; clients reload the site
+        for space_ids in payload_batches([space.id for space in spaces]):
+            await event_bus.publish(
+                Event("spaces.created", site.id, {"space_ids": space_ids})
+            )
         return spaces
 
-    async def update(self, space_id: UUID, data: SpaceUpdate) -> Space:
+    async def update(
+        self, space_id: UUID, data: SpaceUpdate, expected_version: int | None = None
+    ) -> Space:
         space = await self.get(space_id)
+        check_version(space.version, expected_version)
         update_data = data.model_dump(exclude_unset=True)
         if not update_data:
             return space
 
         # Prevent renaming to an existing name in the same site
         if "name" in update_data:
-            await self._check_name_unique(space.site_id, update_data["name"], exclude_id=space_id)
+            await self._check_name_unique(
+                space.site_id, update_data["name"], exclude_id=space_id
+            )
 
         # Prevent status change to available if active agreement exists
         if "status" in update_data and update_data["status"] == "available":
-            from app.models.agreement import Agreement
             active = await self.db.execute(
                 select(Agreement).where(
                     Agreement.space_id == space_id,
@@ -218,6 +348,7 @@ class SpaceService:
                 raise BusinessError("此車位有有效合約，無法設為可用")
 
         old_values = {k: getattr(space, k) for k in update_data}
+        old_keys = space_keys(space.site.name, space.name)
         for key, value in update_data.items():
             setattr(space, key, value)
 
@@ -231,13 +362,16 @@ class SpaceService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await space_lookup.update(
+            space.id, space_keys(space.site.name, space.name), old_keys
+        )
+        await event_bus.publish(space_event("space.updated", space))
         return space
 
     async def delete(self, space_id: UUID) -> None:
         space = await self.get(space_id)
 
         # Check for active agreements
-        from app.models.agreement import Agreement
         active = await self.db.execute(
             select(Agreement).where(
                 Agreement.space_id == space_id,
@@ -259,3 +393,5 @@ class SpaceService:
             ip_address=self.ip,
         )
         await self.db.commit()
+        await space_lookup.remove(space_id, space_keys(space.site.name, space.name))
+        await event_bus.publish(space_event("space.deleted", space))
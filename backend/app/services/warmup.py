@@ -0,0 +1,186 @@
+"""Startup warm-up and shutdown drain.
+
+After a Fly auto-start the first requests would otherwise pay for opening
+database connections, compiling the hot SQLAlchemy statements and loading
+the overdue tracker. `warm_up` does that work in the lifespan hook, before
+the machine reports ready, and logs how long each step took. A failing step
+is logged and skipped; warm-up never blocks startup. The typeahead lookup
+indexes take seconds to build on a large dataset, so `build_lookup_indexes`
+runs as a background task once the machine is serving.
+
+`drain` is the shutdown counterpart: refuse new requests, end SSE streams,
+wait for in-flight requests, then stop background work and close the pool.
+`drain_on_signal` starts it from SIGTERM/SIGINT, while the server still
+holds its listeners and open connections.
+"""
+
+import asyncio
+import logging
+import signal
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from types import FrameType
+from uuid import uuid4
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.models.site import Site
+from app.services.agreement_service import AgreementService
+from app.services.event_bus import SHUTDOWN_EVENT, event_bus
+from app.services.lookup_index import customer_lookup, space_lookup
+from app.services.space_service import SpaceService
+from app.utils.drain import RequestTracker
+
+logger = logging.getLogger(__name__)
+
+SignalHandler = Callable[[int, FrameType | None], object]
+
+
+@dataclass
+class WarmupReport:
+    steps: dict[str, float] = field(default_factory=dict)  # name -> ms
+    failed: list[str] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.steps.values())
+
+
+async def _open_connections(engine: AsyncEngine, count: int) -> None:
+    # Held open together, so the pool really ends up with `count` connections
+    async with AsyncExitStack() as stack:
+        conns = [
+            await stack.enter_async_context(engine.connect()) for _ in range(count)
+        ]
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+
+
+async def _load_catalog(db: AsyncSession) -> None:
+    await SpaceService(db, None).load_catalog()
+    await db.execute(select(Site))
+
+
+async def _space_list_and_status(db: AsyncSession) -> None:
+    # Same statements (and cache keys) as GET /spaces and the write paths
+    svc = SpaceService(db, None)
+    spaces = await svc.list(limit=100)
+    await svc.resolve_active_agreements([s.id for s in spaces] or [uuid4()])
+
+
+async def _summary(db: AsyncSession) -> None:
+    # Also loads the overdue tracker
+    await AgreementService(db, None).summary()
+
+
+async def warm_up(
+    engine: AsyncEngine,
+    session_factory: async_sessionmaker[AsyncSession],
+    connections: int,
+) -> WarmupReport:
+    report = WarmupReport()
+
+    async def step(name: str, work: Callable[[], Awaitable[None]]) -> None:
+        started = time.perf_counter()
+        try:
+            await work()
+        except Exception:
+            logger.warning("Warm-up step %s failed", name, exc_info=True)
+            report.failed.append(name)
+        report.steps[name] = (time.perf_counter() - started) * 1000
+
+    async def in_session(work: Callable[[AsyncSession], Awaitable[None]]) -> None:
+        async with session_factory() as db:
+            await work(db)
+
+    await step("connections", lambda: _open_connections(engine, connections))
+    await step("catalog", lambda: in_session(_load_catalog))
+    await step("space_list", lambda: in_session(_space_list_and_status))
+    await step("summary", lambda: in_session(_summary))
+
+    logger.info(
+        "Warm-up finished in %.1fms (%s)",
+        report.total_ms,
+        ", ".join(f"{name} {ms:.1f}ms" for name, ms in report.steps.items()),
+    )
+    return report
+
+
+async def build_lookup_indexes(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    started = time.perf_counter()
+    try:
+        # Lookups are answered from the database until then
+        await customer_lookup.build(session_factory)
+        await space_lookup.build(session_factory)
+    except Exception:
+        logger.warning("Building the lookup indexes failed", exc_info=True)
+        return
+    logger.info(
+        "Lookup indexes built in %.1fms", (time.perf_counter() - started) * 1000
+    )
+
+
+async def drain(tracker: RequestTracker, timeout: float) -> bool:
+    """Stop taking requests and wait for the running ones; False on timeout."""
+    tracker.start_draining()
+    event_bus.publish_local(SHUTDOWN_EVENT)
+    drained = await tracker.wait_idle(timeout)
+    if not drained:
+        logger.warning(
+            "Shutdown drain timed out with %d requests in flight", tracker.active
+        )
+    return drained
+
+
+def drain_on_signal(tracker: RequestTracker, timeout: float) -> Callable[[], None]:
+    """Drain as soon as SIGTERM/SIGINT arrives; returns an uninstaller.
+
+    uvicorn's handler only flags the server to exit. The server then closes
+    its listeners, waits for open connections (up to
+    --timeout-graceful-shutdown) and only then runs the lifespan shutdown,
+    too late to answer 503 or to end SSE streams, which would hold that wait
+    to its timeout. This wraps the handler: the first signal starts `drain`
+    and passes the signal on once it is done; a second one is passed on at
+    once. Signals without a Python handler of their own are left alone.
+    """
+    loop = asyncio.get_running_loop()
+    previous: dict[int, SignalHandler] = {}
+    tasks: list[asyncio.Task] = []  # keeps the drain task referenced
+
+    async def drain_then(
+        handler: SignalHandler, sig: int, frame: FrameType | None
+    ) -> None:
+        try:
+            await drain(tracker, timeout)
+        finally:
+            handler(sig, frame)
+
+    def handle(sig: int, frame: FrameType | None) -> None:
+        handler = previous[sig]
+        if tracker.draining:
+            handler(sig, frame)
+            return
+        tracker.start_draining()  # before the loop runs: refuse from now on
+        loop.call_soon_threadsafe(
+            lambda: tasks.append(loop.create_task(drain_then(handler, sig, None)))
+        )
+
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            handler = signal.getsignal(sig)
+            # KeyboardInterrupt raised from a task would not stop anything
+            if callable(handler) and handler is not signal.default_int_handler:
+                previous[sig] = handler
+                signal.signal(sig, handle)
+
+    def uninstall() -> None:
+        for sig, handler in previous.items():
+            if signal.getsignal(sig) is handle:
+                signal.signal(sig, handler)
+
+    return uninstall
@@ -1,19 +1,44 @@
-from datetime import datetime, timedelta, timezone
+"""Password hashing and JWT helpers.
+
+passlib/bcrypt and python-jose (which pulls in the cryptography backends) are
+imported on first use rather than at startup, to keep cold starts short on
+auto-started machines.
+"""
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from datetime import datetime, timedelta, timezone
+from functools import cache
+from types import ModuleType
+from typing import TYPE_CHECKING
 
 from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# Scope of the short-lived tokens that only open an event stream
+STREAM_TOKEN_SCOPE = "events"
+
+
+@cache
+def pwd_context() -> "CryptContext":
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+@cache
+def jose_jwt() -> ModuleType:
+    from jose import jwt
+
+    return jwt
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(
@@ -32,14 +57,31 @@ def create_access_token(
         "email": email,
         "exp": expire,
     }
-    return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    return jose_jwt().encode(
+        payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm
+    )
+
+
+def create_stream_token(user_id: str) -> str:
+    """Token for GET /events/spaces?token=..., valid for a few seconds.
+
+    Browsers' EventSource can't send an Authorization header, and a URL ends
+    up in access logs, so the bearer token never goes there.
+    """
+    expire = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.sse_token_expire_seconds
+    )
+    payload = {"sub": user_id, "scope": STREAM_TOKEN_SCOPE, "exp": expire}
+    return jose_jwt().encode(
+        payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm
+    )
 
 
 def decode_access_token(token: str) -> dict | None:
     try:
-        payload = jwt.decode(
+        payload = jose_jwt().decode(
             token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm]
         )
         return payload
-    except JWTError:
+    except jose_jwt().JWTError:
         return None
@@ -0,0 +1,181 @@
+"""gzip/brotli response compression negotiated by Accept-Encoding.
+
+Complete responses are compressed only from COMPRESSION_MINIMUM_SIZE bytes.
+Streaming responses (more_body) are compressed chunk by chunk; the encoder is
+flushed once COMPRESSION_FLUSH_SIZE input bytes have gone in since the last
+flush, and at the end, so small chunks still share one compression window.
+Event streams, which must reach the client unbuffered, are never compressed.
+Every response that could be compressed carries `Vary: Accept-Encoding`,
+whatever this client asked for. Brotli is used when the optional `brotli`
+package is installed and the client prefers it.
+"""
+
+import zlib
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency: pip install .[brotli]
+    brotli = None
+
+# Already compressed, or must reach the client unbuffered
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream",
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+)
+
+
+class _Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def negotiate_encoding(accept_encoding: str, brotli_available: bool) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q=0."""
+    weights: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+    wildcard = weights.get("*", 0.0)
+    best = max(candidates, key=lambda c: weights.get(c, wildcard))
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        flush_size: int = 65536,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.flush_size = flush_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoder(self, encoding: str) -> _Encoder:
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), brotli is not None
+        )
+
+        start: Message | None = None
+        encoder: _Encoder | None = None
+        passthrough = False
+        unflushed = 0  # input bytes the encoder may still be holding back
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder, passthrough, unflushed
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = "content-encoding" in headers or any(
+                    content_type.startswith(t) for t in EXCLUDED_CONTENT_TYPES
+                )
+                if not passthrough:
+                    # Another Accept-Encoding could get another representation
+                    MutableHeaders(scope=message).add_vary_header("Accept-Encoding")
+                    passthrough = encoding is None
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until the first body tells the size
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(response_start)
+                    await send(message)
+                    return
+                headers = MutableHeaders(scope=response_start)
+                headers["Content-Encoding"] = encoding
+                del headers["Content-Length"]
+                encoder = self._encoder(encoding)
+                if not more_body:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(response_start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(response_start)
+
+            assert encoder is not None
+            chunk = encoder.compress(body) if body else b""
+            unflushed += len(body)
+            if not more_body:
+                chunk += encoder.finish()
+            elif unflushed >= self.flush_size:
+                chunk += encoder.flush()
+                unflushed = 0
+            if chunk or not more_body:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body,
+                    }
+                )
+
+        await self.app(scope, receive, send_compressed)
@@ -1,12 +1,26 @@
-"""License plate encryption/decryption using Fernet symmetric encryption."""
+"""License plate encryption/decryption using Fernet symmetric encryption.
 
-from cryptography.fernet import Fernet
+`cryptography` is imported on first use, not at startup.
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
 from app.config import settings
 
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+
+
+@lru_cache(maxsize=4)
+def _fernet_for(key: str) -> "Fernet":
+    from cryptography.fernet import Fernet
+
+    return Fernet(key.encode())
 
-def _get_fernet() -> Fernet:
-    return Fernet(settings.encryption_key.encode())
+
+def _get_fernet() -> "Fernet":
+    return _fernet_for(settings.encryption_key)
 
 
 def encrypt_license_plate(plaintext: str) -> str:
@@ -19,6 +33,22 @@ def decrypt_license_plate(ciphertext: str) -> str:
     return _get_fernet().decrypt(ciphertext.encode()).decode()
 
 
+def decrypt_license_plates(ciphertexts: list[str]) -> list[str | None]:
+    """Decrypt many plates with one key lookup; None where decryption fails."""
+    if not ciphertexts:
+        return []
+    from cryptography.fernet import InvalidToken
+
+    fernet = _get_fernet()
+    plates: list[str | None] = []
+    for ciphertext in ciphertexts:
+        try:
+            plates.append(fernet.decrypt(ciphertext.encode()).decode())
+        except (InvalidToken, ValueError):
+            plates.append(None)
+    return plates
+
+
 def mask_license_plate(plaintext: str) -> str:
     """Mask a license plate for display: show first 2 and last 1 chars.
 
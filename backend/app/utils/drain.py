@@ -0,0 +1,81 @@
+"""In-flight request tracking for a graceful drain on shutdown.
+
+Once draining starts, new HTTP requests are refused with 503 and
+`Connection: close` so the load balancer retries them on another machine,
+while the requests already running are allowed to finish.
+"""
+
+import asyncio
+import json
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_DRAINING_BODY = json.dumps(
+    {"code": "SHUTTING_DOWN", "message": "服務重啟中，請稍後再試"}, ensure_ascii=False
+).encode()
+
+
+class RequestTracker:
+    def __init__(self) -> None:
+        self.active = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def started(self) -> None:
+        self.active += 1
+        self._idle.clear()
+
+    def finished(self) -> None:
+        self.active -= 1
+        if self.active == 0:
+            self._idle.set()
+
+    def start_draining(self) -> None:
+        self.draining = True
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait for in-flight requests to finish; False on timeout."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+
+request_tracker = RequestTracker()
+
+
+class DrainMiddleware:
+    def __init__(self, app: ASGIApp, tracker: RequestTracker = request_tracker) -> None:
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.tracker.draining:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"connection", b"close"),
+                        (b"retry-after", b"1"),
+                    ],
+                }
+            )
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": _DRAINING_BODY,
+                }
+            )
+            return
+        self.tracker.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.finished()
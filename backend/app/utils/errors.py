@@ -17,6 +17,15 @@ class DuplicateError(BusinessError):
         super().__init__(f"{entity}的{field}已存在", "DUPLICATE")
 
 
+class IdempotencyConflictError(BusinessError):
+    """Idempotency-Key reused for another request, or still in flight."""
+
+
+class PreconditionFailedError(BusinessError):
+    def __init__(self) -> None:
+        super().__init__("資料已被其他人修改，請重新載入後再試", "PRECONDITION_FAILED")
+
+
 class DoubleBookingError(BusinessError):
     def __init__(self, space_name: str) -> None:
         super().__init__(
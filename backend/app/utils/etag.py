@@ -0,0 +1,147 @@
+"""Weak ETags for conditional GETs on slow-changing resources.
+
+An ETag is derived from the change versions of the tables the representation
+depends on (one round trip for all of them), plus extra inputs such as the
+current date or values read from the few rows it depends on. Once a commit
+that wrote rows of a tracked table has gone through, that table's row in
+`table_versions` (seeded by the migration) is bumped in a transaction of its
+own: the version row is locked for that one statement, never for the
+writer's transaction, and a version only moves after the data it stands for
+is visible, on every worker. A reader that loads the new data under the old
+version is merely asked to fetch it once more. ORM flushes and ORM-enabled
+bulk insert/update/delete statements are both seen; raw SQL writes to a
+tracked table must bump its version themselves.
+
+The route compares it with If-None-Match before rendering and answers 304 on
+a match.
+
+Writes to spaces, payments and agreements go the other way: the row's
+`version` column is its strong ETag, sent back in If-Match to make an update
+conditional (412 when someone else changed the row first).
+"""
+
+import hashlib
+import logging
+
+from fastapi import Request, Response
+from sqlalchemy import Connection, Table, event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.models.table_version import TableVersion
+from app.utils.errors import BusinessError, PreconditionFailedError
+from app.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Tables whose contents feed a conditional GET
+TRACKED_TABLES = frozenset({"customers", "sites", "spaces", "tags"})
+
+
+def _seed_versions(target: Table, connection: Connection, **kw: object) -> None:
+    connection.execute(
+        insert(target), [{"table_name": t, "version": 0} for t in TRACKED_TABLES]
+    )
+
+
+def _mark_dirty(session: Session, tables: set[str]) -> None:
+    if tables := tables & TRACKED_TABLES:
+        session.info.setdefault("etag_dirty_tables", set()).update(tables)
+
+
+def _on_after_flush(session: Session, flush_context: object) -> None:
+    _mark_dirty(
+        session,
+        {obj.__tablename__ for obj in (*session.new, *session.dirty, *session.deleted)},
+    )
+
+
+def _on_orm_execute(state: ORMExecuteState) -> None:
+    if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper:
+        _mark_dirty(state.session, {state.bind_mapper.local_table.name})
+
+
+def _on_after_commit(session: Session) -> None:
+    tables = session.info.pop("etag_dirty_tables", None)
+    if not tables:
+        return
+    # The session can't run SQL any more; the bump autocommits on its own
+    # connection
+    try:
+        with session.get_bind().begin() as conn:
+            conn.execute(
+                update(TableVersion)
+                .where(TableVersion.table_name.in_(sorted(tables)))
+                .values(version=TableVersion.version + 1)
+            )
+    except Exception:
+        # The write itself is committed; clients revalidate after the next one
+        logger.exception("Could not bump table versions of %s", sorted(tables))
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop("etag_dirty_tables", None)
+
+
+event.listen(TableVersion.__table__, "after_create", _seed_versions)
+event.listen(Session, "after_flush", _on_after_flush)
+event.listen(Session, "do_orm_execute", _on_orm_execute)
+event.listen(Session, "after_commit", _on_after_commit)
+event.listen(Session, "after_rollback", _on_after_rollback)
+
+
+async def compute_etag(db: AsyncSession, models: list[type], *extra: object) -> str:
+    """Weak ETag over the given tables' versions and extra inputs (e.g. today)."""
+    names = sorted(model.__tablename__ for model in models)
+    result = await db.execute(
+        select(TableVersion.table_name, TableVersion.version).where(
+            TableVersion.table_name.in_(names)
+        )
+    )
+    versions = dict(result.all())
+    state = [(name, versions.get(name, 0)) for name in names]
+    digest = hashlib.sha1(repr((state, extra)).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def _matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check with weak comparison (RFC 9110 13.1.2).
+
+    Counted as an "etag" cache hit (answered 304) or miss.
+    """
+    matched = _matches(request.headers.get("if-none-match"), etag)
+    record_cache_lookup("etag", matched)
+    return matched
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def parse_if_match(header: str | None) -> int | None:
+    """Row version required by If-Match; None when absent or `*`."""
+    if header is None or header.strip() == "*":
+        return None
+    value = header.strip()
+    if value.startswith('"') and value.endswith('"') and len(value) > 1:
+        value = value[1:-1]
+    if not value.isdigit():
+        raise BusinessError("If-Match 須為資料版本號", "INVALID_IF_MATCH")
+    return int(value)
+
+
+def check_version(current: int, expected: int | None) -> None:
+    if expected is not None and current != expected:
+        raise PreconditionFailedError()
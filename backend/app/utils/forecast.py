@@ -0,0 +1,207 @@
+"""Vectorized revenue projection over agreement and payment columns.
+
+The database does the reductions that need every row (historical renewal
+rates, pending amounts per due date); only agreements running in the horizon
+are loaded here, as columns. Dates are held as proleptic ordinals
+(date.toordinal) in int64 arrays; a missing date is NEVER, which sorts after
+every real day. Agreements are half-open [start, end) like everywhere else,
+and a price is spread evenly over the days of its term, so a monthly
+agreement from the 16th counts half in each month. Per-month sums come from
+a day-difference array (one bincount for the starts, one for the ends, a
+cumulative sum and a reduce per month), never a loop over agreements.
+
+This is the only module that imports NumPy; ReportService imports it on
+first use so the import stays out of cold start.
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date
+from typing import TypeVar
+
+import numpy as np
+
+AGREEMENT_TYPES = ("daily", "monthly", "quarterly", "yearly")
+# A successor for the same customer and space starting within this many days
+# of the end counts as a renewal
+RENEWAL_GRACE_DAYS = 7
+# Longest agreement term (yearly), leap day included
+LONGEST_TERM_DAYS = 366
+# Renewal chains are followed until their probability drops below this
+MIN_RENEWAL_PROBABILITY = 0.01
+NEVER = np.iinfo(np.int64).max // 2
+
+_TYPE_CODES = {t: i for i, t in enumerate(AGREEMENT_TYPES)}
+
+C = TypeVar("C", bound="_Columns")
+
+
+def _days(values: Sequence[date | None]) -> np.ndarray:
+    return np.fromiter(
+        (NEVER if v is None else v.toordinal() for v in values),
+        np.int64,
+        count=len(values),
+    )
+
+
+class _Columns(ABC):
+    @classmethod
+    @abstractmethod
+    def from_rows(cls: type[C], rows: Sequence[tuple]) -> C:
+        """Columns from query rows; no rows gives empty columns."""
+
+    @classmethod
+    def concat(cls: type[C], parts: Sequence[C]) -> C:
+        """Join the columns built from each streamed partition."""
+        if not parts:
+            return cls.from_rows([])
+        return cls(
+            **{
+                name: np.concatenate([getattr(p, name) for p in parts])
+                for name in cls.__dataclass_fields__
+            }
+        )
+
+
+@dataclass
+class AgreementColumns(_Columns):
+    type_code: np.ndarray  # index into AGREEMENT_TYPES
+    start: np.ndarray
+    end: np.ndarray
+    terminated: np.ndarray  # termination day, NEVER if running
+    price: np.ndarray
+    # Start of the customer's next agreement on the space, NEVER if none
+    next_start: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "AgreementColumns":
+        """From (type, start, end, terminated_at, price, next_start) rows."""
+        types, starts, ends, terminated, prices, next_starts = (
+            zip(*rows) if rows else ((),) * 6
+        )
+        return cls(
+            type_code=np.fromiter(
+                (_TYPE_CODES[t] for t in types), np.int64, count=len(types)
+            ),
+            start=_days(starts),
+            end=_days(ends),
+            terminated=_days(terminated),
+            price=np.fromiter(prices, np.int64, count=len(prices)),
+            next_start=_days(next_starts),
+        )
+
+
+@dataclass
+class ReceivableColumns(_Columns):
+    due: np.ndarray
+    amount: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "ReceivableColumns":
+        """From (due_date, amount) rows, one per due date or per payment."""
+        dues, amounts = zip(*rows) if rows else ((), ())
+        return cls(
+            due=_days(dues),
+            amount=np.fromiter(amounts, np.int64, count=len(amounts)),
+        )
+
+
+@dataclass
+class RevenueForecast:
+    months: list[date]  # first day of each month
+    contracted: list[int]
+    expected_renewals: list[int]
+    pending_receivables: list[int]
+    overdue_receivables: int  # pending and due before the first month
+    renewal_rates: dict[str, float]
+
+
+def month_starts(first: date, count: int) -> list[date]:
+    """First days of `count` months from `first`'s month, plus the one after."""
+    index = first.year * 12 + first.month - 1
+    return [date(i // 12, i % 12 + 1, 1) for i in range(index, index + count + 1)]
+
+
+def _spread(
+    bounds: np.ndarray, start: np.ndarray, end: np.ndarray, daily: np.ndarray
+) -> np.ndarray:
+    """Sum of `daily` over each [start, end) day, per month of `bounds`."""
+    lo, hi = bounds[0], bounds[-1]
+    span = int(hi - lo)
+    first = np.clip(start - lo, 0, span)
+    last = np.clip(end - lo, 0, span)
+    delta = np.bincount(first, daily, minlength=span + 1) - np.bincount(
+        last, daily, minlength=span + 1
+    )
+    per_day = np.cumsum(delta[:-1])
+    return np.add.reduceat(per_day, bounds[:-1] - lo)
+
+
+def _renewed(agreements: AgreementColumns) -> np.ndarray:
+    gap = agreements.next_start - agreements.end
+    return (
+        (agreements.terminated == NEVER) & (gap >= 0) & (gap <= RENEWAL_GRACE_DAYS)
+    )
+
+
+def project(
+    agreements: AgreementColumns,
+    receivables: ReceivableColumns,
+    rates: dict[str, float],
+    today: date,
+    months: int,
+) -> RevenueForecast:
+    """Per calendar month from today's month: contracted revenue, expected
+    renewals and pending receivables.
+
+    `agreements` are those running in the horizon; `rates` the historical
+    renewal rate per type. Expected renewals start from agreements that end
+    between today and the horizon with no renewal booked yet. Each one renews
+    for the same term and price with its type's rate, and a renewal may renew
+    again, with the probability compounding.
+    """
+    starts = month_starts(today, months)
+    bounds = np.array([d.toordinal() for d in starts], np.int64)
+    horizon = bounds[-1]
+
+    term = np.maximum(agreements.end - agreements.start, 1)
+    daily = agreements.price / term
+    end = np.minimum(agreements.end, agreements.terminated + 1)
+    contracted = _spread(bounds, agreements.start, end, daily)
+
+    type_rates = np.array([rates.get(t, 0.0) for t in AGREEMENT_TYPES])
+    seeds = (
+        (agreements.terminated == NEVER)
+        & ~_renewed(agreements)
+        & (agreements.end >= today.toordinal())
+        & (agreements.end < horizon)
+    )
+    renewals = np.zeros(months)
+    start, term, daily = agreements.end[seeds], term[seeds], daily[seeds]
+    rate = type_rates[agreements.type_code[seeds]]
+    probability = rate.copy()
+    while start.size:
+        renewals += _spread(bounds, start, start + term, daily * probability)
+        start = start + term
+        probability = probability * rate
+        keep = (start < horizon) & (probability >= MIN_RENEWAL_PROBABILITY)
+        start, term, daily = start[keep], term[keep], daily[keep]
+        rate, probability = rate[keep], probability[keep]
+
+    due = receivables.due
+    month = np.searchsorted(bounds, due, side="right") - 1
+    in_range = (month >= 0) & (month < months)
+    pending = np.bincount(
+        month[in_range], receivables.amount[in_range], minlength=months
+    )
+    overdue = int(receivables.amount[due < bounds[0]].sum())
+
+    return RevenueForecast(
+        months=starts[:-1],
+        contracted=[round(v) for v in contracted.tolist()],
+        expected_renewals=[round(v) for v in renewals.tolist()],
+        pending_receivables=[round(v) for v in pending.tolist()],
+        overdue_receivables=overdue,
+        renewal_rates={t: rates.get(t, 0.0) for t in AGREEMENT_TYPES},
+    )
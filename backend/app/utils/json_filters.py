@@ -0,0 +1,53 @@
+"""Key/value containment filters on JSON columns.
+
+On Postgres a filter is JSONB containment (`column @> '{"key": value}'`),
+which the jsonb_path_ops GIN indexes serve, nested values included. SQLite
+has no containment operator, so each top-level key is compared with
+json_extract: scalars by value and type, nested objects and arrays by
+exact equality. That is enough for the flat dicts the audit logger writes.
+"""
+
+import json
+
+from sqlalchemy import ColumnElement, and_, func, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.utils.errors import BusinessError
+
+
+def parse_json_filter(raw: str) -> dict:
+    """Parse a `{"key": value}` query parameter."""
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = None
+    if not isinstance(value, dict) or not value:
+        raise BusinessError("篩選條件必須是非空的 JSON 物件", "INVALID_FILTER")
+    return value
+
+
+def _sqlite_match(column: ColumnElement, key: str, value: object) -> ColumnElement:
+    if '"' in key:
+        raise BusinessError("篩選欄位名稱不可包含雙引號", "INVALID_FILTER")
+    path = f'$."{key}"'
+    if value is None or isinstance(value, bool):
+        # json_extract turns true/false into 1/0 and null into NULL
+        kind = {None: "null", True: "true", False: "false"}[value]
+        return func.json_type(column, path) == kind
+    if isinstance(value, dict | list):
+        return func.json_extract(column, path) == func.json(json.dumps(value))
+    if isinstance(value, int | float):
+        # json_extract also gives 1/0 for true/false; those must not match
+        return and_(
+            func.json_type(column, path).in_(("integer", "real")),
+            func.json_extract(column, path) == value,
+        )
+    return func.json_extract(column, path) == value
+
+
+def json_contains(
+    column: ColumnElement, value: dict, dialect: str
+) -> ColumnElement[bool]:
+    if dialect == "postgresql":
+        return type_coerce(column, JSONB).contains(value)
+    return and_(*(_sqlite_match(column, k, v) for k, v in value.items()))
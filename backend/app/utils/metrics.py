@@ -0,0 +1,288 @@
+"""Prometheus-compatible metrics with low-overhead in-process counters.
+
+Metrics are plain Python counters updated on the event loop (no locks, no
+per-observation allocations beyond a label tuple) and rendered in the
+Prometheus text exposition format by GET /metrics (registered only when
+METRICS_ENABLED is set, behind METRICS_TOKEN). Gauges whose value lives
+elsewhere, such as connection pool usage, are read by callback at scrape time.
+"""
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExecutionContext
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+M = TypeVar("M", bound="Counter | Histogram")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label_names: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.label_names, k)} {v}"
+            for k, v in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Iterable[str] = (),
+        callback: Callable[[], dict[tuple[str, ...], float]] | None = None,
+    ) -> None:
+        super().__init__(name, help, label_names)
+        self.callback = callback
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def samples(self) -> list[str]:
+        if self.callback is not None:
+            self._values = self.callback()
+        return super().samples()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += n
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            base = _labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{base} {series[-1]}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def register(self, metric: M) -> M:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ("method", "route", "status"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served")
+)
+db_statement_duration = registry.register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "Duration of SQL statements sent to the database",
+        buckets=DB_BUCKETS,
+    )
+)
+cache_requests = registry.register(
+    Counter("cache_requests_total", "Cache lookups by result", ("cache", "result"))
+)
+cache_hit_ratio = registry.register(
+    Gauge(
+        "cache_hit_ratio",
+        "Share of cache lookups served from the cache",
+        ("cache",),
+        callback=lambda: _cache_hit_ratios(),
+    )
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+def _cache_hit_ratios() -> dict[tuple[str, ...], float]:
+    caches = {labels[0] for labels in cache_requests._values}
+    ratios = {}
+    for cache in caches:
+        hits = cache_requests.value(cache, "hit")
+        total = hits + cache_requests.value(cache, "miss")
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+
+def register_pool_gauges(sync_engine: Engine) -> None:
+    """Expose connection pool usage of an engine, read at scrape time."""
+    pool = sync_engine.pool
+
+    def read(attr: str) -> Callable[[], dict[tuple[str, ...], float]]:
+        method = getattr(pool, attr, None)
+        return lambda: {(): float(method())} if method else {}
+
+    registry.register(
+        Gauge(
+            "db_pool_checked_out",
+            "Connections currently checked out of the pool",
+            callback=read("checkedout"),
+        )
+    )
+    registry.register(
+        Gauge(
+            "db_pool_overflow",
+            "Connections open beyond pool_size",
+            callback=read("overflow"),
+        )
+    )
+    registry.register(
+        Gauge("db_pool_size", "Configured pool size", callback=read("size"))
+    )
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: object,
+    statement: str,
+    parameters: object,
+    context: ExecutionContext,
+    *args: object,
+) -> None:
+    # On the execution context rather than conn.info: after_cursor_execute
+    # never fires for a statement that raises
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: object,
+    statement: str,
+    parameters: object,
+    context: ExecutionContext,
+    *args: object,
+) -> None:
+    db_statement_duration.observe(time.perf_counter() - context.metrics_start)
+
+
+def instrument_engine_metrics(sync_engine: Engine) -> None:
+    """Record statement durations of an engine (idempotent)."""
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route as a template, e.g. /api/v1/sites/{site_id}.
+
+    Taken from the route itself so label cardinality stays bounded; requests
+    no route matched share one label. FastAPI versions that include routers
+    lazily keep the route's own path on the route and put the full one on
+    the effective route context of the scope.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(effective, "path", None) or template
+
+
+class MetricsMiddleware:
+    """Records latency per route template and the number of in-flight requests."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                route_template(scope),
+                status,
+            )
@@ -12,31 +12,30 @@ if TYPE_CHECKING:
     from app.models.tag import Tag
 
 
-def compute_space_price(
-    site: Site,
-    tags: list[str],
-    all_tags: list[Tag],
-    custom_price: int | None,
-) -> dict:
-    """Compute the effective price for a space.
-
-    Priority: Custom price > Tag price > Site base price.
-    Returns dict with keys: monthly, daily, tier, tag_name (if tag-priced).
-    """
-    site_monthly = site.monthly_base_price or 0
-    site_daily = site.daily_base_price or 0
-
-    # Start with site base price
-    monthly = site_monthly
-    daily = site_daily
-    tier = "site"
-    tag_name = None
-
-    # Tag price overrides site base
-    if tags:
-        tag_map = {t.name: t for t in all_tags}
+class PricingCatalog:
+    """Tag prices indexed by name, built once to price many spaces."""
+
+    def __init__(self, all_tags: list[Tag]) -> None:
+        self.tags = {t.name: t for t in all_tags}
+
+    def price(self, site: Site, tags: list[str], custom_price: int | None) -> dict:
+        """Compute the effective price for a space.
+
+        Priority: Custom price > Tag price > Site base price.
+        Returns dict with keys: monthly, daily, tier, tag_name (if tag-priced).
+        """
+        site_monthly = site.monthly_base_price or 0
+        site_daily = site.daily_base_price or 0
+
+        # Start with site base price
+        monthly = site_monthly
+        daily = site_daily
+        tier = "site"
+        tag_name = None
+
+        # Tag price overrides site base
         for tag_str in tags:
-            tag = tag_map.get(tag_str)
+            tag = self.tags.get(tag_str)
             if tag and (tag.monthly_price is not None or tag.daily_price is not None):
                 if tag.monthly_price is not None:
                     monthly = tag.monthly_price
@@ -46,16 +45,26 @@ def compute_space_price(
                 tag_name = tag.name
                 break
 
-    # Custom price has highest priority — overrides both site and tag
-    if custom_price is not None:
-        monthly = custom_price
-        tier = "custom"
-
-    return {
-        "monthly": monthly,
-        "daily": daily,
-        "tier": tier,
-        "tag_name": tag_name,
-        "site_monthly": site_monthly,
-        "site_daily": site_daily,
-    }
+        # Custom price has highest priority — overrides both site and tag
+        if custom_price is not None:
+            monthly = custom_price
+            tier = "custom"
+
+        return {
+            "monthly": monthly,
+            "daily": daily,
+            "tier": tier,
+            "tag_name": tag_name,
+            "site_monthly": site_monthly,
+            "site_daily": site_daily,
+        }
+
+
+def compute_space_price(
+    site: Site,
+    tags: list[str],
+    all_tags: list[Tag],
+    custom_price: int | None,
+) -> dict:
+    """Compute the effective price for a single space."""
+    return PricingCatalog(all_tags).price(site, tags, custom_price)
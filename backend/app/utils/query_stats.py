@@ -0,0 +1,140 @@
+"""Per-request SQL statement instrumentation and N+1 detection.
+
+Opt-in via QUERY_STATS_ENABLED. Cursor events on the engine record every
+statement into the QueryStats of the current request (held in a context
+variable set by QueryStatsMiddleware). The middleware reports the totals in a
+`Server-Timing` header and a debug log line, and warns when one statement
+shape runs more than QUERY_STATS_N_PLUS_ONE_THRESHOLD times in a request.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExecutionContext
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_POSITIONAL = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"IN \((?:\?(?:, )?)+\)", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement to its shape: no literals, no IN-list length."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _POSITIONAL.sub("?", shape)
+    shape = _LITERAL.sub("?", shape)
+    return _IN_LIST.sub("IN (...)", shape)
+
+
+class QueryStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints: Counter[str] = Counter()
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes that ran more than `threshold` times."""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n > threshold]
+
+    def server_timing(self, n_plus_one_threshold: int) -> str:
+        timing = f'db;dur={self.total_ms:.1f};desc="{self.count} statements"'
+        repeated = self.repeated(n_plus_one_threshold)
+        if repeated:
+            timing += f', n-plus-one;desc="{repeated[0][1]}x same statement"'
+        return timing
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def current_stats() -> QueryStats | None:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: object,
+    statement: str,
+    parameters: object,
+    context: ExecutionContext,
+    *args: object,
+) -> None:
+    # Kept on the execution context, which is dropped with the statement:
+    # after_cursor_execute never fires for a statement that raises
+    context.query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: object,
+    statement: str,
+    parameters: object,
+    context: ExecutionContext,
+    *args: object,
+) -> None:
+    stats = _current_stats.get()
+    if stats is not None:
+        started = context.query_stats_start
+        stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+def instrument_engine(sync_engine: Engine) -> None:
+    """Attach the statement recorders to an engine (idempotent)."""
+    if not event.contains(
+        sync_engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Collects QueryStats per HTTP request and reports them."""
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 10) -> None:
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", stats.server_timing(self.n_plus_one_threshold)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope: Scope, stats: QueryStats) -> None:
+        route = f"{scope['method']} {scope['path']}"
+        logger.debug(
+            "%s: %d statements, %.1fms in database", route, stats.count, stats.total_ms
+        )
+        for shape, count in stats.repeated(self.n_plus_one_threshold):
+            logger.warning("Possible N+1 in %s: %dx %s", route, count, shape[:200])
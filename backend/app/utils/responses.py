@@ -0,0 +1,39 @@
+"""JSON responses serialized by pydantic-core instead of json.dumps.
+
+`FastJSONResponse` is the app's default response class. List routes return
+`list_response(Model, rows)`: the rows were validated when the response models
+were built, so they are dumped straight to bytes by a cached, compiled
+`TypeAdapter` instead of being validated again against `response_model` and
+serialized through the generic encoder.
+"""
+
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that accepts pre-serialized bytes and encodes in Rust."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+@lru_cache
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])  # type: ignore[valid-type]
+
+
+def list_response(
+    model: type[BaseModel], rows: Sequence[BaseModel], status_code: int = 200
+) -> FastJSONResponse:
+    """Serialize already-built response models without re-validating them."""
+    return FastJSONResponse(
+        _list_adapter(model).dump_json(list(rows)), status_code=status_code
+    )
@@ -0,0 +1,66 @@
+"""Day-interval arithmetic for space occupancy timelines.
+
+Intervals are half-open [start, end) in days, like agreements: the end_date
+is the first day the space can be booked again (see the overlap check in
+AgreementService.create). The API converts them to inclusive last days.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date
+from uuid import UUID
+
+
+@dataclass
+class Occupied:
+    start: date
+    end: date
+    agreement_ids: list[UUID] = field(default_factory=list)
+
+
+def merge(
+    intervals: Iterable[tuple[date, date, UUID]], start: date, end: date
+) -> list[Occupied]:
+    """Clip to [start, end) and merge overlapping or touching intervals."""
+    merged: list[Occupied] = []
+    for lo, hi, agreement_id in sorted(intervals, key=lambda i: (i[0], i[1])):
+        lo, hi = max(lo, start), min(hi, end)
+        if lo >= hi:
+            continue
+        if merged and lo <= merged[-1].end:
+            merged[-1].end = max(merged[-1].end, hi)
+            merged[-1].agreement_ids.append(agreement_id)
+        else:
+            merged.append(Occupied(lo, hi, [agreement_id]))
+    return merged
+
+
+def gaps(merged: list[Occupied], start: date, end: date) -> list[tuple[date, date]]:
+    """The free intervals of [start, end) around merged occupied ones."""
+    free = []
+    cursor = start
+    for interval in merged:
+        if interval.start > cursor:
+            free.append((cursor, interval.start))
+        cursor = interval.end
+    if cursor < end:
+        free.append((cursor, end))
+    return free
+
+
+def day_runs(merged: list[Occupied], start: date, end: date) -> list[int]:
+    """Run-length encoded day bitmap of [start, end).
+
+    Run lengths in days, alternating free and occupied and always starting
+    with a free run (0 when the first day is occupied); they sum to the
+    number of days. A space free for all 30 days is [30].
+    """
+    runs = []
+    cursor = start
+    for interval in merged:
+        runs.append((interval.start - cursor).days)
+        runs.append((interval.end - interval.start).days)
+        cursor = interval.end
+    if cursor < end or not runs:
+        runs.append((end - cursor).days)
+    return runs
@@ -0,0 +1,149 @@
+"""Serialization cost of 500-row list pages, per response path.
+
+Compares, for SpaceResponse / AgreementResponse / CustomerResponse pages:
+  fastapi<0.130   model_dump per row, re-validate the dicts against
+                  response_model, dump to JSON-able Python, json.dumps
+  fastapi>=0.130  re-validate the instances, TypeAdapter.dump_json
+  list_response   TypeAdapter.dump_json of the instances (no validation)
+
+Only the work done after the route has built its response models is timed.
+
+Example:
+    python benchmarks/serialize_lists.py --rows 500 --iterations 200
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Callable
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydantic import BaseModel, TypeAdapter
+
+from app.schemas.agreement import AgreementResponse
+from app.schemas.customer import CustomerResponse
+from app.schemas.space import SpaceResponse
+from app.utils.responses import list_response
+
+
+def _spaces(n: int) -> list[SpaceResponse]:
+    site_id = uuid.uuid4()
+    return [
+        SpaceResponse(
+            id=uuid.uuid4(),
+            site_id=site_id,
+            name=f"A-{i:03d}",
+            status="available",
+            tags=["有頂", "大車位"],
+            custom_price=None,
+            site_name="信義停車場",
+            effective_monthly_price=3600,
+            effective_daily_price=150,
+            price_tier="tag",
+            price_tag_name="有頂",
+            computed_status="occupied" if i % 2 else "available",
+            active_agreement_id=uuid.uuid4() if i % 2 else None,
+            version=1,
+        )
+        for i in range(n)
+    ]
+
+
+def _agreements(n: int) -> list[AgreementResponse]:
+    return [
+        AgreementResponse(
+            id=uuid.uuid4(),
+            customer_id=uuid.uuid4(),
+            space_id=uuid.uuid4(),
+            agreement_type="monthly",
+            start_date=date(2026, 1, 1),
+            end_date=date(2026, 1, 31),
+            price=3600,
+            license_plates="ABC-1234, XYZ-5678",
+            notes=None,
+            customer_name="王小明",
+            space_name=f"A-{i:03d}",
+            payment_status="pending",
+            version=1,
+        )
+        for i in range(n)
+    ]
+
+
+def _customers(n: int) -> list[CustomerResponse]:
+    return [
+        CustomerResponse(
+            id=uuid.uuid4(),
+            name=f"客戶{i}",
+            phone=f"0912{i:06d}",
+            contact_phone=None,
+            email=f"c{i}@example.com",
+            notes=None,
+            active_agreement_count=i % 3,
+        )
+        for i in range(n)
+    ]
+
+
+def _paths(model: type[BaseModel]) -> dict[str, Callable[[list], bytes]]:
+    adapter = TypeAdapter(list[model])
+
+    def legacy(rows: list) -> bytes:
+        dumped = [row.model_dump() for row in rows]
+        value = adapter.validate_python(dumped, from_attributes=True)
+        content = adapter.dump_python(value, mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def current(rows: list) -> bytes:
+        value = adapter.validate_python(rows, from_attributes=True)
+        return adapter.dump_json(value)
+
+    return {
+        "fastapi<0.130": legacy,
+        "fastapi>=0.130": current,
+        "list_response": lambda rows: list_response(model, rows).body,
+    }
+
+
+def _median_ms(fn: Callable[[list], bytes], rows: list, iterations: int) -> float:
+    fn(rows)  # warm-up (builds cached adapters)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(rows)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    pages = {
+        "SpaceResponse": (SpaceResponse, _spaces(args.rows)),
+        "AgreementResponse": (AgreementResponse, _agreements(args.rows)),
+        "CustomerResponse": (CustomerResponse, _customers(args.rows)),
+    }
+    print(f"{args.rows}-row pages, median of {args.iterations} runs")
+    for name, (model, rows) in pages.items():
+        timings = {
+            path: _median_ms(fn, rows, args.iterations)
+            for path, fn in _paths(model).items()
+        }
+        fastest = timings["list_response"]
+        print(f"  {name}")
+        for path, ms in timings.items():
+            print(f"    {path:<16} {ms:>7.3f}ms  x{ms / fastest:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Cold-start benchmark: interpreter start to first HTTP response.
+
+Each run starts a fresh interpreter that imports app.main, runs the lifespan
+startup and answers GET /health in-process, then reports:
+  import      import app.main
+  lifespan    lifespan startup (event bus, background tasks; the database
+              warm-up only with --warmup, since the default in-memory SQLite
+              database has no tables to warm)
+  first_req   first GET /health, including lazy imports it triggers
+  total       wall time of the whole process, as seen by this script
+It also lists the heavy libraries already loaded after `import app.main`;
+these are meant to load on first use (login, plate decryption, agreements).
+
+The run fails when the median total exceeds --target-ms, the
+time-to-first-response budget for an auto-started Fly machine.
+
+Examples:
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --importtime   # top modules by import time
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+TARGET_MS = 1500.0
+
+# Imported on first use; none of them should be loaded by `import app.main`
+DEFERRED_MODULES = ("passlib", "jose", "bcrypt", "cryptography", "dateutil", "numpy")
+
+CHILD = f"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+loaded = [m for m in {DEFERRED_MODULES!r} if m in sys.modules]
+from httpx import ASGITransport, AsyncClient
+
+async def main():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        t2 = time.perf_counter()
+        transport = ASGITransport(app=app.main.app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as ac:
+            resp = await ac.get("/health")
+            assert resp.status_code == 200, resp.status_code
+        t3 = time.perf_counter()
+    return t2, t3
+
+t2, t3 = asyncio.run(main())
+print(json.dumps({{
+    "import": (t1 - t0) * 1000,
+    "lifespan": (t2 - t1) * 1000,
+    "first_req": (t3 - t2) * 1000,
+    "deferred_loaded": loaded,
+}}))
+"""
+
+
+def _env(database_url: str, warmup: bool = False) -> dict[str, str]:
+    # DEBUG skips the production-secrets check, which needs real keys
+    return {
+        **os.environ,
+        "DEBUG": "true",
+        "DATABASE_URL": database_url,
+        "WARMUP_ENABLED": str(warmup).lower(),
+    }
+
+
+def _run_once(database_url: str, warmup: bool) -> dict:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=BACKEND,
+        env=_env(database_url, warmup),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["total"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def _importtime(database_url: str, top: int) -> None:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND,
+        env=_env(database_url),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    print(f"top {top} imports by cumulative time (us)")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative:>9}  {name}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite://")
+    parser.add_argument("--warmup", action="store_true")
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        _importtime(args.database_url, args.top)
+        return 0
+
+    _run_once(args.database_url, args.warmup)  # warm OS file cache and .pyc
+    runs = [_run_once(args.database_url, args.warmup) for _ in range(args.runs)]
+    print(f"cold start, median of {args.runs} runs")
+    for phase in ("import", "lifespan", "first_req", "total"):
+        print(f"  {phase:<10} {statistics.median(r[phase] for r in runs):>8.1f}ms")
+
+    failed = False
+    loaded = sorted({m for r in runs for m in r["deferred_loaded"]})
+    if loaded:
+        print(f"FAIL loaded at import: {', '.join(loaded)}")
+        failed = True
+    total = statistics.median(r["total"] for r in runs)
+    if total > args.target_ms:
+        print(f"FAIL time to first response {total:.0f}ms > {args.target_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,591 @@
+"""Synthetic data generator for benchmarking at configurable scale.
+
+Unlike seed.py (a fixed demo dataset inserted row by row), this script writes
+realistic volumes with bulk `INSERT ... VALUES` batches, or Postgres `COPY`
+with --copy. Every chunk of rows is generated from (seed, table, chunk index),
+so output is identical for the same arguments regardless of worker count.
+
+Examples:
+    python scripts/generate_data.py --scale small --create-schema
+    python scripts/generate_data.py --sites 50 --spaces 100000 \\
+        --customers 500000 --agreements 5000000 --audit-logs 20000000 \\
+        --workers 8 --copy
+
+A benchmark admin (bench@ping.tw / Password123) is created for API runs.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from functools import cache
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import JSON, Table
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from app.config import settings
+from app.models import Base
+from app.models.admin_user import AdminUser
+from app.models.agreement import Agreement
+from app.models.customer import Customer
+from app.models.payment import Payment
+from app.models.site import Site
+from app.models.space import Space
+from app.models.system_log import SystemLog
+from app.models.tag import Tag
+from app.services.agreement_service import _calc_end_date
+from app.utils.auth import hash_password
+from app.utils.crypto import encrypt_license_plate
+from app.utils.pricing import PricingCatalog
+
+BENCH_ADMIN_EMAIL = "bench@ping.tw"
+BENCH_ADMIN_PASSWORD = "Password123"
+
+SCALES = {
+    "tiny": dict(sites=3, spaces=100, customers=200, agreements=600, audit_logs=2000),
+    "small": dict(
+        sites=5, spaces=1_000, customers=5_000, agreements=20_000, audit_logs=50_000
+    ),
+    "medium": dict(
+        sites=20,
+        spaces=10_000,
+        customers=50_000,
+        agreements=500_000,
+        audit_logs=2_000_000,
+    ),
+    "large": dict(
+        sites=50,
+        spaces=100_000,
+        customers=500_000,
+        agreements=5_000_000,
+        audit_logs=20_000_000,
+    ),
+}
+
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝郭洪曾邱廖賴周徐蘇葉莊呂江何蕭羅高"
+GIVEN_CHARS = "家志明俊建文宏華美淑惠芬玲雅婷怡君佳慧雯偉豪傑信宗國正翔"
+TAGS = [
+    {"name": "有屋頂", "color": "#3B82F6", "monthly_price": None, "daily_price": None},
+    {"name": "VIP", "color": "#EF4444", "monthly_price": 5000, "daily_price": 200},
+    {"name": "大車位", "color": "#F59E0B", "monthly_price": 4200, "daily_price": None},
+    {"name": "機車位", "color": "#10B981", "monthly_price": 800, "daily_price": 50},
+    {
+        "name": "殘障車位",
+        "color": "#8B5CF6",
+        "monthly_price": None,
+        "daily_price": None,
+    },
+]
+AGREEMENT_TYPES = ["daily", "monthly", "quarterly", "yearly"]
+AGREEMENT_WEIGHTS = [15, 60, 18, 7]
+# Months charged per term on the space's monthly price; a year is charged 11
+MONTHS_CHARGED = {"monthly": 1, "quarterly": 3, "yearly": 11}
+AUDIT_TABLES = ["agreements", "payments", "spaces", "customers"]
+
+# Kind tags mixed into deterministic UUIDs so ids never collide across tables
+KIND = {
+    "admin": 1,
+    "site": 2,
+    "tag": 3,
+    "space": 4,
+    "customer": 5,
+    "agreement": 6,
+    "payment": 7,
+    "log": 8,
+}
+
+
+@dataclass(frozen=True)
+class GeneratorConfig:
+    database_url: str
+    sites: int
+    spaces: int
+    customers: int
+    agreements: int
+    audit_logs: int
+    seed: int = 42
+    batch_size: int = 5_000
+    workers: int = 1
+    use_copy: bool = False
+    create_schema: bool = False
+    anchor_date: date = field(default_factory=date.today)
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.database_url.startswith("sqlite")
+
+
+def det_uuid(seed: int, kind: str, index: int) -> UUID:
+    """Deterministic, collision-free UUID for row `index` of a table."""
+    value = ((seed & 0xFFFF) << 112) | (KIND[kind] << 96) | index
+    return UUID(int=value, version=4)
+
+
+def _rng(config: GeneratorConfig, table: str, chunk: int) -> random.Random:
+    return random.Random(f"{config.seed}:{table}:{chunk}")
+
+
+def _ts(day: date, rng: random.Random) -> datetime:
+    return datetime.combine(day, dt_time(8)) + timedelta(seconds=rng.randrange(36000))
+
+
+@cache
+def _plate_pool(seed: int) -> tuple[tuple[str, str], ...]:
+    """A small pool of (plaintext, ciphertext) plates; Fernet per row is slow."""
+    rng = random.Random(f"{seed}:plates")
+    letters = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+    plates = []
+    for _ in range(256):
+        plain = "".join(rng.choices(letters, k=3)) + f"-{rng.randrange(10000):04d}"
+        plates.append((plain, encrypt_license_plate(plain)))
+    return tuple(plates)
+
+
+# ---------------------------------------------------------------------------
+# Row generators — each yields the rows of one chunk
+# ---------------------------------------------------------------------------
+
+
+def gen_sites(config: GeneratorConfig) -> list[dict]:
+    rng = _rng(config, "sites", 0)
+    now = datetime.combine(config.anchor_date, dt_time(0))
+    rows = []
+    for i in range(config.sites):
+        monthly = rng.randrange(2400, 4800, 100)
+        rows.append(
+            {
+                "id": det_uuid(config.seed, "site", i),
+                "name": f"S{i + 1:02d}場",
+                "address": f"屏東市測試路{i + 1}號",
+                "description": None,
+                "monthly_base_price": monthly,
+                "daily_base_price": monthly // 24,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+    return rows
+
+
+def gen_tags(config: GeneratorConfig) -> list[dict]:
+    now = datetime.combine(config.anchor_date, dt_time(0))
+    return [
+        {
+            "id": det_uuid(config.seed, "tag", i),
+            "description": None,
+            "created_at": now,
+            "updated_at": now,
+            **tag,
+        }
+        for i, tag in enumerate(TAGS)
+    ]
+
+
+def gen_spaces(
+    config: GeneratorConfig, start: int, stop: int, chunk: int
+) -> list[dict]:
+    rng = _rng(config, "spaces", chunk)
+    now = datetime.combine(config.anchor_date, dt_time(0))
+    rows = []
+    for i in range(start, stop):
+        site = i % config.sites
+        roll = rng.random()
+        tags = (
+            []
+            if roll < 0.7
+            else rng.sample([t["name"] for t in TAGS], k=1 + (roll > 0.95))
+        )
+        rows.append(
+            {
+                "id": det_uuid(config.seed, "space", i),
+                "site_id": det_uuid(config.seed, "site", site),
+                "name": f"P-{i // config.sites + 1:05d}",
+                "status": "maintenance" if rng.random() < 0.01 else "available",
+                "tags": tags,
+                "custom_price": rng.randrange(2000, 6000, 100)
+                if rng.random() < 0.05
+                else None,
+                "version": 1,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+    return rows
+
+
+def gen_customers(
+    config: GeneratorConfig, start: int, stop: int, chunk: int
+) -> list[dict]:
+    rng = _rng(config, "customers", chunk)
+    now = datetime.combine(config.anchor_date, dt_time(0))
+    rows = []
+    for i in range(start, stop):
+        name = rng.choice(SURNAMES) + "".join(rng.choices(GIVEN_CHARS, k=2))
+        # Bijective over 0..10^8 (7919 is coprime with 10^8) -> unique phones
+        phone = f"09{(i * 7919 + config.seed) % 10**8:08d}"
+        rows.append(
+            {
+                "id": det_uuid(config.seed, "customer", i),
+                "name": name,
+                "phone": phone,
+                "contact_phone": None,
+                "email": f"c{i}@example.com" if rng.random() < 0.3 else None,
+                "notes": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+    return rows
+
+
+@cache
+def _pricing(config: GeneratorConfig) -> tuple[PricingCatalog, list[Site]]:
+    """The tag catalog and sites the app prices spaces with."""
+    catalog = PricingCatalog([Tag(**row) for row in gen_tags(config)])
+    return catalog, [Site(**row) for row in gen_sites(config)]
+
+
+def _agreement_price(pricing: dict, agreement_type: str) -> int:
+    if agreement_type == "daily":
+        return pricing["daily"]
+    return pricing["monthly"] * MONTHS_CHARGED[agreement_type]
+
+
+def _agreements_for_space(config: GeneratorConfig, space: int) -> tuple[int, int]:
+    """(first agreement index, agreement count) for a space."""
+    per_space, extra = divmod(config.agreements, config.spaces)
+    first = space * per_space + min(space, extra)
+    return first, per_space + (1 if space < extra else 0)
+
+
+def gen_agreements(
+    config: GeneratorConfig, start: int, stop: int, chunk: int
+) -> tuple[list[dict], list[dict]]:
+    """Agreements and their payments for spaces [start, stop).
+
+    Each space gets a back-to-back chain of agreements ending around the anchor
+    date; chains mostly keep the same customer so renewals look realistic.
+    Prices follow the space's effective price (custom > tag > site), as the
+    app computes it. The chunk's spaces are generated again for that: same
+    (start, stop, chunk), so the same rows.
+    """
+    rng = _rng(config, "agreements", chunk)
+    plates = _plate_pool(config.seed)
+    today = config.anchor_date
+    catalog, sites = _pricing(config)
+    space_rows = gen_spaces(config, start, stop, chunk)
+    agreements: list[dict] = []
+    payments: list[dict] = []
+    for space, space_row in zip(range(start, stop), space_rows):
+        pricing = catalog.price(
+            sites[space % config.sites], space_row["tags"], space_row["custom_price"]
+        )
+        first, count = _agreements_for_space(config, space)
+        cursor = today + timedelta(days=rng.randrange(-60, 90))
+        customer = rng.randrange(config.customers)
+        chain = []
+        for _ in range(count):
+            agreement_type = rng.choices(AGREEMENT_TYPES, AGREEMENT_WEIGHTS)[0]
+            span = {
+                "daily": relativedelta(days=1),
+                "monthly": relativedelta(months=1),
+                "quarterly": relativedelta(months=3),
+                "yearly": relativedelta(years=1),
+            }[agreement_type]
+            start_date = cursor - span
+            chain.append((agreement_type, start_date, customer))
+            cursor = start_date - timedelta(days=rng.choice([0, 0, 0, 1, 7, 30]))
+            if rng.random() < 0.3:
+                customer = rng.randrange(config.customers)
+        for offset, (agreement_type, start_date, customer) in enumerate(
+            reversed(chain)
+        ):
+            index = first + offset
+            end_date = _calc_end_date(start_date, agreement_type)
+            price = _agreement_price(pricing, agreement_type)
+            terminated = end_date < today and rng.random() < 0.05
+            plain, cipher = rng.choice(plates)
+            created = _ts(start_date - timedelta(days=rng.randrange(0, 5)), rng)
+            agreement_id = det_uuid(config.seed, "agreement", index)
+            agreements.append(
+                {
+                    "id": agreement_id,
+                    "customer_id": det_uuid(config.seed, "customer", customer),
+                    "space_id": det_uuid(config.seed, "space", space),
+                    "agreement_type": agreement_type,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "price": price,
+                    "license_plates": cipher,
+                    "notes": None,
+                    "terminated_at": _ts(end_date - timedelta(days=1), rng)
+                    if terminated
+                    else None,
+                    "termination_reason": "提前解約" if terminated else None,
+                    "version": 1,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+            )
+            if terminated:
+                status = "voided"
+            elif start_date <= today and rng.random() < 0.9:
+                status = "completed"
+            else:
+                status = "pending"
+            paid_on = start_date + timedelta(days=rng.randrange(0, 10))
+            payments.append(
+                {
+                    "id": det_uuid(config.seed, "payment", index),
+                    "agreement_id": agreement_id,
+                    "amount": price,
+                    "status": status,
+                    "payment_date": paid_on if status == "completed" else None,
+                    "due_date": start_date,
+                    "bank_reference": f"TXN-{index:09d}"
+                    if status == "completed"
+                    else None,
+                    "notes": None,
+                    "version": 1,
+                    "created_at": created,
+                    "updated_at": created,
+                }
+            )
+    return agreements, payments
+
+
+def gen_audit_logs(
+    config: GeneratorConfig, start: int, stop: int, chunk: int
+) -> list[dict]:
+    """Audit entries spread evenly over two years, oldest first."""
+    rng = _rng(config, "audit_logs", chunk)
+    admin_id = det_uuid(config.seed, "admin", 0)
+    window = timedelta(days=730).total_seconds()
+    origin = datetime.combine(config.anchor_date, dt_time(0)) - timedelta(days=730)
+    total = max(config.audit_logs, 1)
+    rows = []
+    for i in range(start, stop):
+        table = rng.choice(AUDIT_TABLES)
+        kind, count = {
+            "agreements": ("agreement", config.agreements),
+            "payments": ("payment", config.agreements),
+            "spaces": ("space", config.spaces),
+            "customers": ("customer", config.customers),
+        }[table]
+        action = rng.choices(["CREATE", "UPDATE", "DELETE"], [45, 50, 5])[0]
+        if table == "payments":
+            old = {"status": "pending", "payment_date": None, "bank_reference": None}
+            new = {"status": "completed", "bank_reference": f"TXN-{i:09d}"}
+        elif table == "spaces":
+            old = {"custom_price": None}
+            new = {"custom_price": rng.randrange(2000, 6000, 100)}
+        else:
+            old = {"notes": None}
+            new = {"notes": f"備註 {i}"}
+        rows.append(
+            {
+                "id": det_uuid(config.seed, "log", i),
+                "user_id": admin_id,
+                "action": action,
+                "table_name": table,
+                "record_id": det_uuid(config.seed, kind, rng.randrange(max(count, 1))),
+                "old_values": None if action == "CREATE" else old,
+                "new_values": None if action == "DELETE" else new,
+                "ip_address": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}",
+                "batch_id": None,
+                "metadata": None,
+                "created_at": origin + timedelta(seconds=window * i / total),
+            }
+        )
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+
+def _to_records(table: Table, rows: list[dict]) -> list[tuple]:
+    json_columns = {c.name for c in table.columns if isinstance(c.type, JSON)}
+    columns = [c.name for c in table.columns]
+    return [
+        tuple(
+            json.dumps(row[c]) if c in json_columns and row[c] is not None else row[c]
+            for c in columns
+        )
+        for row in rows
+    ]
+
+
+async def write_rows(
+    conn: AsyncConnection, table: Table, rows: list[dict], use_copy: bool
+) -> None:
+    if not rows:
+        return
+    if use_copy:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name,
+            records=_to_records(table, rows),
+            columns=[c.name for c in table.columns],
+        )
+    else:
+        # executemany: SQLAlchemy batches these into multi-row INSERT ... VALUES
+        await conn.execute(table.insert(), rows)
+
+
+def _chunks(total: int, batch_size: int) -> list[tuple[int, int, int]]:
+    return [
+        (chunk, start, min(start + batch_size, total))
+        for chunk, start in enumerate(range(0, total, batch_size))
+    ]
+
+
+PHASES: dict[str, Callable[[GeneratorConfig], int]] = {
+    "spaces": lambda c: c.spaces,
+    "customers": lambda c: c.customers,
+    # Agreements are chunked by space so each chain is generated in one place
+    "agreements": lambda c: c.spaces,
+    "audit_logs": lambda c: c.audit_logs,
+}
+
+
+async def _write_chunks(
+    config: GeneratorConfig, phase: str, chunks: list[tuple[int, int, int]]
+) -> int:
+    engine = create_async_engine(config.database_url)
+    written = 0
+    try:
+        for chunk, start, stop in chunks:
+            async with engine.begin() as conn:
+                if phase == "spaces":
+                    rows = gen_spaces(config, start, stop, chunk)
+                    await write_rows(conn, Space.__table__, rows, config.use_copy)
+                elif phase == "customers":
+                    rows = gen_customers(config, start, stop, chunk)
+                    await write_rows(conn, Customer.__table__, rows, config.use_copy)
+                elif phase == "agreements":
+                    rows, payments = gen_agreements(config, start, stop, chunk)
+                    await write_rows(conn, Agreement.__table__, rows, config.use_copy)
+                    await write_rows(conn, Payment.__table__, payments, config.use_copy)
+                else:
+                    rows = gen_audit_logs(config, start, stop, chunk)
+                    await write_rows(conn, SystemLog.__table__, rows, config.use_copy)
+            written += len(rows)
+    finally:
+        await engine.dispose()
+    return written
+
+
+def _worker(config: GeneratorConfig, phase: str, chunks: list) -> int:
+    return asyncio.run(_write_chunks(config, phase, chunks))
+
+
+def _split(items: list, parts: int) -> Iterator[list]:
+    for i in range(parts):
+        part = items[i::parts]
+        if part:
+            yield part
+
+
+async def generate(config: GeneratorConfig, quiet: bool = False) -> dict[str, float]:
+    """Populate the database; returns seconds spent per phase."""
+    log = (lambda *a: None) if quiet else print
+    engine = create_async_engine(config.database_url)
+    timings: dict[str, float] = {}
+    try:
+        async with engine.begin() as conn:
+            if config.create_schema:
+                await conn.run_sync(Base.metadata.create_all)
+            await write_rows(
+                conn,
+                AdminUser.__table__,
+                [
+                    {
+                        "id": det_uuid(config.seed, "admin", 0),
+                        "email": BENCH_ADMIN_EMAIL,
+                        "hashed_password": hash_password(BENCH_ADMIN_PASSWORD),
+                        "display_name": "壓測管理員",
+                        "is_active": True,
+                        "created_at": datetime.combine(config.anchor_date, dt_time(0)),
+                        "updated_at": datetime.combine(config.anchor_date, dt_time(0)),
+                    }
+                ],
+                use_copy=False,
+            )
+            await write_rows(conn, Site.__table__, gen_sites(config), False)
+            await write_rows(conn, Tag.__table__, gen_tags(config), False)
+
+        for phase, total_of in PHASES.items():
+            started = time.perf_counter()
+            chunks = _chunks(total_of(config), config.batch_size)
+            if config.workers <= 1:
+                written = await _write_chunks(config, phase, chunks)
+            else:
+                loop = asyncio.get_running_loop()
+                with ProcessPoolExecutor(config.workers) as pool:
+                    futures = [
+                        loop.run_in_executor(pool, _worker, config, phase, part)
+                        for part in _split(chunks, config.workers)
+                    ]
+                    written = sum(await asyncio.gather(*futures))
+            timings[phase] = time.perf_counter() - started
+            log(f"  {phase}: {written:,} rows in {timings[phase]:.1f}s")
+    finally:
+        await engine.dispose()
+    return timings
+
+
+def _parse_args(argv: list[str] | None = None) -> GeneratorConfig:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=settings.direct_database_url)
+    parser.add_argument("--scale", choices=SCALES, default="tiny")
+    for name in ("sites", "spaces", "customers", "agreements", "audit-logs"):
+        parser.add_argument(f"--{name}", type=int, help="overrides --scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--copy", action="store_true", help="use Postgres COPY")
+    parser.add_argument("--create-schema", action="store_true")
+    parser.add_argument("--anchor-date", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args(argv)
+
+    sizes = dict(SCALES[args.scale])
+    for key in sizes:
+        override = getattr(args, key)
+        if override is not None:
+            sizes[key] = override
+    config = GeneratorConfig(
+        database_url=args.database_url,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        use_copy=args.copy,
+        create_schema=args.create_schema,
+        anchor_date=args.anchor_date,
+        **sizes,
+    )
+    if config.is_sqlite and (config.workers > 1 or config.use_copy):
+        print("SQLite: using a single worker and INSERT batches")
+        config = replace(config, workers=1, use_copy=False)
+    return config
+
+
+if __name__ == "__main__":
+    cfg = _parse_args()
+    print(f"Generating {json.dumps(asdict(cfg), default=str, ensure_ascii=False)}")
+    started = time.perf_counter()
+    asyncio.run(generate(cfg))
+    print(f"\nDone in {time.perf_counter() - started:.1f}s")
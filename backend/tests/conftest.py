@@ -10,6 +10,10 @@ from app.database import get_db
 from app.main import app
 from app.models import Base
 from app.models.admin_user import AdminUser
+from app.services.idempotency import idempotency_store
+from app.services.lookup_index import customer_lookup, space_lookup
+from app.services.overdue_tracker import overdue_tracker
+from app.services.report_service import renewal_rate_cache
 from app.utils.auth import hash_password
 
 TEST_DATABASE_URL = "sqlite+aiosqlite://"
@@ -49,6 +53,12 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    # In-process indexes must not leak between per-test databases
+    overdue_tracker.reset()
+    idempotency_store.reset()
+    customer_lookup.reset()
+    space_lookup.reset()
+    renewal_rate_cache.reset()
 
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://test"
@@ -92,3 +92,47 @@ async def test_delete_logs_old_values(
     logs = result.scalars().all()
     assert len(logs) >= 1
     assert logs[0].old_values["name"] == "審計客戶"
+
+
+@pytest.mark.asyncio
+async def test_filter_logs_by_json_containment(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "篩選場", "monthly_base_price": 3000, "daily_base_price": 100},
+    )
+    await auth_client.put(
+        f"/api/v1/sites/{site.json()['id']}", json={"monthly_base_price": 3500}
+    )
+    db_session.add(
+        SystemLog(
+            action="IMPORT",
+            metadata_={"source": "csv", "dry_run": False, "rows": {"ok": 2}},
+        )
+    )
+    await db_session.commit()
+
+    async def search(**params: str) -> list[dict]:
+        resp = await auth_client.get("/api/v1/system-logs", params=params)
+        assert resp.status_code == 200
+        return resp.json()
+
+    logs = await search(new_values='{"monthly_base_price": 3500}')
+    assert [log["action"] for log in logs] == ["UPDATE"]
+    assert logs[0]["old_values"]["monthly_base_price"] == 3000
+    logs = await search(table_name="sites", new_values='{"name": "篩選場"}')
+    assert [log["action"] for log in logs] == ["CREATE"]
+    assert await search(new_values='{"monthly_base_price": "3500"}') == []
+
+    assert len(await search(metadata='{"dry_run": false, "source": "csv"}')) == 1
+    assert len(await search(metadata='{"rows": {"ok": 2}}')) == 1
+    assert await search(metadata='{"dry_run": 0}') == []
+
+    assert await search(created_from="2999-01-01T00:00:00") == []
+    assert len(await search(created_to="2999-01-01T00:00:00")) >= 3
+
+    resp = await auth_client.get(
+        "/api/v1/system-logs", params={"old_values": '["not", "an", "object"]'}
+    )
+    assert resp.status_code == 400
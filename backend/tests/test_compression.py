@@ -0,0 +1,122 @@
+"""Tests for gzip/brotli response compression."""
+
+import zlib
+
+import pytest
+from httpx import AsyncClient
+from starlette.types import Message, Receive, Scope, Send
+
+from app.utils.compression import CompressionMiddleware, negotiate_encoding
+
+
+def _scope(accept_encoding: str) -> Scope:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+
+
+async def _run(app, scope: Scope, flush_size: int = 65536) -> list[Message]:
+    sent: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    middleware = CompressionMiddleware(app, minimum_size=100, flush_size=flush_size)
+    await middleware(scope, receive, send)
+    return sent
+
+
+def _streaming_app(chunks: list[bytes], content_type: bytes = b"text/csv"):
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", content_type)],
+            }
+        )
+        for i, chunk in enumerate(chunks):
+            more = i < len(chunks) - 1
+            await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+    return app
+
+
+def test_negotiate_encoding() -> None:
+    assert negotiate_encoding("gzip, deflate", brotli_available=True) == "gzip"
+    assert negotiate_encoding("gzip, br", brotli_available=True) == "br"
+    assert negotiate_encoding("gzip, br", brotli_available=False) == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity", brotli_available=False) is None
+    assert negotiate_encoding("", brotli_available=True) is None
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_is_flushed_by_size() -> None:
+    chunks = [b"id,name\n" + b"1,A-01\n" * 50, b"2,A-02\n" * 50, b"3,A-03\n" * 50]
+    sent = await _run(_streaming_app(chunks), _scope("gzip"))
+
+    start, *bodies = sent
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # Under the flush size the chunks share one deflate block
+    assert len(bodies) < len(chunks)
+    assert bodies[-1]["more_body"] is False
+    compressed = b"".join(body["body"] for body in bodies)
+    assert zlib.decompress(compressed, 16 + zlib.MAX_WBITS) == b"".join(chunks)
+
+
+@pytest.mark.asyncio
+async def test_streaming_chunk_past_flush_size_is_decodable_on_arrival() -> None:
+    chunks = [b"id,name\n" + b"1,A-01\n" * 50, b"2,A-02\n" * 50, b"3,A-03\n" * 50]
+    sent = await _run(_streaming_app(chunks), _scope("gzip"), flush_size=300)
+
+    _, *bodies = sent
+    assert len(bodies) == len(chunks)
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk, body in zip(chunks, bodies):
+        assert decoder.decompress(body["body"]) == chunk
+    assert bodies[-1]["more_body"] is False
+
+
+@pytest.mark.asyncio
+async def test_event_streams_pass_through() -> None:
+    chunks = [b"data: x\n\n" * 50]
+    sent = await _run(_streaming_app(chunks, b"text/event-stream"), _scope("gzip"))
+    headers = dict(sent[0]["headers"])
+    assert b"content-encoding" not in headers
+    assert b"vary" not in headers
+    assert sent[1]["body"] == chunks[0]
+
+
+@pytest.mark.asyncio
+async def test_uncompressed_responses_still_vary() -> None:
+    chunks = [b"id,name\n"]
+    for accept_encoding in ("gzip", "identity"):
+        sent = await _run(_streaming_app(chunks), _scope(accept_encoding))
+        headers = dict(sent[0]["headers"])
+        assert b"content-encoding" not in headers
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped_small_is_not(auth_client: AsyncClient) -> None:
+    for i in range(10):
+        await auth_client.post(
+            "/api/v1/tags", json={"name": f"標籤{i}", "color": "#00FF00"}
+        )
+
+    resp = await auth_client.get("/api/v1/tags", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert len(resp.json()) == 10  # httpx decodes transparently
+    assert resp.num_bytes_downloaded < len(resp.content)
+
+    resp = await auth_client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
@@ -2,6 +2,8 @@
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 @pytest.fixture
@@ -52,3 +54,46 @@ async def test_pagination(auth_client: AsyncClient, customers: list[dict]) -> No
     resp2 = await auth_client.get("/api/v1/customers?offset=2&limit=2")
     assert resp2.status_code == 200
     assert len(resp2.json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_exact_phone_then_prefix(auth_client: AsyncClient) -> None:
+    for name, phone in [
+        ("王0912", "0955000111"),
+        ("陳大文", "0988091200"),
+        ("林志明", "0912345678"),
+        ("張0988091200", "0955000222"),
+    ]:
+        resp = await auth_client.post(
+            "/api/v1/customers", json={"name": name, "phone": phone}
+        )
+        assert resp.status_code == 201
+
+    # Prefix first, then name and phone-substring matches by name
+    resp = await auth_client.get("/api/v1/customers?search=0912")
+    assert [c["name"] for c in resp.json()] == [
+        "林志明", "張0988091200", "王0912", "陳大文"
+    ]
+    resp = await auth_client.get("/api/v1/customers?search=0988091200")
+    assert [c["name"] for c in resp.json()] == ["陳大文", "張0988091200"]
+
+
+@pytest.mark.asyncio
+async def test_cjk_search_uses_fts_and_stays_in_sync(
+    auth_client: AsyncClient, db_session: AsyncSession, customers: list[dict]
+) -> None:
+    resp = await auth_client.get("/api/v1/customers?search=張大明")
+    assert [c["name"] for c in resp.json()] == ["張大明"]
+    resp = await auth_client.get("/api/v1/customers?search=小明")
+    assert [c["name"] for c in resp.json()] == ["張小明"]
+
+    await auth_client.put(
+        f"/api/v1/customers/{customers[0]['id']}", json={"name": "張大同"}
+    )
+    await auth_client.delete(f"/api/v1/customers/{customers[1]['id']}")
+    rows = await db_session.execute(
+        text("SELECT name FROM customers_fts ORDER BY name")
+    )
+    assert rows.scalars().all() == ["張大同", "張小明"]
+    resp = await auth_client.get("/api/v1/customers?search=張大明")
+    assert resp.json() == []
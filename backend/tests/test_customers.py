@@ -105,3 +105,63 @@ async def test_invalid_phone_format(auth_client: AsyncClient) -> None:
         json={"name": "壞電話", "phone": "1234567890"},
     )
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_customer_overview(auth_client: AsyncClient) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "總覽場", "monthly_base_price": 3600, "daily_base_price": 150},
+    )
+    customer = await auth_client.post(
+        "/api/v1/customers", json={"name": "周總覽", "phone": "0945678901"}
+    )
+    customer_id = customer.json()["id"]
+    agreements = []
+    for i, start in enumerate(["2026-01-01", "2026-02-01", "2099-01-01"]):
+        space = await auth_client.post(
+            "/api/v1/spaces", json={"site_id": site.json()["id"], "name": f"O-{i}"}
+        )
+        resp = await auth_client.post(
+            "/api/v1/agreements",
+            json={
+                "customer_id": customer_id,
+                "space_id": space.json()["id"],
+                "agreement_type": "monthly",
+                "start_date": start,
+                "price": 3000 + i * 100,
+                "license_plates": f"OVR-00{i}",
+            },
+        )
+        agreements.append(resp.json())
+    payment = await auth_client.get(
+        f"/api/v1/agreements/{agreements[0]['id']}/payment"
+    )
+    await auth_client.post(
+        f"/api/v1/payments/{payment.json()['id']}/complete",
+        json={"payment_date": "2026-01-05", "bank_reference": "TX-1"},
+    )
+
+    resp = await auth_client.get(f"/api/v1/customers/{customer_id}/overview")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["customer"]["name"] == "周總覽"
+    assert data["customer"]["active_agreement_count"] == 3
+    assert [a["id"] for a in data["agreements"]] == [
+        a["id"] for a in reversed(agreements)
+    ]
+    first = data["agreements"][-1]
+    assert first["site_name"] == "總覽場"
+    assert first["space_name"] == "O-0"
+    assert first["license_plates"] == "OVR-000"
+    assert first["payment_status"] == "completed"
+    assert [a["overdue"] for a in data["agreements"]] == [False, True, False]
+    assert data["totals"] == {"paid": 3000, "pending": 6300, "overdue": 3100}
+
+
+@pytest.mark.asyncio
+async def test_customer_overview_not_found(auth_client: AsyncClient) -> None:
+    resp = await auth_client.get(
+        "/api/v1/customers/00000000-0000-0000-0000-000000000000/overview"
+    )
+    assert resp.status_code == 404
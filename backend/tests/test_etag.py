@@ -0,0 +1,169 @@
+"""Tests for conditional GETs with weak ETags."""
+
+from datetime import date
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.table_version import TableVersion
+
+
+@pytest.mark.asyncio
+async def test_unchanged_tags_return_304(auth_client: AsyncClient) -> None:
+    await auth_client.post("/api/v1/tags", json={"name": "VIP", "color": "#00FF00"})
+    first = await auth_client.get("/api/v1/tags")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    resp = await auth_client.get("/api/v1/tags", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_update_in_same_second_changes_etag(auth_client: AsyncClient) -> None:
+    create = await auth_client.post(
+        "/api/v1/tags", json={"name": "大車位", "color": "#0000FF"}
+    )
+    etag = (await auth_client.get("/api/v1/tags")).headers["ETag"]
+
+    await auth_client.put(
+        f"/api/v1/tags/{create.json()['id']}", json={"color": "#FF0000"}
+    )
+    resp = await auth_client.get("/api/v1/tags", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.json()[0]["color"] == "#FF0000"
+
+
+@pytest.mark.asyncio
+async def test_sites_and_spaces_revalidate_after_space_change(
+    auth_client: AsyncClient,
+) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={
+            "name": "信義停車場",
+            "monthly_base_price": 3600,
+            "daily_base_price": 150,
+        },
+    )
+    site_id = site.json()["id"]
+    site_etag = (await auth_client.get("/api/v1/sites")).headers["ETag"]
+    space_etag = (await auth_client.get("/api/v1/spaces")).headers["ETag"]
+    for url, etag in (("/api/v1/sites", site_etag), ("/api/v1/spaces", space_etag)):
+        resp = await auth_client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    await auth_client.post("/api/v1/spaces", json={"site_id": site_id, "name": "A-01"})
+    for url, etag in (("/api/v1/sites", site_etag), ("/api/v1/spaces", space_etag)):
+        resp = await auth_client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_customer_detail_revalidates(auth_client: AsyncClient) -> None:
+    created = await auth_client.post(
+        "/api/v1/customers", json={"name": "張三", "phone": "0934567890"}
+    )
+    url = f"/api/v1/customers/{created.json()['id']}"
+    etag = (await auth_client.get(url)).headers["ETag"]
+
+    resp = await auth_client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+    assert resp.status_code == 304
+
+    await auth_client.put(url, json={"notes": "VIP"})
+    resp = await auth_client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["notes"] == "VIP"
+
+
+@pytest.mark.asyncio
+async def test_batch_insert_bumps_stored_version(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "批次版本", "monthly_base_price": 3000, "daily_base_price": 100},
+    )
+    etag = (await auth_client.get("/api/v1/spaces")).headers["ETag"]
+    before = await db_session.get(TableVersion, "spaces")
+    version = before.version
+
+    # Bulk INSERT ... RETURNING, not a unit-of-work flush
+    await auth_client.post(
+        "/api/v1/spaces/batch",
+        json={"site_id": site.json()["id"], "prefix": "V", "start": 1, "count": 3},
+    )
+    await db_session.refresh(before)
+    assert before.version == version + 1
+    resp = await auth_client.get("/api/v1/spaces", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_failed_write_keeps_etag(auth_client: AsyncClient) -> None:
+    await auth_client.post("/api/v1/tags", json={"name": "重複", "color": "#00FF00"})
+    etag = (await auth_client.get("/api/v1/tags")).headers["ETag"]
+
+    resp = await auth_client.post(
+        "/api/v1/tags", json={"name": "重複", "color": "#0000FF"}
+    )
+    assert resp.status_code >= 400
+    resp = await auth_client.get("/api/v1/tags", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_booking_revalidates_only_what_shows_it(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    sites = [
+        (
+            await auth_client.post(
+                "/api/v1/sites",
+                json={
+                    "name": name,
+                    "monthly_base_price": 3000,
+                    "daily_base_price": 100,
+                },
+            )
+        ).json()["id"]
+        for name in ("預約場", "旁觀場")
+    ]
+    booked, _ = [
+        (
+            await auth_client.post(
+                "/api/v1/spaces", json={"site_id": site_id, "name": "B-01"}
+            )
+        ).json()["id"]
+        for site_id in sites
+    ]
+    customer = await auth_client.post(
+        "/api/v1/customers", json={"name": "李四", "phone": "0945678901"}
+    )
+    customer_url = f"/api/v1/customers/{customer.json()['id']}"
+    urls = [f"/api/v1/spaces?site_id={site_id}" for site_id in sites] + [customer_url]
+    etags = [(await auth_client.get(url)).headers["ETag"] for url in urls]
+
+    await auth_client.post(
+        "/api/v1/agreements",
+        json={
+            "customer_id": customer.json()["id"],
+            "space_id": booked,
+            "agreement_type": "monthly",
+            "start_date": str(date.today()),
+            "price": 3000,
+            "license_plates": "ETG-0001",
+        },
+    )
+    statuses = [
+        (await auth_client.get(url, headers={"If-None-Match": etag})).status_code
+        for url, etag in zip(urls, etags, strict=True)
+    ]
+    # Booked site's spaces, the other site's spaces, the customer
+    assert statuses == [200, 304, 200]
+    # Agreements have no version of their own to lock
+    assert await db_session.get(TableVersion, "agreements") is None
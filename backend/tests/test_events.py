@@ -0,0 +1,162 @@
+"""Tests for the space event bus and its SSE stream."""
+
+import asyncio
+import json
+import uuid
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.events import sse_stream
+from app.dependencies import get_stream_user
+from app.services.event_bus import QUEUE_SIZE, Event, EventBus, event_bus
+
+
+def test_subscriptions_filter_by_site() -> None:
+    bus = EventBus()
+    site_a, site_b = uuid.uuid4(), uuid.uuid4()
+    sub_a = bus.subscribe(site_a)
+    sub_all = bus.subscribe()
+
+    bus.publish_local(Event("space.updated", site_b))
+    bus.publish_local(Event("resync", None))
+    assert [e.type for e in _drain(sub_a.queue)] == ["resync"]
+    assert [e.type for e in _drain(sub_all.queue)] == ["space.updated", "resync"]
+
+    sub_a.close()
+    assert sub_a not in bus._subscribers
+
+
+def test_slow_subscriber_gets_resync_instead_of_backlog() -> None:
+    bus = EventBus()
+    sub = bus.subscribe()
+    for _ in range(QUEUE_SIZE + 1):
+        bus.publish_local(Event("space.updated", uuid.uuid4()))
+    events = _drain(sub.queue)
+    assert [e.type for e in events] == ["resync"]
+    assert events[0].data == {"reason": "overflow"}
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_formats_events_and_heartbeats() -> None:
+    bus = EventBus()
+    sub = bus.subscribe()
+    stream = sse_stream(sub, heartbeat=0.01)
+    assert await anext(stream) == "retry: 5000\n\n"
+    assert await anext(stream) == ": ping\n\n"
+
+    site_id = uuid.uuid4()
+    bus.publish_local(Event("space.status", site_id, {"computed_status": "occupied"}))
+    frame = await anext(stream)
+    event_line, data_line, _, _ = frame.split("\n")
+    assert event_line == "event: space.status"
+    assert json.loads(data_line.removeprefix("data: ")) == {
+        "type": "space.status",
+        "site_id": str(site_id),
+        "data": {"computed_status": "occupied"},
+    }
+    await stream.aclose()
+    assert sub not in bus._subscribers
+
+
+@pytest.mark.asyncio
+async def test_agreement_create_and_terminate_push_space_status(
+    auth_client: AsyncClient,
+) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "推播場", "monthly_base_price": 3600, "daily_base_price": 150},
+    )
+    site_id = site.json()["id"]
+    space = await auth_client.post(
+        "/api/v1/spaces", json={"site_id": site_id, "name": "E-01"}
+    )
+    customer = await auth_client.post(
+        "/api/v1/customers", json={"name": "推播客戶", "phone": "0911000111"}
+    )
+
+    sub = event_bus.subscribe(uuid.UUID(site_id))
+    try:
+        created = await auth_client.post(
+            "/api/v1/agreements",
+            json={
+                "customer_id": customer.json()["id"],
+                "space_id": space.json()["id"],
+                "agreement_type": "monthly",
+                "start_date": str(date.today()),
+                "price": 3600,
+                "license_plates": "ABC-1234",
+            },
+        )
+        agreement_id = created.json()["id"]
+        await auth_client.post(
+            f"/api/v1/agreements/{agreement_id}/terminate",
+            json={"termination_reason": "提前解約"},
+        )
+        events = _drain(sub.queue)
+    finally:
+        sub.close()
+
+    statuses = [
+        (e.data["computed_status"], e.data["active_agreement_id"])
+        for e in events
+        if e.type == "space.status"
+    ]
+    assert statuses == [
+        ("occupied", uuid.UUID(agreement_id)),
+        ("available", None),
+    ]
+    assert all(str(e.data["space_id"]) == space.json()["id"] for e in events)
+
+
+def _drain(queue: asyncio.Queue) -> list[Event]:
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+@pytest.mark.asyncio
+async def test_internal_broadcasts_are_not_streamed() -> None:
+    bus = EventBus()
+    applied = []
+    bus.add_handler("cache.test", applied.append)
+    sub = bus.subscribe()
+    await bus.broadcast("cache.test", {"id": uuid.uuid4()})
+    assert [e.type for e in applied] == ["cache.test"]
+    assert isinstance(applied[0].data["id"], str)  # always the JSON form
+    assert _drain(sub.queue) == []
+
+
+@pytest.mark.asyncio
+async def test_stream_token_opens_only_the_stream(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    resp = await auth_client.post("/api/v1/events/token")
+    assert resp.status_code == 200
+    token = resp.json()["token"]
+    assert resp.json()["expires_in"] > 0
+
+    user = await get_stream_user(token, db_session)
+    assert user.email == (await auth_client.get("/api/v1/auth/me")).json()["email"]
+
+    # The bearer token stays out of URLs, the stream token out of the API
+    access_token = auth_client.headers["Authorization"].removeprefix("Bearer ")
+    with pytest.raises(HTTPException) as excinfo:
+        await get_stream_user(access_token, db_session)
+    assert excinfo.value.status_code == 401
+    resp = await auth_client.get(
+        "/api/v1/tags", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_broadcast_of_unknown_type_is_dropped() -> None:
+    bus = EventBus()
+    sub = bus.subscribe()
+    await bus.broadcast("cache.unknown", {"id": 1})
+    assert _drain(sub.queue) == []
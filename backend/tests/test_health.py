@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 from httpx import AsyncClient
 
@@ -10,3 +12,46 @@ async def test_health_check(client: AsyncClient) -> None:
     data = response.json()
     assert data["status"] == "ok"
     assert data["service"] == "ping-parking-api"
+
+
+@pytest.mark.asyncio
+async def test_readiness_reports_database_latency(client: AsyncClient) -> None:
+    """GET /health/ready runs SELECT 1 and reports its latency."""
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["database"]["ok"] is True
+    assert data["database"]["latency_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_readiness_fails_when_pool_saturated(client: AsyncClient) -> None:
+    """A full connection pool makes the worker report 503."""
+    saturated = {"size": 5, "checked_out": 15, "overflow": 10, "saturation": 1.0}
+    with patch("app.api.health.pool_status", return_value=saturated):
+        response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+    assert response.json()["pool"] == saturated
+
+
+@pytest.mark.asyncio
+async def test_readiness_reads_pool_before_its_own_checkout(
+    client: AsyncClient, db_session
+) -> None:
+    """The probe's own connection must not count towards saturation."""
+    calls = []
+    execute = db_session.execute
+
+    async def tracked_execute(*args, **kwargs):
+        calls.append("select")
+        return await execute(*args, **kwargs)
+
+    with (
+        patch("app.api.health.pool_status", side_effect=lambda: calls.append("pool")),
+        patch.object(db_session, "execute", tracked_execute),
+    ):
+        response = await client.get("/health/ready")
+    assert response.status_code == 200
+    assert calls == ["pool", "select"]
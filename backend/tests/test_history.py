@@ -0,0 +1,164 @@
+"""Tests for record history folded from the audit log."""
+
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.system_log import SystemLog
+from app.services.history_service import fold
+
+
+def test_fold_replays_diffs() -> None:
+    state, changes = fold(None, "CREATE", None, {"name": "A", "price": 100})
+    assert state == {"name": "A", "price": 100}
+    assert changes == {"name": (None, "A"), "price": (None, 100)}
+
+    # Fields the CREATE did not log come in with the UPDATE's old values
+    state, changes = fold(
+        state, "UPDATE", {"price": 100, "notes": None}, {"price": 120, "notes": None}
+    )
+    assert state == {"name": "A", "price": 120, "notes": None}
+    assert changes == {"price": (100, 120)}
+
+    state, changes = fold(state, "DELETE", {"name": "A"}, None)
+    assert state is None
+    assert changes == {"name": ("A", None)}
+
+    # History starting with an UPDATE: the first old values are the baseline
+    state, _ = fold(None, "UPDATE", {"status": "pending"}, {"status": "completed"})
+    assert state == {"status": "completed"}
+
+
+@pytest.mark.asyncio
+async def test_history_pages_carry_folded_state(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    record_id = uuid4()
+    start = datetime(2026, 1, 1, 9)
+    db_session.add_all(
+        [
+            SystemLog(
+                action="CREATE",
+                table_name="sites",
+                record_id=record_id,
+                new_values={"name": "歷史場", "monthly_base_price": 3000},
+                created_at=start,
+            ),
+            *(
+                SystemLog(
+                    action="UPDATE",
+                    table_name="sites",
+                    record_id=record_id,
+                    old_values={"monthly_base_price": 3000 + 100 * i},
+                    new_values={"monthly_base_price": 3100 + 100 * i},
+                    created_at=start + timedelta(days=i + 1),
+                )
+                for i in range(3)
+            ),
+            SystemLog(
+                action="DELETE",
+                table_name="sites",
+                record_id=record_id,
+                old_values={"name": "歷史場", "monthly_base_price": 3300},
+                created_at=start + timedelta(days=3),  # same time as last update
+            ),
+            # Another record is never mixed in
+            SystemLog(
+                action="UPDATE",
+                table_name="sites",
+                record_id=uuid4(),
+                old_values={"name": "x"},
+                new_values={"name": "y"},
+                created_at=start,
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    url = f"/api/v1/history/sites/{record_id}"
+    entries, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        resp = await auth_client.get(url, params=params)
+        assert resp.status_code == 200
+        body = resp.json()
+        entries += body["entries"]
+        cursor, pages = body["next_cursor"], pages + 1
+        if cursor is None:
+            break
+    assert pages == 3
+
+    assert [e["action"] for e in entries] == [
+        "DELETE",
+        "UPDATE",
+        "UPDATE",
+        "UPDATE",
+        "CREATE",
+    ]
+    assert entries[0]["state"] is None
+    # Each page starts from the state folded from the older pages
+    assert [e["state"]["monthly_base_price"] for e in entries[1:]] == [
+        3300,
+        3200,
+        3100,
+        3000,
+    ]
+    assert entries[1]["state"]["name"] == "歷史場"
+    assert entries[2]["changes"] == {
+        "monthly_base_price": {"before": 3100, "after": 3200}
+    }
+
+
+@pytest.mark.asyncio
+async def test_agreement_history_endpoint(auth_client: AsyncClient) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "合約史場", "monthly_base_price": 3600, "daily_base_price": 150},
+    )
+    space = await auth_client.post(
+        "/api/v1/spaces", json={"site_id": site.json()["id"], "name": "H-01"}
+    )
+    customer = await auth_client.post(
+        "/api/v1/customers", json={"name": "歷史客戶", "phone": "0911223344"}
+    )
+    agreement = await auth_client.post(
+        "/api/v1/agreements",
+        json={
+            "customer_id": customer.json()["id"],
+            "space_id": space.json()["id"],
+            "agreement_type": "monthly",
+            "start_date": str(date.today()),
+            "price": 3600,
+            "license_plates": "HIS-0001",
+        },
+    )
+    agreement_id = agreement.json()["id"]
+    resp = await auth_client.post(
+        f"/api/v1/agreements/{agreement_id}/terminate",
+        json={"termination_reason": "搬家"},
+    )
+    assert resp.status_code == 200
+
+    resp = await auth_client.get(f"/api/v1/history/agreements/{agreement_id}")
+    assert resp.status_code == 200
+    created, terminated = reversed(resp.json()["entries"])
+    assert created["action"] == "CREATE"
+    assert created["state"]["price"] == 3600
+    assert terminated["changes"]["termination_reason"] == {
+        "before": None,
+        "after": "搬家",
+    }
+    assert terminated["state"]["price"] == 3600
+    assert terminated["state"]["termination_reason"] == "搬家"
+
+    resp = await auth_client.get(f"/api/v1/history/admin_users/{agreement_id}")
+    assert resp.status_code == 404
+    resp = await auth_client.get(f"/api/v1/history/agreements/{uuid4()}")
+    assert resp.status_code == 404
+    resp = await auth_client.get(
+        f"/api/v1/history/agreements/{agreement_id}", params={"cursor": str(uuid4())}
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,227 @@
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.agreement import Agreement
+from app.models.idempotency_key import IdempotencyKey
+from app.models.space import Space
+from app.services.idempotency import idempotency_store, request_fingerprint
+
+
+@pytest.fixture
+async def setup(auth_client: AsyncClient) -> dict:
+    site_resp = await auth_client.post(
+        "/api/v1/sites",
+        json={
+            "name": "冪等測試場",
+            "monthly_base_price": 3600,
+            "daily_base_price": 150,
+        },
+    )
+    space_resp = await auth_client.post(
+        "/api/v1/spaces",
+        json={"site_id": site_resp.json()["id"], "name": "I-01"},
+    )
+    customer_resp = await auth_client.post(
+        "/api/v1/customers",
+        json={"name": "冪等客戶", "phone": "0955667788"},
+    )
+    return {
+        "site_id": site_resp.json()["id"],
+        "space_id": space_resp.json()["id"],
+        "customer_id": customer_resp.json()["id"],
+    }
+
+
+def _agreement(setup: dict, price: int = 3600) -> dict:
+    return {
+        "customer_id": setup["customer_id"],
+        "space_id": setup["space_id"],
+        "agreement_type": "monthly",
+        "start_date": "2026-03-01",
+        "price": price,
+        "license_plates": "IDEM-001",
+    }
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_agreement_without_creating_another(
+    auth_client: AsyncClient, db_session: AsyncSession, setup: dict
+) -> None:
+    headers = {"Idempotency-Key": "agreement-1"}
+    first = await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup), headers=headers
+    )
+    assert first.status_code == 201
+
+    # From the in-process cache, then from the table on another worker
+    for clear_cache in (False, True):
+        if clear_cache:
+            idempotency_store.reset()
+        retry = await auth_client.post(
+            "/api/v1/agreements", json=_agreement(setup), headers=headers
+        )
+        assert retry.status_code == 201
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert retry.json() == first.json()
+
+    count = await db_session.scalar(select(func.count()).select_from(Agreement))
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_key_reused_for_different_request(
+    auth_client: AsyncClient, setup: dict
+) -> None:
+    headers = {"Idempotency-Key": "agreement-2"}
+    await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup), headers=headers
+    )
+    response = await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup, price=4000), headers=headers
+    )
+    assert response.status_code == 409
+    assert response.json()["code"] == "IDEMPOTENCY_KEY_REUSED"
+
+
+@pytest.mark.asyncio
+async def test_pending_key_is_never_run_twice(
+    auth_client: AsyncClient, db_session: AsyncSession, setup: dict
+) -> None:
+    # Simulate a first attempt committed without its response yet
+    headers = {"Idempotency-Key": "agreement-3"}
+    first = await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup), headers=headers
+    )
+    assert first.status_code == 201
+    await db_session.execute(
+        update(IdempotencyKey).values(status_code=None, response_body=None)
+    )
+    await db_session.commit()
+    idempotency_store.reset()
+
+    response = await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup), headers=headers
+    )
+    assert response.status_code == 409
+    assert response.json()["code"] == "IDEMPOTENCY_IN_PROGRESS"
+
+    # Its worker died before recording the response: the write stays single
+    await db_session.execute(
+        update(IdempotencyKey).values(
+            created_at=datetime.now() - timedelta(minutes=10)
+        )
+    )
+    await db_session.commit()
+    response = await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup), headers=headers
+    )
+    assert response.status_code == 409
+    assert response.json()["code"] == "IDEMPOTENCY_RESPONSE_LOST"
+    count = await db_session.scalar(select(func.count()).select_from(Agreement))
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_key_is_reused(
+    auth_client: AsyncClient, db_session: AsyncSession, setup: dict
+) -> None:
+    headers = {"Idempotency-Key": "reused-1"}
+    await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup), headers=headers
+    )
+    await db_session.execute(
+        update(IdempotencyKey).values(expires_at=datetime.now() - timedelta(hours=1))
+    )
+    await db_session.commit()
+    idempotency_store.reset()
+
+    body = {"site_id": setup["site_id"], "prefix": "R", "start": 1, "count": 2}
+    response = await auth_client.post(
+        "/api/v1/spaces/batch", json=body, headers=headers
+    )
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+
+
+def test_query_string_is_part_of_the_fingerprint() -> None:
+    fingerprints = {
+        request_fingerprint("POST", "/api/v1/spaces/batch", query, b"{}")
+        for query in ("", "dry_run=1", "dry_run=0")
+    }
+    assert len(fingerprints) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_request_releases_key(
+    auth_client: AsyncClient, setup: dict
+) -> None:
+    headers = {"Idempotency-Key": "complete-1"}
+    missing = "00000000-0000-0000-0000-000000000000"
+    body = {"payment_date": "2026-03-01", "bank_reference": "TXN-IDEM"}
+    response = await auth_client.post(
+        f"/api/v1/payments/{missing}/complete", json=body, headers=headers
+    )
+    assert response.status_code == 404
+
+    agreement = await auth_client.post("/api/v1/agreements", json=_agreement(setup))
+    payment = await auth_client.get(
+        f"/api/v1/agreements/{agreement.json()['id']}/payment"
+    )
+    url = f"/api/v1/payments/{payment.json()['id']}/complete"
+    # The failed attempt did not keep the key
+    first = await auth_client.post(url, json=body, headers=headers)
+    retry = await auth_client.post(url, json=body, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["status"] == "completed"
+    # Without the key the second completion is rejected
+    again = await auth_client.post(url, json=body)
+    assert again.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_spaces_replayed(
+    auth_client: AsyncClient, db_session: AsyncSession, setup: dict
+) -> None:
+    body = {"site_id": setup["site_id"], "prefix": "B", "start": 1, "count": 3}
+    headers = {"Idempotency-Key": "batch-1"}
+    first = await auth_client.post("/api/v1/spaces/batch", json=body, headers=headers)
+    retry = await auth_client.post("/api/v1/spaces/batch", json=body, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    count = await db_session.scalar(select(func.count()).select_from(Space))
+    assert count == 4
+
+
+@pytest.mark.asyncio
+async def test_write_committed_without_its_response_is_not_repeated(
+    auth_client: AsyncClient,
+    db_session: AsyncSession,
+    setup: dict,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def die_before_recording(*args: object) -> None:
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(idempotency_store, "complete", die_before_recording)
+    headers = {"Idempotency-Key": "agreement-crash"}
+    with pytest.raises(RuntimeError):
+        await auth_client.post(
+            "/api/v1/agreements", json=_agreement(setup), headers=headers
+        )
+    # The claim committed together with the agreement
+    count = await db_session.scalar(select(func.count()).select_from(Agreement))
+    assert count == 1
+
+    monkeypatch.undo()
+    retry = await auth_client.post(
+        "/api/v1/agreements", json=_agreement(setup), headers=headers
+    )
+    assert retry.status_code == 409
+    assert retry.json()["code"] == "IDEMPOTENCY_IN_PROGRESS"
+    count = await db_session.scalar(select(func.count()).select_from(Agreement))
+    assert count == 1
+
@@ -0,0 +1,224 @@
+"""Tests for the typeahead lookup indexes."""
+
+import random
+from uuid import UUID, uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services import lookup_index
+from app.services.event_bus import CHANNEL, Event, EventBus, event_bus
+from app.services.lookup_index import customer_keys, customer_lookup, space_lookup
+
+
+def test_customer_keys() -> None:
+    assert customer_keys("張大明", "0912-345-678") == {"張大明", "大明", "0912345678"}
+    assert customer_keys("Amy  Chen", "0912345678") == {
+        "amy chen",
+        "amy",
+        "chen",
+        "0912345678",
+    }
+
+
+def test_entries_match_a_sorted_set_across_compactions(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(lookup_index, "_COMPACT_MIN", 8)
+    rng = random.Random(7)
+    words = [f"{rng.choice('abc')}{n:03d}".encode() for n in range(200)]
+    expected = set(rng.sample(words, 100))
+    entries = lookup_index._Entries(sorted(expected))
+    for _ in range(2_000):
+        word = rng.choice(words)
+        if rng.random() < 0.5:
+            entries.add(word)
+            expected.add(word)
+        else:
+            entries.discard(word)
+            expected.discard(word)
+        assert len(entries) == len(expected)
+    for prefix in (b"", b"a", b"b0", b"c19", b"d"):
+        assert list(entries.scan(prefix)) == sorted(
+            w for w in expected if w.startswith(prefix)
+        )
+
+
+@pytest.fixture
+async def site(auth_client: AsyncClient) -> dict:
+    resp = await auth_client.post(
+        "/api/v1/sites",
+        json={
+            "name": "信義停車場",
+            "monthly_base_price": 3600,
+            "daily_base_price": 150,
+        },
+    )
+    return resp.json()
+
+
+@pytest.mark.asyncio
+async def test_customer_lookup_follows_writes(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    created = {}
+    for name, phone in [("張大明", "0912345678"), ("張小明", "0934567890")]:
+        resp = await auth_client.post(
+            "/api/v1/customers", json={"name": name, "phone": phone}
+        )
+        created[name] = resp.json()["id"]
+
+    # Answered from the database until the index is built
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "張"})
+    assert resp.json() == [created["張大明"], created["張小明"]]
+    assert not customer_lookup.loaded
+
+    await customer_lookup.rebuild(db_session)
+    assert customer_lookup.loaded
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "張"})
+    assert resp.json() == [created["張大明"], created["張小明"]]
+
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "0934-56"})
+    assert resp.json() == [created["張小明"]]
+
+    # Incremental updates after the index is loaded
+    resp = await auth_client.post(
+        "/api/v1/customers", json={"name": "李大明", "phone": "0923456789"}
+    )
+    lee = resp.json()["id"]
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "大明"})
+    assert set(resp.json()) == {created["張大明"], lee}
+
+    await auth_client.put(f"/api/v1/customers/{lee}", json={"name": "李美玲"})
+    await auth_client.delete(f"/api/v1/customers/{created['張大明']}")
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "大明"})
+    assert resp.json() == []
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "李美"})
+    assert resp.json() == [lee]
+
+
+@pytest.mark.asyncio
+async def test_batch_create_sends_a_few_batched_events(
+    auth_client: AsyncClient,
+    site: dict,
+    db_session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await space_lookup.rebuild(db_session)
+    broadcasts = []
+    broadcast = EventBus.broadcast
+
+    async def counted(bus: EventBus, type: str, data: dict) -> None:
+        broadcasts.append(Event(type, None, data).to_json())
+        await broadcast(bus, type, data)
+
+    monkeypatch.setattr(EventBus, "broadcast", counted)
+    sub = event_bus.subscribe(UUID(site["id"]))
+    try:
+        resp = await auth_client.post(
+            "/api/v1/spaces/batch",
+            json={
+                "site_id": site["id"],
+                "prefix": "長名稱車位",
+                "start": 1,
+                "count": 100,
+            },
+        )
+        events = []
+        while not sub.queue.empty():
+            events.append(sub.queue.get_nowait())
+    finally:
+        sub.close()
+
+    ids = [s["id"] for s in resp.json()]
+    created = [e for e in events if e.type == "spaces.created"]
+    assert len(created) == 1
+    assert [str(i) for e in created for i in e.data["space_ids"]] == ids
+    # 100 spaces' keys take more than one payload
+    assert 1 < len(broadcasts) < 5
+    # Each fits a NOTIFY payload
+    payloads = [e.to_json() for e in created] + broadcasts
+    assert all(len(payload.encode()) < 8000 for payload in payloads)
+    assert len(space_lookup) == 200
+
+
+@pytest.mark.asyncio
+async def test_space_lookup_by_site_and_space_name(
+    auth_client: AsyncClient, site: dict, db_session: AsyncSession
+) -> None:
+    resp = await auth_client.post(
+        "/api/v1/spaces/batch",
+        json={"site_id": site["id"], "prefix": "A", "start": 1, "count": 12},
+    )
+    ids = [s["id"] for s in resp.json()]
+    await space_lookup.rebuild(db_session)
+
+    resp = await auth_client.get("/api/v1/lookup/spaces", params={"q": "a-0"})
+    assert resp.json() == ids[:9]
+    resp = await auth_client.get("/api/v1/lookup/spaces", params={"q": "信義"})
+    assert resp.json() == ids[:10]
+    assert len(space_lookup) == 24  # "a-01" and "信義停車場/a-01" per space
+
+    await auth_client.put(f"/api/v1/spaces/{ids[0]}", json={"name": "B-01"})
+    await auth_client.put(f"/api/v1/sites/{site['id']}", json={"name": "大安停車場"})
+    # A site rename has every worker rebuild; meanwhile the database answers
+    assert not space_lookup.loaded
+    resp = await auth_client.get("/api/v1/lookup/spaces", params={"q": "大安停車場/b"})
+    assert resp.json() == [ids[0]]
+    resp = await auth_client.get("/api/v1/lookup/spaces", params={"q": "信義"})
+    assert resp.json() == []
+
+
+@pytest.mark.asyncio
+async def test_changes_broadcast_by_other_workers_are_applied(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    await customer_lookup.rebuild(db_session)
+    customer_id = uuid4()
+
+    def notify(origin: str, data: dict) -> None:
+        payload = Event(customer_lookup.event, None, {**data, "origin": origin})
+        event_bus._on_notify(None, 0, CHANNEL, payload.to_json())
+
+    # Another worker created a customer this one never read
+    notify("other-worker", {"id": customer_id, "keys": ["王五"], "old_keys": []})
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "王"})
+    assert resp.json() == [str(customer_id)]
+
+    notify("other-worker", {"id": customer_id, "keys": [], "old_keys": ["王五"]})
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "王"})
+    assert resp.json() == []
+
+    event_bus._reset_caches()  # the LISTEN connection came back
+    assert not customer_lookup.loaded
+
+
+@pytest.mark.asyncio
+async def test_index_over_the_cap_falls_back_to_sql(
+    auth_client: AsyncClient, db_session: AsyncSession, monkeypatch
+) -> None:
+    monkeypatch.setattr(customer_lookup, "max_entries", 4)
+    resp = await auth_client.post(
+        "/api/v1/customers", json={"name": "張大明", "phone": "0912345678"}
+    )
+    first = resp.json()["id"]
+    await customer_lookup.rebuild(db_session)
+    assert customer_lookup.loaded and len(customer_lookup) == 3
+
+    # The next write would grow it past the cap: dropped, not grown
+    resp = await auth_client.post(
+        "/api/v1/customers", json={"name": "張小明", "phone": "0934567890"}
+    )
+    second = resp.json()["id"]
+    assert customer_lookup.too_large and len(customer_lookup) == 0
+
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "張"})
+    assert resp.json() == [first, second]
+    resp = await auth_client.get("/api/v1/lookup/customers", params={"q": "0934567"})
+    assert resp.json() == [second]
+
+    # A rebuild stops reading once over the cap
+    customer_lookup.unload()
+    await customer_lookup.rebuild(db_session)
+    assert customer_lookup.too_large and not customer_lookup.loaded
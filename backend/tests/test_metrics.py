@@ -0,0 +1,125 @@
+"""Tests for the Prometheus metrics endpoint."""
+
+import uuid
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+from app.utils.metrics import (
+    Histogram,
+    cache_requests,
+    db_statement_duration,
+    http_request_duration,
+    instrument_engine_metrics,
+    record_cache_lookup,
+)
+
+TOKEN = "scrape-secret"
+
+
+@pytest.fixture
+def metrics_token(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    monkeypatch.setattr(settings, "metrics_token", TOKEN)
+    return {"Authorization": f"Bearer {TOKEN}"}
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    hist = Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    hist.observe(0.05, "/a")
+    hist.observe(0.5, "/a")
+    hist.observe(5, "/a")
+    assert hist.samples() == [
+        't_seconds_bucket{route="/a",le="0.1"} 1',
+        't_seconds_bucket{route="/a",le="1.0"} 2',
+        't_seconds_bucket{route="/a",le="+Inf"} 3',
+        't_seconds_sum{route="/a"} 5.55',
+        't_seconds_count{route="/a"} 3',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_labels_requests_by_route_template(
+    auth_client: AsyncClient, test_engine, metrics_token: dict[str, str]
+) -> None:
+    instrument_engine_metrics(test_engine.sync_engine)
+    template = ("GET", "/api/v1/sites/{site_id}", "404")
+    before = http_request_duration.count(*template)
+
+    for _ in range(2):
+        resp = await auth_client.get(f"/api/v1/sites/{uuid.uuid4()}")
+        assert resp.status_code == 404
+    record_cache_lookup("test", hit=True)
+    record_cache_lookup("test", hit=False)
+
+    assert http_request_duration.count(*template) == before + 2
+    resp = await auth_client.get("/metrics", headers=metrics_token)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'route="/api/v1/sites/{site_id}",status="404"' in body
+    assert "db_statement_duration_seconds_count" in body
+    assert 'cache_hit_ratio{cache="test"} 0.5' in body
+    assert "http_requests_in_flight 1" in body  # the scrape itself
+
+
+@pytest.mark.asyncio
+async def test_route_label_comes_from_the_route_not_the_path(
+    auth_client: AsyncClient,
+) -> None:
+    # The table value equals a literal segment of the path
+    template = ("GET", "/api/v1/history/{table}/{record_id}", "404")
+    before = http_request_duration.count(*template)
+    resp = await auth_client.get(f"/api/v1/history/history/{uuid.uuid4()}")
+    assert resp.status_code == 404
+    assert http_request_duration.count(*template) == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_require_the_scrape_token(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert (await client.get("/metrics")).status_code == 401
+    monkeypatch.setattr(settings, "metrics_token", TOKEN)
+    resp = await client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert resp.status_code == 401
+    resp = await client.get("/metrics", headers={"Authorization": f"Bearer {TOKEN}"})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_leaves_no_timing_state(test_engine) -> None:
+    instrument_engine_metrics(test_engine.sync_engine)
+    before = db_statement_duration.count()
+    async with test_engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            await conn.exec_driver_sql("SELECT * FROM no_such_table")
+        await conn.exec_driver_sql("SELECT 1")
+        info = conn.sync_connection.info
+    assert db_statement_duration.count() == before + 1
+    assert "metrics_start" not in info
+
+
+@pytest.mark.asyncio
+async def test_app_caches_report_hits_and_misses(auth_client: AsyncClient) -> None:
+    def counts(cache: str) -> tuple[float, float]:
+        return cache_requests.value(cache, "hit"), cache_requests.value(cache, "miss")
+
+    etag, lookup, overdue = (
+        counts("etag"),
+        counts("lookup_customers"),
+        counts("overdue_tracker"),
+    )
+    resp = await auth_client.get("/api/v1/tags")
+    cached = {"If-None-Match": resp.headers["ETag"]}
+    assert (await auth_client.get("/api/v1/tags", headers=cached)).status_code == 304
+    # Not built yet: answered from the database
+    await auth_client.get("/api/v1/lookup/customers", params={"q": "王"})
+    for _ in range(2):
+        await auth_client.get("/api/v1/agreements/summary")
+
+    assert counts("etag") == (etag[0] + 1, etag[1] + 1)
+    assert counts("lookup_customers") == (lookup[0], lookup[1] + 1)
+    assert counts("overdue_tracker") == (overdue[0] + 1, overdue[1] + 1)
@@ -0,0 +1,231 @@
+"""Tests for the overdue payment tracker."""
+
+from datetime import date, timedelta
+from uuid import UUID
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.services import overdue_tracker as tracker_module
+from app.services.event_bus import CHANNEL, Event, event_bus
+from app.services.overdue_tracker import OVERDUE_EVENT, overdue_tracker
+
+
+@pytest.fixture
+async def overdue_setup(auth_client: AsyncClient) -> dict:
+    """One agreement that ended last month and one that is still running."""
+    site_resp = await auth_client.post(
+        "/api/v1/sites",
+        json={
+            "name": "逾期測試場",
+            "monthly_base_price": 3600,
+            "daily_base_price": 150,
+        },
+    )
+    site_id = site_resp.json()["id"]
+    customer_resp = await auth_client.post(
+        "/api/v1/customers",
+        json={"name": "逾期客戶", "phone": "0955667788"},
+    )
+    customer_id = customer_resp.json()["id"]
+
+    ids = {}
+    for name, start in [
+        ("OD-01", date.today() - timedelta(days=90)),
+        ("OD-02", date.today()),
+    ]:
+        space_resp = await auth_client.post(
+            "/api/v1/spaces", json={"site_id": site_id, "name": name}
+        )
+        agreement_resp = await auth_client.post(
+            "/api/v1/agreements",
+            json={
+                "customer_id": customer_id,
+                "space_id": space_resp.json()["id"],
+                "agreement_type": "monthly",
+                "start_date": str(start),
+                "price": 3600,
+                "license_plates": f"{name}-PLATE",
+            },
+        )
+        agreement_id = agreement_resp.json()["id"]
+        payment_resp = await auth_client.get(
+            f"/api/v1/agreements/{agreement_id}/payment"
+        )
+        ids[name] = {
+            "agreement_id": agreement_id,
+            "payment_id": payment_resp.json()["id"],
+        }
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_summary_counts_overdue(
+    auth_client: AsyncClient, overdue_setup: dict
+) -> None:
+    resp = await auth_client.get("/api/v1/agreements/summary")
+    assert resp.status_code == 200
+    assert resp.json()["overdue_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_list_overdue_payments(
+    auth_client: AsyncClient, overdue_setup: dict
+) -> None:
+    resp = await auth_client.get("/api/v1/payments/overdue")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data) == 1
+    assert data[0]["id"] == overdue_setup["OD-01"]["payment_id"]
+    assert data[0]["space_name"] == "OD-01"
+    assert data[0]["customer_name"] == "逾期客戶"
+    assert data[0]["days_overdue"] > 0
+
+
+@pytest.mark.asyncio
+async def test_completing_payment_clears_overdue(
+    auth_client: AsyncClient, overdue_setup: dict
+) -> None:
+    await auth_client.get("/api/v1/agreements/summary")  # load tracker
+    await auth_client.post(
+        f"/api/v1/payments/{overdue_setup['OD-01']['payment_id']}/complete",
+        json={"payment_date": str(date.today()), "bank_reference": "TXN-OD-01"},
+    )
+    resp = await auth_client.get("/api/v1/agreements/summary")
+    assert resp.json()["overdue_count"] == 0
+
+    # Reopening the payment puts it back on the overdue list
+    await auth_client.put(
+        f"/api/v1/payments/{overdue_setup['OD-01']['payment_id']}",
+        json={"status": "pending"},
+    )
+    resp = await auth_client.get("/api/v1/payments/overdue")
+    assert [p["id"] for p in resp.json()] == [overdue_setup["OD-01"]["payment_id"]]
+
+
+@pytest.mark.asyncio
+async def test_terminating_agreement_clears_overdue(
+    auth_client: AsyncClient, overdue_setup: dict
+) -> None:
+    await auth_client.get("/api/v1/agreements/summary")
+    await auth_client.post(
+        f"/api/v1/agreements/{overdue_setup['OD-01']['agreement_id']}/terminate",
+        json={"termination_reason": "逾期終止"},
+    )
+    resp = await auth_client.get("/api/v1/agreements/summary")
+    assert resp.json()["overdue_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_date_rollover_marks_new_overdue(
+    auth_client: AsyncClient, overdue_setup: dict, db_session: AsyncSession
+) -> None:
+    assert await overdue_tracker.count(db_session) == 1
+    # Two months on, the running agreement has also ended unpaid
+    later = date.today() + timedelta(days=62)
+    assert await overdue_tracker.count(db_session, today=later) == 2
+    report = await overdue_tracker.reconcile(db_session, today=later)
+    assert report.in_sync
+
+
+@pytest.mark.asyncio
+async def test_reconcile_detects_and_repairs_drift(
+    auth_client: AsyncClient, overdue_setup: dict
+) -> None:
+    resp = await auth_client.get("/api/v1/payments/overdue/reconcile")
+    assert resp.status_code == 200
+    assert resp.json()["in_sync"] is True
+
+    overdue_tracker.discard(UUID(overdue_setup["OD-01"]["payment_id"]))
+    resp = await auth_client.get("/api/v1/payments/overdue/reconcile")
+    assert resp.json()["repaired"] is False
+    resp = await auth_client.post("/api/v1/payments/overdue/reconcile")
+    data = resp.json()
+    assert data["in_sync"] is False
+    assert data["missing"] == [overdue_setup["OD-01"]["payment_id"]]
+    assert data["repaired"] is True
+
+    resp = await auth_client.get("/api/v1/payments/overdue/reconcile")
+    assert resp.json()["in_sync"] is True
+
+
+@pytest.mark.asyncio
+async def test_changes_broadcast_by_other_workers_are_applied(
+    auth_client: AsyncClient, overdue_setup: dict, db_session: AsyncSession
+) -> None:
+    assert await overdue_tracker.count(db_session) == 1
+
+    def notify(origin: str, entry: dict | None) -> None:
+        payment_id = overdue_setup["OD-01"]["payment_id"]
+        data = {"payment_id": payment_id, "entry": entry, "origin": origin}
+        payload = Event(OVERDUE_EVENT, None, data).to_json()
+        event_bus._on_notify(None, 0, CHANNEL, payload)
+
+    # Another worker completed the payment
+    notify("other-worker", None)
+    assert await overdue_tracker.count(db_session) == 0
+    # Echoes of this worker's own broadcasts were applied when sent
+    notify(event_bus.origin, {"unused": True})
+    assert await overdue_tracker.count(db_session) == 0
+
+    event_bus._reset_caches()  # the LISTEN connection came back
+    assert not overdue_tracker.loaded
+    assert await overdue_tracker.count(db_session) == 1
+
+
+@pytest.mark.asyncio
+async def test_reset_during_rebuild_discards_the_scan(
+    auth_client: AsyncClient,
+    overdue_setup: dict,
+    db_session: AsyncSession,
+    monkeypatch,
+) -> None:
+    load_pending = overdue_tracker._load_pending
+    resets = [True]
+
+    async def load_then_reset(db: AsyncSession) -> dict:
+        pending = await load_pending(db)
+        if resets:
+            # The LISTEN connection dropped while the scan was running
+            overdue_tracker.reset()
+            resets.pop()
+        return pending
+
+    monkeypatch.setattr(overdue_tracker, "_load_pending", load_then_reset)
+    await overdue_tracker.rebuild(db_session)
+    assert not overdue_tracker.loaded
+    # ensure_loaded scans again until a scan survives
+    assert await overdue_tracker.count(db_session) == 1
+
+
+@pytest.mark.asyncio
+async def test_first_load_reads_the_primary_not_a_replica(
+    auth_client: AsyncClient, overdue_setup: dict, test_engine, monkeypatch
+) -> None:
+    monkeypatch.setattr(
+        tracker_module, "async_session_factory", async_sessionmaker(test_engine)
+    )
+    replica_engine = create_async_engine("sqlite+aiosqlite://")  # no tables
+    try:
+        async with AsyncSession(replica_engine, info={"replica": True}) as replica:
+            assert await overdue_tracker.count(replica) == 1
+    finally:
+        await replica_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_daily_rollover_repairs_drift(
+    auth_client: AsyncClient,
+    overdue_setup: dict,
+    db_session: AsyncSession,
+    test_engine,
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(
+        tracker_module, "async_session_factory", async_sessionmaker(test_engine)
+    )
+    assert await overdue_tracker.count(db_session) == 1
+    overdue_tracker.discard(UUID(overdue_setup["OD-01"]["payment_id"]))
+    await tracker_module.daily_rollover()
+    assert await overdue_tracker.count(db_session) == 1
@@ -198,3 +198,60 @@ async def test_multiple_tags_second_priced_wins(
     assert data["effective_monthly_price"] == 5000
     assert data["price_tier"] == "tag"
     assert data["price_tag_name"] == "VIP"
+
+
+@pytest.mark.asyncio
+async def test_simulate_price_changes_without_writing(
+    auth_client: AsyncClient, site_with_pricing: str, tag_with_pricing: dict
+) -> None:
+    spaces = {}
+    for name, extra in (
+        ("W-01", {}),
+        ("W-02", {"tags": ["VIP"]}),
+        ("W-03", {"custom_price": 4000}),
+        ("W-04", {"tags": ["VIP"], "custom_price": 4500}),
+    ):
+        resp = await auth_client.post(
+            "/api/v1/spaces", json={"site_id": site_with_pricing, "name": name, **extra}
+        )
+        spaces[name] = resp.json()["id"]
+
+    resp = await auth_client.post(
+        "/api/v1/pricing/simulate",
+        json={
+            "sites": [{"site_id": site_with_pricing, "monthly_base_price": 4000}],
+            # Clears the monthly price only; the daily price keeps VIP tag-priced
+            "tags": [{"tag_id": tag_with_pricing["id"], "monthly_price": None}],
+            "spaces": [{"space_id": spaces["W-03"], "custom_price": None}],
+        },
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    # W-01 +400 (site), W-02 -1000 (tag), W-03 custom 4000 -> site 4000, W-04 as is
+    assert body["total"] == {
+        "spaces": 4,
+        "affected_spaces": 2,
+        "monthly_before": 17100,
+        "monthly_after": 16500,
+        "monthly_delta": -600,
+        "daily_before": 700,
+        "daily_after": 700,
+        "daily_delta": 0,
+    }
+    assert body["tier_changes"] == 1
+    tiers = {t["tier"]: t for t in body["tiers"]}
+    assert tiers["site"]["spaces"] == 2 and tiers["site"]["monthly_delta"] == 400
+    assert tiers["tag"]["monthly_delta"] == -1000
+    assert tiers["custom"]["affected_spaces"] == 0
+    assert [s["site_name"] for s in body["sites"]] == ["定價場"]
+
+    resp = await auth_client.get(f"/api/v1/spaces/{spaces['W-02']}")
+    assert resp.json()["effective_monthly_price"] == 5000
+    resp = await auth_client.get(f"/api/v1/spaces/{spaces['W-03']}")
+    assert resp.json()["price_tier"] == "custom"
+
+    resp = await auth_client.post(
+        "/api/v1/pricing/simulate",
+        json={"tags": [{"tag_id": site_with_pricing, "monthly_price": 1}]},
+    )
+    assert resp.status_code == 404
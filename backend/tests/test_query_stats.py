@@ -0,0 +1,157 @@
+"""Tests for per-request SQL instrumentation and N+1 detection."""
+
+from collections.abc import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.exc import OperationalError
+
+from app.main import app
+from app.utils.query_stats import (
+    QueryStats,
+    QueryStatsMiddleware,
+    _current_stats,
+    fingerprint,
+    instrument_engine,
+)
+
+
+def test_fingerprint_normalizes_parameters_and_in_lists() -> None:
+    a = fingerprint("SELECT * FROM spaces\n WHERE id IN ($1, $2, $3) AND limit 10")
+    b = fingerprint("SELECT * FROM spaces WHERE id IN ($1) AND limit 20")
+    assert a == b == "SELECT * FROM spaces WHERE id IN (...) AND limit ?"
+    assert fingerprint("SELECT name FROM t WHERE name = 'x'") == (
+        "SELECT name FROM t WHERE name = ?"
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_leaves_no_timing_state(test_engine) -> None:
+    instrument_engine(test_engine.sync_engine)
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        async with test_engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    await conn.exec_driver_sql("SELECT * FROM no_such_table")
+            await conn.exec_driver_sql("SELECT 1")
+            info = conn.sync_connection.info
+    finally:
+        _current_stats.reset(token)
+    assert stats.count == 1
+    assert 0 <= stats.total_ms < 1000
+    assert not any(key.endswith("_start") for key in info)
+
+
+@pytest.fixture
+async def instrumented_client(
+    auth_client: AsyncClient, test_engine
+) -> AsyncGenerator[AsyncClient, None]:
+    """Authenticated client routed through the middleware, test engine hooked."""
+    instrument_engine(test_engine.sync_engine)
+    async with AsyncClient(
+        transport=ASGITransport(app=QueryStatsMiddleware(app, n_plus_one_threshold=5)),
+        base_url="http://test",
+        headers=auth_client.headers,
+    ) as ac:
+        yield ac
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_reports_statements(
+    instrumented_client: AsyncClient,
+) -> None:
+    resp = await instrumented_client.get("/api/v1/sites")
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    # Auth lookup + ETag aggregate + site list
+    assert 'desc="3 statements"' in timing
+    assert "n-plus-one" not in timing
+
+
+@pytest.mark.asyncio
+async def test_per_row_queries_flagged_as_n_plus_one(
+    instrumented_client: AsyncClient, caplog: pytest.LogCaptureFixture
+) -> None:
+    for i in range(6):
+        resp = await instrumented_client.post(
+            "/api/v1/sites",
+            json={
+                "name": f"查詢場{i}",
+                "monthly_base_price": 3000,
+                "daily_base_price": 100,
+            },
+        )
+        assert resp.status_code == 201
+
+    with caplog.at_level("WARNING", logger="app.utils.query_stats"):
+        resp = await instrumented_client.get("/api/v1/sites")
+    # One space-count query per site
+    assert "n-plus-one" in resp.headers["server-timing"]
+    assert any("Possible N+1 in GET /api/v1/sites" in r.message for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_batch_space_create_statement_count_is_constant(
+    instrumented_client: AsyncClient,
+) -> None:
+    site = await instrumented_client.post(
+        "/api/v1/sites",
+        json={"name": "批次場", "monthly_base_price": 3000, "daily_base_price": 100},
+    )
+    timings = []
+    for prefix, count in (("A", 2), ("B", 40)):
+        resp = await instrumented_client.post(
+            "/api/v1/spaces/batch",
+            json={
+                "site_id": site.json()["id"],
+                "prefix": prefix,
+                "start": 1,
+                "count": count,
+            },
+        )
+        assert resp.status_code == 201
+        assert len(resp.json()) == count
+        assert resp.json()[0]["site_name"] == "批次場"
+        assert resp.json()[0]["computed_status"] == "available"
+        timings.append(resp.headers["server-timing"])
+    statements = [t.split('desc="')[1].split('"')[0] for t in timings]
+    assert statements[0] == statements[1]
+    assert "n-plus-one" not in timings[1]
+
+
+@pytest.mark.asyncio
+async def test_customer_overview_statement_count_is_constant(
+    instrumented_client: AsyncClient,
+) -> None:
+    site = await instrumented_client.post(
+        "/api/v1/sites",
+        json={"name": "總覽計數", "monthly_base_price": 3000, "daily_base_price": 100},
+    )
+    customer = await instrumented_client.post(
+        "/api/v1/customers", json={"name": "計數客戶", "phone": "0956789012"}
+    )
+    url = f"/api/v1/customers/{customer.json()['id']}/overview"
+    timings = []
+    for batch in (range(1), range(1, 6)):
+        for i in batch:
+            space = await instrumented_client.post(
+                "/api/v1/spaces", json={"site_id": site.json()["id"], "name": f"C-{i}"}
+            )
+            await instrumented_client.post(
+                "/api/v1/agreements",
+                json={
+                    "customer_id": customer.json()["id"],
+                    "space_id": space.json()["id"],
+                    "agreement_type": "monthly",
+                    "start_date": "2026-03-01",
+                    "price": 3000,
+                    "license_plates": "CNT-0001",
+                },
+            )
+        resp = await instrumented_client.get(url)
+        assert len(resp.json()["agreements"]) == batch.stop
+        timings.append(resp.headers["server-timing"])
+    # Auth lookup + customer + agreements with space, site and payment
+    assert all('desc="3 statements"' in t for t in timings)
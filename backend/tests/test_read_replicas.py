@@ -0,0 +1,63 @@
+"""Tests for read-replica routing."""
+
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.database import ReplicaRouter
+
+
+def _router(replicas: int) -> ReplicaRouter:
+    return ReplicaRouter(
+        ["sqlite+aiosqlite://"] * replicas, max_lag=5.0, check_interval=60.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_replicas_are_used_round_robin() -> None:
+    router = _router(2)
+    assert router.pick() is None  # not measured yet: the primary
+    await router.refresh()
+    picks = [router.pick() for _ in range(4)]
+    first, second = (r.session_factory for r in router._replicas)
+    assert picks == [first, second, first, second]
+
+
+@pytest.mark.asyncio
+async def test_lagging_or_unreachable_replicas_are_skipped() -> None:
+    router = _router(2)
+    await router.refresh()
+    lagging, healthy = router._replicas
+    lagging.lag = 30.0
+    assert [router.pick() for _ in range(3)] == [healthy.session_factory] * 3
+
+    healthy.lag = None  # unreachable at the last check
+    assert router.pick() is None  # fall back to the primary
+
+
+@pytest.mark.asyncio
+async def test_pick_never_probes_and_ignores_overdue_measurements() -> None:
+    router = _router(1)
+    replica = router._replicas[0]
+    replica.lag, replica.checked_at = 0.0, time.monotonic() - 3600
+    assert router.pick() is None  # the refresh task stopped an hour ago
+    assert replica.checked_at < time.monotonic() - 3000  # and pick didn't probe
+
+    task = asyncio.create_task(router.run())
+    try:
+        await asyncio.sleep(0.05)
+        assert router.pick() is replica.session_factory
+    finally:
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_read_routes_use_primary_without_replicas(
+    auth_client: AsyncClient,
+) -> None:
+    resp = await auth_client.get("/api/v1/agreements/summary")
+    assert resp.status_code == 200
+    resp = await auth_client.get("/api/v1/system-logs/export")
+    assert resp.status_code == 200
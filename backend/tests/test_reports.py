@@ -0,0 +1,203 @@
+"""Tests for the revenue forecast report."""
+
+from datetime import date, datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.agreement import Agreement
+from app.utils.forecast import AgreementColumns, ReceivableColumns, project
+
+
+def test_project_spreads_prices_and_compounds_renewals() -> None:
+    agreements = AgreementColumns.from_rows(
+        [
+            # Ended before the horizon: no revenue, no renewal expected
+            ("monthly", date(2026, 1, 1), date(2026, 2, 1), None, 3100, None),
+            # Running, ends in April with no renewal booked yet
+            ("monthly", date(2026, 3, 1), date(2026, 4, 1), None, 3100, None),
+            # Terminated on the 10th: ten days of revenue, never renewed
+            (
+                "monthly",
+                date(2026, 3, 1),
+                date(2026, 4, 1),
+                datetime(2026, 3, 10, 15),
+                3100,
+                None,
+            ),
+        ]
+    )
+    receivables = ReceivableColumns.from_rows(
+        [
+            (date(2026, 2, 15), 500),
+            (date(2026, 3, 1), 3100),
+            (date(2026, 5, 20), 200),
+            (date(2026, 7, 1), 99),
+        ]
+    )
+    rates = {"monthly": 0.5}
+    forecast = project(agreements, receivables, rates, date(2026, 3, 10), 3)
+
+    assert forecast.months == [date(2026, 3, 1), date(2026, 4, 1), date(2026, 5, 1)]
+    assert forecast.contracted == [4100, 0, 0]
+    assert forecast.renewal_rates == {
+        "daily": 0.0,
+        "monthly": 0.5,
+        "quarterly": 0.0,
+        "yearly": 0.0,
+    }
+    # 31-day renewals at 100/day: 4/1-5/2 at 50%, then 5/2-6/2 at 25%
+    assert forecast.expected_renewals == [0, 1500, 50 + 750]
+    assert forecast.pending_receivables == [3100, 0, 200]
+    assert forecast.overdue_receivables == 500
+
+
+def test_project_handles_empty_columns() -> None:
+    forecast = project(
+        AgreementColumns.concat([]),
+        ReceivableColumns.concat([]),
+        {},
+        date(2026, 1, 31),
+        2,
+    )
+    assert forecast.contracted == forecast.expected_renewals == [0, 0]
+    assert forecast.pending_receivables == [0, 0]
+    assert forecast.overdue_receivables == 0
+
+
+@pytest.mark.asyncio
+async def test_revenue_forecast_endpoint(auth_client: AsyncClient) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "預測場", "monthly_base_price": 3600, "daily_base_price": 150},
+    )
+    site_id = site.json()["id"]
+    customer = await auth_client.post(
+        "/api/v1/customers", json={"name": "預測客戶", "phone": "0978901234"}
+    )
+
+    async def book(name: str, start: date) -> dict:
+        space = await auth_client.post(
+            "/api/v1/spaces", json={"site_id": site_id, "name": name}
+        )
+        resp = await auth_client.post(
+            "/api/v1/agreements",
+            json={
+                "customer_id": customer.json()["id"],
+                "space_id": space.json()["id"],
+                "agreement_type": "monthly",
+                "start_date": str(start),
+                "price": 3600,
+                "license_plates": "FCT-0001",
+            },
+        )
+        assert resp.status_code == 201
+        return resp.json()
+
+    # History: renewed once, then not
+    first = await book("F-01", date.today() - timedelta(days=80))
+    resp = await auth_client.post(
+        "/api/v1/agreements",
+        json={
+            "customer_id": customer.json()["id"],
+            "space_id": first["space_id"],
+            "agreement_type": "monthly",
+            "start_date": first["end_date"],
+            "price": 3600,
+            "license_plates": "FCT-0001",
+        },
+    )
+    assert resp.status_code == 201
+    await book("F-02", date.today() + timedelta(days=1))
+
+    resp = await auth_client.get(
+        "/api/v1/reports/revenue-forecast", params={"months": 3, "site_id": site_id}
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body["months"]) == 3
+    assert body["months"][0]["month"] == str(date.today().replace(day=1))
+    # The whole term falls in the next three months; rounding per month
+    assert abs(sum(m["contracted"] for m in body["months"]) - 3600) <= 1
+    assert sum(m["pending_receivables"] for m in body["months"]) == 3600
+    assert body["renewal_rates"]["monthly"] == 0.5
+    assert sum(m["expected_renewals"] for m in body["months"]) > 0
+    assert body["overdue_receivables"] == 7200
+    assert all(
+        m["total"] == m["contracted"] + m["expected_renewals"] for m in body["months"]
+    )
+
+    other = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "空預測場", "monthly_base_price": 3600, "daily_base_price": 150},
+    )
+    resp = await auth_client.get(
+        "/api/v1/reports/revenue-forecast",
+        params={"months": 3, "site_id": other.json()["id"]},
+    )
+    assert all(m["total"] == 0 for m in resp.json()["months"])
+
+    resp = await auth_client.get(
+        "/api/v1/reports/revenue-forecast", params={"site_id": str(uuid4())}
+    )
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_successor_cancelled_before_the_horizon_is_a_booked_renewal(
+    auth_client: AsyncClient, db_session: AsyncSession
+) -> None:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "續約場", "monthly_base_price": 3600, "daily_base_price": 150},
+    )
+    customer = await auth_client.post(
+        "/api/v1/customers", json={"name": "續約客戶", "phone": "0978901235"}
+    )
+
+    async def book(space_id: str, start: date | str) -> dict:
+        resp = await auth_client.post(
+            "/api/v1/agreements",
+            json={
+                "customer_id": customer.json()["id"],
+                "space_id": space_id,
+                "agreement_type": "monthly",
+                "start_date": str(start),
+                "price": 3100,
+                "license_plates": "FCT-0002",
+            },
+        )
+        assert resp.status_code == 201
+        return resp.json()
+
+    spaces = []
+    for name in ("R-01", "R-02"):
+        resp = await auth_client.post(
+            "/api/v1/spaces", json={"site_id": site.json()["id"], "name": name}
+        )
+        spaces.append(resp.json()["id"])
+    # History, for a non-zero monthly renewal rate: renewed once, then not
+    past = await book(spaces[0], date.today() - timedelta(days=100))
+    await book(spaces[0], past["end_date"])
+    # Running now, with its successor booked and then cancelled last month
+    running = await book(spaces[1], date.today() - timedelta(days=20))
+    successor = await book(spaces[1], running["end_date"])
+    cancelled = datetime.combine(date.today().replace(day=1), datetime.min.time())
+    await db_session.execute(
+        update(Agreement)
+        .where(Agreement.id == UUID(successor["id"]))
+        .values(terminated_at=cancelled - timedelta(days=5))
+    )
+    await db_session.commit()
+
+    resp = await auth_client.get(
+        "/api/v1/reports/revenue-forecast",
+        params={"months": 3, "site_id": site.json()["id"]},
+    )
+    body = resp.json()
+    assert body["renewal_rates"]["monthly"] > 0
+    # The cancelled successor still marks the running agreement as renewed
+    assert all(m["expected_renewals"] == 0 for m in body["months"])
@@ -0,0 +1,31 @@
+"""Tests for the pre-serialized JSON response path."""
+
+import json
+import uuid
+
+from app.schemas.customer import CustomerResponse
+from app.utils.responses import FastJSONResponse, list_response
+
+
+def test_list_response_matches_model_serialization() -> None:
+    rows = [
+        CustomerResponse(
+            id=uuid.uuid4(),
+            name="王小明",
+            phone="0912345678",
+            contact_phone=None,
+            email=None,
+            notes=None,
+        )
+        for _ in range(3)
+    ]
+    resp = list_response(CustomerResponse, rows)
+    assert resp.media_type == "application/json"
+    assert json.loads(resp.body) == [row.model_dump(mode="json") for row in rows]
+
+
+def test_fast_json_response_passes_bytes_through() -> None:
+    assert FastJSONResponse(b'{"a":1}').body == b'{"a":1}'
+    assert FastJSONResponse({"id": uuid.UUID(int=1)}).body == (
+        b'{"id":"00000000-0000-0000-0000-000000000001"}'
+    )
@@ -0,0 +1,123 @@
+from uuid import UUID
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.space import Space
+
+
+@pytest.fixture
+async def setup(auth_client: AsyncClient) -> dict:
+    site_resp = await auth_client.post(
+        "/api/v1/sites",
+        json={
+            "name": "版本測試場",
+            "monthly_base_price": 3600,
+            "daily_base_price": 150,
+        },
+    )
+    space_resp = await auth_client.post(
+        "/api/v1/spaces",
+        json={"site_id": site_resp.json()["id"], "name": "V-01"},
+    )
+    customer_resp = await auth_client.post(
+        "/api/v1/customers",
+        json={"name": "版本客戶", "phone": "0966778899"},
+    )
+    agreement_resp = await auth_client.post(
+        "/api/v1/agreements",
+        json={
+            "customer_id": customer_resp.json()["id"],
+            "space_id": space_resp.json()["id"],
+            "agreement_type": "monthly",
+            "start_date": "2026-03-01",
+            "price": 3600,
+            "license_plates": "VER-001",
+        },
+    )
+    return {"space": space_resp.json(), "agreement": agreement_resp.json()}
+
+
+@pytest.mark.asyncio
+async def test_if_match_accepts_current_version_and_rejects_stale(
+    auth_client: AsyncClient, setup: dict
+) -> None:
+    space = setup["space"]
+    assert space["version"] == 1
+    url = f"/api/v1/spaces/{space['id']}"
+
+    response = await auth_client.put(
+        url, json={"custom_price": 4000}, headers={"If-Match": '"1"'}
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+
+    # A second admin still holding version 1
+    response = await auth_client.put(
+        url, json={"custom_price": 4200}, headers={"If-Match": '"1"'}
+    )
+    assert response.status_code == 412
+    assert response.json()["code"] == "PRECONDITION_FAILED"
+    response = await auth_client.get(url)
+    assert response.json()["custom_price"] == 4000
+
+
+@pytest.mark.asyncio
+async def test_concurrent_update_detected_without_if_match(
+    auth_client: AsyncClient, db_session: AsyncSession, setup: dict
+) -> None:
+    space_id = UUID(setup["space"]["id"])
+    # The request reads this copy (version 1) from the session...
+    loaded = await db_session.get(Space, space_id)
+    # ...while another writer commits before the request's UPDATE
+    await db_session.execute(
+        update(Space)
+        .where(Space.id == space_id)
+        .values(version=Space.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db_session.commit()
+    assert loaded.version == 1
+
+    response = await auth_client.put(
+        f"/api/v1/spaces/{space_id}", json={"custom_price": 4000}
+    )
+    assert response.status_code == 412
+
+
+@pytest.mark.asyncio
+async def test_terminate_and_payment_with_if_match(
+    auth_client: AsyncClient, setup: dict
+) -> None:
+    agreement = setup["agreement"]
+    payment = (
+        await auth_client.get(f"/api/v1/agreements/{agreement['id']}/payment")
+    ).json()
+
+    response = await auth_client.put(
+        f"/api/v1/payments/{payment['id']}",
+        json={"notes": "已聯絡"},
+        headers={"If-Match": str(payment["version"] + 1)},
+    )
+    assert response.status_code == 412
+
+    response = await auth_client.post(
+        f"/api/v1/agreements/{agreement['id']}/terminate",
+        json={"termination_reason": "提前解約"},
+        headers={"If-Match": f'"{agreement["version"]}"'},
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == agreement["version"] + 1
+
+
+@pytest.mark.asyncio
+async def test_malformed_if_match(auth_client: AsyncClient, setup: dict) -> None:
+    response = await auth_client.put(
+        f"/api/v1/spaces/{setup['space']['id']}",
+        json={"custom_price": 4000},
+        headers={"If-Match": 'W/"1"'},
+    )
+    assert response.status_code == 400
+    assert response.json()["code"] == "INVALID_IF_MATCH"
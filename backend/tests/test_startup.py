@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Loaded on first use (see benchmarks/startup.py)
+DEFERRED_MODULES = (
+    "passlib",
+    "jose",
+    "bcrypt",
+    "cryptography",
+    "dateutil",
+    "numpy",
+)
+
+
+def test_heavy_libraries_not_imported_at_startup() -> None:
+    # Fresh interpreter: this test session has imported them already
+    code = (
+        "import json, sys, app.main; "
+        f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert json.loads(out.stdout) == []
@@ -0,0 +1,129 @@
+"""Tests for space occupancy timelines."""
+
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from app.utils.timeline import day_runs, gaps, merge
+
+A, B, C = uuid4(), uuid4(), uuid4()
+
+
+def test_merge_clips_and_joins_touching_intervals() -> None:
+    start, end = date(2026, 3, 1), date(2026, 4, 1)
+    merged = merge(
+        [
+            (date(2026, 3, 10), date(2026, 3, 20), B),
+            (date(2026, 2, 1), date(2026, 3, 5), A),
+            (date(2026, 3, 20), date(2026, 5, 1), C),
+        ],
+        start,
+        end,
+    )
+    assert [(o.start, o.end, o.agreement_ids) for o in merged] == [
+        (date(2026, 3, 1), date(2026, 3, 5), [A]),
+        (date(2026, 3, 10), date(2026, 4, 1), [B, C]),
+    ]
+    assert gaps(merged, start, end) == [(date(2026, 3, 5), date(2026, 3, 10))]
+    assert day_runs(merged, start, end) == [0, 4, 5, 22]
+    assert day_runs([], start, end) == [31]
+
+
+@pytest.fixture
+async def site(auth_client: AsyncClient) -> dict:
+    site = await auth_client.post(
+        "/api/v1/sites",
+        json={"name": "時間軸場", "monthly_base_price": 3600, "daily_base_price": 150},
+    )
+    site = site.json()
+    customer = await auth_client.post(
+        "/api/v1/customers", json={"name": "時間軸客戶", "phone": "0967890123"}
+    )
+    spaces = []
+    for name in ("T-01", "T-02"):
+        resp = await auth_client.post(
+            "/api/v1/spaces", json={"site_id": site["id"], "name": name}
+        )
+        spaces.append(resp.json())
+
+    async def book(space: dict, start: str) -> dict:
+        resp = await auth_client.post(
+            "/api/v1/agreements",
+            json={
+                "customer_id": customer.json()["id"],
+                "space_id": space["id"],
+                "agreement_type": "monthly",
+                "start_date": start,
+                "price": 3600,
+                "license_plates": "TML-0001",
+            },
+        )
+        assert resp.status_code == 201
+        return resp.json()
+
+    site["agreements"] = [
+        await book(spaces[0], "2026-03-01"),
+        await book(spaces[0], "2026-04-01"),
+    ]
+    # Terminated before it started: never occupied T-02
+    future = await book(spaces[1], "2099-01-01")
+    await auth_client.post(
+        f"/api/v1/agreements/{future['id']}/terminate",
+        json={"termination_reason": "取消"},
+    )
+    site["spaces"] = spaces
+    return site
+
+
+@pytest.mark.asyncio
+async def test_space_timeline(auth_client: AsyncClient, site: dict) -> None:
+    space = site["spaces"][0]
+    resp = await auth_client.get(
+        f"/api/v1/spaces/{space['id']}/timeline",
+        params={"from": "2026-02-20", "to": "2026-05-10"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["occupied"] == [
+        {
+            "start": "2026-03-01",
+            "end": "2026-04-30",
+            "agreement_ids": [a["id"] for a in site["agreements"]],
+        }
+    ]
+    assert data["gaps"] == [
+        {"start": "2026-02-20", "end": "2026-02-28"},
+        {"start": "2026-05-01", "end": "2026-05-10"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_site_timeline_day_runs(auth_client: AsyncClient, site: dict) -> None:
+    resp = await auth_client.get(
+        f"/api/v1/sites/{site['id']}/timeline",
+        params={"from": "2026-02-20", "to": "2026-05-10"},
+    )
+    assert resp.status_code == 200
+    assert [(s["name"], s["runs"]) for s in resp.json()["spaces"]] == [
+        ("T-01", [9, 61, 10]),
+        ("T-02", [80]),
+    ]
+    resp = await auth_client.get(
+        f"/api/v1/sites/{site['id']}/timeline",
+        params={"from": "2099-01-01", "to": "2099-01-31"},
+    )
+    assert [s["runs"] for s in resp.json()["spaces"]] == [[31], [31]]
+
+
+@pytest.mark.asyncio
+async def test_timeline_range_is_validated(
+    auth_client: AsyncClient, site: dict
+) -> None:
+    url = f"/api/v1/spaces/{site['spaces'][0]['id']}/timeline"
+    resp = await auth_client.get(url, params={"from": "2026-05-01", "to": "2026-04-01"})
+    assert resp.status_code == 400
+    assert resp.json()["code"] == "INVALID_RANGE"
+    resp = await auth_client.get(url, params={"from": "2026-01-01", "to": "2027-06-01"})
+    assert resp.status_code == 400
@@ -0,0 +1,136 @@
+import asyncio
+import signal
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.responses import PlainTextResponse
+
+from app.api.events import sse_stream
+from app.services.event_bus import EventBus
+from app.services.lookup_index import customer_lookup, space_lookup
+from app.services.overdue_tracker import overdue_tracker
+from app.services.warmup import (
+    build_lookup_indexes,
+    drain,
+    drain_on_signal,
+    warm_up,
+)
+from app.utils.drain import DrainMiddleware, RequestTracker
+
+STEPS = ["connections", "catalog", "space_list", "summary"]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_reports_each_step(test_engine) -> None:
+    overdue_tracker.reset()
+    customer_lookup.reset()
+    space_lookup.reset()
+    factory = async_sessionmaker(test_engine, class_=AsyncSession)
+    report = await warm_up(test_engine, factory, connections=2)
+    assert list(report.steps) == STEPS
+    assert report.failed == []
+    assert overdue_tracker.loaded
+    # Built in the background once serving, not before
+    assert not customer_lookup.loaded and not space_lookup.loaded
+    await build_lookup_indexes(factory)
+    assert customer_lookup.loaded and space_lookup.loaded
+    overdue_tracker.reset()
+    customer_lookup.reset()
+    space_lookup.reset()
+
+
+@pytest.mark.asyncio
+async def test_failed_warm_up_steps_do_not_block_startup() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")  # no tables
+    try:
+        report = await warm_up(
+            engine, async_sessionmaker(engine, class_=AsyncSession), connections=1
+        )
+    finally:
+        await engine.dispose()
+        overdue_tracker.reset()
+    assert list(report.steps) == STEPS
+    assert report.failed == ["catalog", "space_list", "summary"]
+
+
+@pytest.mark.asyncio
+async def test_drain_refuses_new_requests_and_waits_for_running_ones() -> None:
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send) -> None:
+        await release.wait()
+        await PlainTextResponse("done")(scope, receive, send)
+
+    tracker = RequestTracker()
+    app = DrainMiddleware(slow_app, tracker=tracker)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        running = asyncio.create_task(client.get("/"))
+        while tracker.active == 0:
+            await asyncio.sleep(0)
+
+        draining = asyncio.create_task(drain(tracker, timeout=5))
+        while not tracker.draining:
+            await asyncio.sleep(0)
+        refused = await client.get("/")
+        assert refused.status_code == 503
+        assert refused.json()["code"] == "SHUTTING_DOWN"
+        assert not draining.done()
+
+        release.set()
+        assert (await running).text == "done"
+        assert await draining is True
+
+
+@pytest.mark.asyncio
+async def test_drain_times_out() -> None:
+    tracker = RequestTracker()
+    tracker.started()
+    assert await drain(tracker, timeout=0.01) is False
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_ends_on_shutdown(monkeypatch: pytest.MonkeyPatch) -> None:
+    bus = EventBus()
+    monkeypatch.setattr("app.services.warmup.event_bus", bus)
+    stream = sse_stream(bus.subscribe(), heartbeat=5)
+    assert await anext(stream) == "retry: 5000\n\n"
+    await drain(RequestTracker(), timeout=0)
+    assert "resync" in await anext(stream)
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert not bus.has_audience
+
+
+@pytest.mark.asyncio
+async def test_signal_starts_drain_before_the_server_stops() -> None:
+    received = []
+    tracker = RequestTracker()
+    tracker.started()  # a request still running
+
+    def server_handler(sig: int, frame: object) -> None:
+        received.append(sig)
+
+    original = signal.signal(signal.SIGTERM, server_handler)
+    try:
+        uninstall = drain_on_signal(tracker, timeout=5)
+        signal.raise_signal(signal.SIGTERM)
+        assert tracker.draining  # refusing at once, before the loop runs
+        for _ in range(10):
+            await asyncio.sleep(0)
+        # The server only hears of it once the running request is done
+        assert received == []
+        tracker.finished()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert received == [signal.SIGTERM]
+
+        # A second signal goes straight through
+        signal.raise_signal(signal.SIGTERM)
+        assert received == [signal.SIGTERM, signal.SIGTERM]
+        uninstall()
+        assert signal.getsignal(signal.SIGTERM) is server_handler
+    finally:
+        signal.signal(signal.SIGTERM, original)